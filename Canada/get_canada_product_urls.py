@@ -10,10 +10,19 @@ from selenium.webdriver.chrome.options import Options
 import time
 import json
 import re
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from location import LocationSessions
+from search_pages import SearchPages, product_urls_from_driver
+
+# Delivery location cookies, shared with scraping_all_products_data.py
+LOCATION_COOKIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "location_cookies.json")
 
 
 class AmazonScraper:
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, direct_pages=True):
         """Initialize the Amazon scraper with Chrome driver"""
         self.options = Options()
         if headless:
@@ -25,6 +34,10 @@ class AmazonScraper:
             options=self.options
         )
         self.wait = WebDriverWait(self.driver, 15)
+        self.locations = LocationSessions(LOCATION_COOKIES)
+        self.postcode = None  # delivery postcode pinned by set_location
+        # Fetch result pages by URL, falling back to clicking "Next" in the browser
+        self.pages = SearchPages("amazon.ca", lang="en-CA") if direct_pages else None
         
     def setup_amazon(self):
         """Navigate to Amazon homepage and handle bot checks"""
@@ -43,48 +56,15 @@ class AmazonScraper:
         #     print("No bot check screen. Proceeding...")
     
     def set_location(self, postal_code, location_name):
-        """Set the delivery location using postal code"""
+        """Set the delivery location using postal code, reusing the cookies of an earlier run while fresh"""
         print(f"📍 Setting location to {location_name} ({postal_code})...")
-        
-        try:
-            # Click the "Deliver to" location box
-            update_loc = self.wait.until(
-                EC.element_to_be_clickable((By.ID, "nav-global-location-popover-link"))
-            )
-            update_loc.click()
-            
-            # Split postal code (e.g., "M5V 3L9" -> "M5V" and "3L9")
-            parts = postal_code.split()
-            if len(parts) != 2:
-                raise ValueError(f"Invalid postal code format: {postal_code}")
-            
-            # Enter postal code parts
-            postal_input1 = self.wait.until(
-                EC.presence_of_element_located((By.ID, "GLUXZipUpdateInput_0"))
-            )
-            postal_input2 = self.wait.until(
-                EC.presence_of_element_located((By.ID, "GLUXZipUpdateInput_1"))
-            )
-            
-            postal_input1.clear()
-            postal_input1.send_keys(parts[0])
-            postal_input2.clear()
-            postal_input2.send_keys(parts[1])
-            
-            # Click Apply
-            apply_btn = self.wait.until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "span#GLUXZipUpdate .a-button-input"))
-            )
-            apply_btn.click()
-            
-            # Wait and refresh to update location
-            time.sleep(3)
-            self.driver.refresh()
+        self.postcode = None
+        if self.locations.pin(self.driver, "https://www.amazon.ca/", postal_code):
+            self.postcode = postal_code
+            self.driver.refresh()  # the injected cookies apply from the next page load
             print(f"✅ Location set to {location_name}")
-            
-        except Exception as e:
-            print(f"❌ Error setting location: {e}")
-            raise
+        else:
+            print("⚠️ Continuing without location setting...")
     
     def search_products(self, search_term):
         """Search for products using the given search term"""
@@ -108,20 +88,14 @@ class AmazonScraper:
     def extract_product_urls_from_page(self):
         """Extract product URLs from current page"""
         try:
-            product_elements = self.wait.until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'a.a-link-normal.s-no-outline'))
+            # Wait for products to load
+            self.wait.until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'a.a-link-normal.s-no-outline'))
             )
             
-            page_urls = set()
-            for elem in product_elements:
-                href = elem.get_attribute("href")
-                if href:
-                    full_url = "https://www.amazon.ca" + href if href.startswith("/") else href
-                    
-                    # Filter out ad URLs
-                    if "/sspa/" not in full_url and not full_url.startswith("https://aax-"):
-                        page_urls.add(full_url)
-            
+            # All candidate links and result ASINs come back from a single script call
+            page_urls, saved = product_urls_from_driver(self.driver, "amazon.ca", selectors=["a.a-link-normal.s-no-outline"])
+            print(f"   🔗 Read {len(page_urls)} product URLs in one call ({saved} WebDriver round trips saved)")
             return page_urls
             
         except Exception as e:
@@ -230,13 +204,20 @@ class AmazonScraper:
         print(f"\nStarting scrape for: {search_term}")
         print(f"Target: {max_products} URLs")
         
-        # Search for the category
-        self.search_products(search_term)
-        
         product_links = set()
         page_num = 1
+        if self.pages:
+            cookies = self.locations.request_cookies("https://www.amazon.ca/", self.postcode) if self.postcode else None
+            product_links, page_num = self.pages.collect(search_term, max_products, cookies)
+        
+        # Search for the category, or carry on from the first page that could not be fetched directly
+        if page_num == 1:
+            self.search_products(search_term)
+        elif page_num:
+            print(f"   ➡️ Continuing from page {page_num} in the browser...")
+            self.driver.get(self.pages.url(search_term, page_num))
         
-        while len(product_links) < max_products:
+        while page_num and len(product_links) < max_products:
             print(f" Scraping page {page_num}...")
             
             # Extract URLs from current page
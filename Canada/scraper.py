@@ -1,7 +1,7 @@
 import json
-import time
+import os
+import sys
 import re
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
@@ -9,6 +9,68 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lean_profile import apply_lean_profile, enable_request_blocking
+from page_readiness import wait_for_sections
+from dom_snapshot import DomSnapshot
+from html_parsers import make_soup
+from selector_plans import SelectorPlan
+from dom_index import page_text, select, select_one
+from failures import BlockedPage, check_page
+
+
+# Regex bank for clean_text and the price/seller fallbacks, compiled once at import
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Any of these anywhere in the text; each list is joined into one alternation
+CURRENCY_RE = re.compile('|'.join([
+    r'[\$\£\€\₹\¥]',  # Currency symbols
+    r'USD|CAD|GBP|EUR|INR|JPY|AUD',  # Currency codes
+    r'C\$',  # Canadian dollar format
+    r'CDN\$',  # Canadian dollar format
+    r'\$\s*CAD',  # Dollar CAD format
+    r'CA\$',  # Canadian format
+]), re.IGNORECASE)
+
+# Numbers that could be prices (including comma separators)
+NUMBER_RE = re.compile('|'.join([
+    r'\d+(?:[\.\,]\d{1,2})?',  # Standard decimal
+    r'\d{1,3}(?:,\d{3})*(?:\.\d{2})?',  # Comma thousands separator
+    r'\d+(?:\s\d{3})*(?:[\.\,]\d{2})?',  # Space thousands separator
+]))
+
+# Tried in order against the page text when no price selector matches
+PRICE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    # Canadian dollar patterns
+    r'C\$\s*(\d+(?:\.\d{2})?)',
+    r'CDN\$\s*(\d+(?:\.\d{2})?)',
+    r'CA\$\s*(\d+(?:\.\d{2})?)',
+    r'\$\s*(\d+(?:\.\d{2})?)\s*CAD',
+    
+    # Standard currency patterns
+    r'£\s*(\d+(?:\.\d{2})?)',  # UK pounds
+    r'\$\s*(\d+(?:\.\d{2})?)',  # US dollars
+    r'€\s*(\d+(?:,\d{2})?)',   # Euros
+    r'₹\s*(\d+(?:\.\d{2})?)',  # Indian rupees
+    r'¥\s*(\d+)',              # Japanese yen
+    
+    # Context-based patterns
+    r'Price:\s*[C\$£€₹¥]*\s*(\d+(?:[\.\,]\d{2})?)',
+    r'Our Price:\s*[C\$£€₹¥]*\s*(\d+(?:[\.\,]\d{2})?)',
+    r'List Price:\s*[C\$£€₹¥]*\s*(\d+(?:[\.\,]\d{2})?)',
+    
+    # Number with currency code
+    r'(\d+(?:\.\d{2})?)\s*(USD|CAD|GBP|EUR|INR|JPY|AUD)',
+]]
+
+# Tried in order against the page text when the buybox has no seller
+SELLER_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"sold by\s*:?\s*([^,\n\|]+)",
+    r"seller\s*:?\s*([^,\n\|]+)",
+    r"merchant\s*:?\s*([^,\n\|]+)",
+    r"shipped and sold by\s*:?\s*([^,\n\|]+)"
+]]
+
 
 def clean_text(text):
     """Clean text by removing extra spaces, newlines, normalizing whitespace, and removing Unicode control characters"""
@@ -26,7 +88,7 @@ def clean_text(text):
     text = text.replace('\n', ' ').replace('\r', ' ')
     
     # Replace multiple spaces with single space and strip
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE_RE.sub(' ', text)
     
     return text.strip()
 
@@ -56,7 +118,7 @@ def get_domain_info(url):
 
 def try_selectors(soup, selectors, attr=None, regex=None, default=None):
     for selector in selectors:
-        el = soup.select_one(selector)
+        el = select_one(soup, selector)
         if el:
             if attr:
                 val = el.get(attr)
@@ -73,27 +135,27 @@ def try_selectors(soup, selectors, attr=None, regex=None, default=None):
     return default
 
 
+RATING_SELECTORS = SelectorPlan([
+    "span[data-asin-rating]",
+    "span.a-icon-alt",
+    "#acrPopover",
+    ".reviewCountTextLinkedHistogram",
+    "#averageCustomerReviews .a-icon-alt",
+    "#averageCustomerReviews .a-size-base.a-color-base",
+    ".a-popover-trigger .a-icon-alt",
+    "[data-hook='rating-out-of-text']"
+])
+
+
 def try_rating(soup):
-    selectors = [
-        "span[data-asin-rating]",
-        "span.a-icon-alt",
-        "#acrPopover",
-        ".reviewCountTextLinkedHistogram",
-        "#averageCustomerReviews .a-icon-alt",
-        "#averageCustomerReviews .a-size-base.a-color-base",
-        ".a-popover-trigger .a-icon-alt",
-        "[data-hook='rating-out-of-text']"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            # Try aria-label first
-            aria = el.get('aria-label')
-            if aria:
-                return clean_text(aria)
-            txt = el.get_text(strip=True)
-            if txt:
-                return clean_text(txt)
+    for el in RATING_SELECTORS.first_matches(soup):
+        # Try aria-label first
+        aria = el.get('aria-label')
+        if aria:
+            return clean_text(aria)
+        txt = el.get_text(strip=True)
+        if txt:
+            return clean_text(txt)
     return None
 
 
@@ -103,25 +165,10 @@ def is_valid_price(text, domain_config):
         return False
     
     # Enhanced currency symbols and price patterns for different domains
-    currency_patterns = [
-        r'[\$\£\€\₹\¥]',  # Currency symbols
-        r'USD|CAD|GBP|EUR|INR|JPY|AUD',  # Currency codes
-        r'C\$',  # Canadian dollar format
-        r'CDN\$',  # Canadian dollar format
-        r'\$\s*CAD',  # Dollar CAD format
-        r'CA\$',  # Canadian format
-    ]
-    
-    has_currency = any(re.search(pattern, text, re.IGNORECASE) for pattern in currency_patterns)
+    has_currency = CURRENCY_RE.search(text) is not None
     
     # Look for numbers that could be prices (including comma separators)
-    number_patterns = [
-        r'\d+(?:[\.\,]\d{1,2})?',  # Standard decimal
-        r'\d{1,3}(?:,\d{3})*(?:\.\d{2})?',  # Comma thousands separator
-        r'\d+(?:\s\d{3})*(?:[\.\,]\d{2})?',  # Space thousands separator
-    ]
-    
-    has_numbers = any(re.search(pattern, text) for pattern in number_patterns)
+    has_numbers = NUMBER_RE.search(text) is not None
     
     # Exclude obviously non-price text
     exclusions = ['rating', 'review', 'star', 'delivery', 'shipping', 'tax', 'vat', 'including', 'save', 'off']
@@ -134,83 +181,83 @@ def is_valid_price(text, domain_config):
     return (has_currency or has_price_context) and has_numbers and not has_exclusions
 
 
+# Comprehensive list of price selectors for different Amazon layouts
+PRICE_SELECTORS = SelectorPlan([
+    # Main price selectors (most common)
+    ".a-price .a-offscreen",
+    ".a-price-whole",
+    ".a-price .a-price-whole",
+    
+    # Core price display (newer Amazon layouts)
+    "#corePriceDisplay_desktop_feature_div .a-offscreen",
+    "#corePriceDisplay_desktop_feature_div .a-price-whole",
+    "#corePrice_feature_div .a-offscreen",
+    "#corePrice_desktop .a-offscreen",
+    
+    # Apex price display
+    ".apexPriceToPay .a-offscreen",
+    ".apexPriceToPay .a-price-whole",
+    "#apex_desktop .a-price .a-offscreen",
+    
+    # Legacy price blocks
+    "#priceblock_ourprice",
+    "#priceblock_dealprice", 
+    "#priceblock_saleprice",
+    "#priceblock_vatprice",
+    "#priceblock_businessprice",
+    "#priceblock_pospromoprice",
+    "#price_inside_buybox",
+    
+    # Buybox pricing
+    "#desktop_buyBox .a-price .a-offscreen",
+    "#desktop_buyBox .a-price-whole",
+    "#buybox .a-price .a-offscreen",
+    "#rightCol .a-price .a-offscreen",
+    
+    # Alternative price displays
+    ".a-price-current .a-offscreen",
+    ".a-price-current",
+    ".price .a-offscreen",
+    
+    # Mobile/responsive selectors
+    "#mobile-price .a-offscreen",
+    ".a-size-medium.a-color-price",
+    
+    # Kindle/Digital content
+    "#kindle-price .a-offscreen",
+    "#ebook-price-value",
+    
+    # Business/bulk pricing
+    "#businessPrice .a-offscreen",
+    "#quantityPrice .a-offscreen",
+    
+    # International/localized
+    ".a-price-symbol",
+    "[data-a-color='price'] .a-offscreen",
+    
+    # Canadian specific selectors
+    "[data-automation-id='list-price'] .a-offscreen",
+    "[data-automation-id='sale-price'] .a-offscreen",
+    ".a-price-range .a-offscreen",
+    
+    # Fallback selectors
+    "*[id*='price'] .a-offscreen",
+    "*[class*='price'] .a-offscreen",
+    ".a-color-price",
+    
+    # Last resort - any element with price-like text
+    "[aria-label*='price']",
+    "[title*='price']"
+])
+
+
 def try_price(soup, domain_config, debug=False):
     """Enhanced price extraction with support for all Amazon domains"""
     
-    # Comprehensive list of price selectors for different Amazon layouts
-    selectors = [
-        # Main price selectors (most common)
-        ".a-price .a-offscreen",
-        ".a-price-whole",
-        ".a-price .a-price-whole",
-        
-        # Core price display (newer Amazon layouts)
-        "#corePriceDisplay_desktop_feature_div .a-offscreen",
-        "#corePriceDisplay_desktop_feature_div .a-price-whole",
-        "#corePrice_feature_div .a-offscreen",
-        "#corePrice_desktop .a-offscreen",
-        
-        # Apex price display
-        ".apexPriceToPay .a-offscreen",
-        ".apexPriceToPay .a-price-whole",
-        "#apex_desktop .a-price .a-offscreen",
-        
-        # Legacy price blocks
-        "#priceblock_ourprice",
-        "#priceblock_dealprice", 
-        "#priceblock_saleprice",
-        "#priceblock_vatprice",
-        "#priceblock_businessprice",
-        "#priceblock_pospromoprice",
-        "#price_inside_buybox",
-        
-        # Buybox pricing
-        "#desktop_buyBox .a-price .a-offscreen",
-        "#desktop_buyBox .a-price-whole",
-        "#buybox .a-price .a-offscreen",
-        "#rightCol .a-price .a-offscreen",
-        
-        # Alternative price displays
-        ".a-price-current .a-offscreen",
-        ".a-price-current",
-        ".price .a-offscreen",
-        
-        # Mobile/responsive selectors
-        "#mobile-price .a-offscreen",
-        ".a-size-medium.a-color-price",
-        
-        # Kindle/Digital content
-        "#kindle-price .a-offscreen",
-        "#ebook-price-value",
-        
-        # Business/bulk pricing
-        "#businessPrice .a-offscreen",
-        "#quantityPrice .a-offscreen",
-        
-        # International/localized
-        ".a-price-symbol",
-        "[data-a-color='price'] .a-offscreen",
-        
-        # Canadian specific selectors
-        "[data-automation-id='list-price'] .a-offscreen",
-        "[data-automation-id='sale-price'] .a-offscreen",
-        ".a-price-range .a-offscreen",
-        
-        # Fallback selectors
-        "*[id*='price'] .a-offscreen",
-        "*[class*='price'] .a-offscreen",
-        ".a-color-price",
-        
-        # Last resort - any element with price-like text
-        "[aria-label*='price']",
-        "[title*='price']"
-    ]
-    
     found_prices = []  # For debugging
     
-    for selector in selectors:
+    for selector, elements in PRICE_SELECTORS.iter_matches(soup):
         try:
-            elements = soup.select(selector)
             for el in elements:
                 if el:
                     # Try different ways to get the price text
@@ -248,39 +295,16 @@ def try_price(soup, domain_config, debug=False):
             continue
     
     # Enhanced regex patterns for different currencies and formats
-    page_text = soup.get_text()
-    price_patterns = [
-        # Canadian dollar patterns
-        r'C\$\s*(\d+(?:\.\d{2})?)',
-        r'CDN\$\s*(\d+(?:\.\d{2})?)',
-        r'CA\$\s*(\d+(?:\.\d{2})?)',
-        r'\$\s*(\d+(?:\.\d{2})?)\s*CAD',
-        
-        # Standard currency patterns
-        r'£\s*(\d+(?:\.\d{2})?)',  # UK pounds
-        r'\$\s*(\d+(?:\.\d{2})?)',  # US dollars
-        r'€\s*(\d+(?:,\d{2})?)',   # Euros
-        r'₹\s*(\d+(?:\.\d{2})?)',  # Indian rupees
-        r'¥\s*(\d+)',              # Japanese yen
-        
-        # Context-based patterns
-        r'Price:\s*[C\$£€₹¥]*\s*(\d+(?:[\.\,]\d{2})?)',
-        r'Our Price:\s*[C\$£€₹¥]*\s*(\d+(?:[\.\,]\d{2})?)',
-        r'List Price:\s*[C\$£€₹¥]*\s*(\d+(?:[\.\,]\d{2})?)',
-        
-        # Number with currency code
-        r'(\d+(?:\.\d{2})?)\s*(USD|CAD|GBP|EUR|INR|JPY|AUD)',
-    ]
-    
-    for pattern in price_patterns:
-        match = re.search(pattern, page_text, re.IGNORECASE)
+    page = page_text(soup)
+    for pattern in PRICE_PATTERNS:
+        match = page.search(pattern)
         if match:
             if len(match.groups()) == 2:
                 price_text = f"{match.group(1)} {match.group(2)}"
             else:
                 price_text = match.group(0)
             if debug:
-                found_prices.append(f"Regex pattern: {pattern} -> Price: {price_text}")
+                found_prices.append(f"Regex pattern: {pattern.pattern} -> Price: {price_text}")
             return clean_text(price_text)
     
     if debug:
@@ -291,76 +315,79 @@ def try_price(soup, domain_config, debug=False):
     return None
 
 
+DEAL_SELECTORS = SelectorPlan([
+    ".dealBadge",
+    ".savingsPercentage",
+    ".a-size-medium.a-color-price.savingPriceOverride.aok-align-center.reinventPriceSavingsPercentageMargin.savingsPercentage",
+    ".a-size-medium.a-color-success",
+    ".a-size-base.a-color-price",
+    "[data-automation-id='discount-percentage']",
+    ".a-badge-text"
+])
+
+
 def try_deal(soup):
-    selectors = [
-        ".dealBadge",
-        ".savingsPercentage",
-        ".a-size-medium.a-color-price.savingPriceOverride.aok-align-center.reinventPriceSavingsPercentageMargin.savingsPercentage",
-        ".a-size-medium.a-color-success",
-        ".a-size-base.a-color-price",
-        "[data-automation-id='discount-percentage']",
-        ".a-badge-text"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            txt = el.get_text(strip=True)
-            if txt:
-                return clean_text(txt)
+    for el in DEAL_SELECTORS.first_matches(soup):
+        txt = el.get_text(strip=True)
+        if txt:
+            return clean_text(txt)
     return None
 
 
+MAIN_IMAGE_SELECTORS = [
+    ("#landingImage", "data-old-hires"),
+    ("#imgTagWrapperId img", "data-old-hires"),
+    ("#imgTagWrapperId img", "src"),
+    ("#imageBlock img[data-old-hires]", "data-old-hires"),
+    ("#main-image-container img", "src"),
+    ("#main-image", "src"),
+    ("#imgBlkFront", "src"),
+    ("#ebooksImgBlkFront", "src"),
+    ("#img-canvas img", "src"),
+    ("#ivLargeImage img", "src"),
+    ("#imgTagWrapperId img", "data-a-dynamic-image"),
+    ("#altImages img", "src"),
+    (".a-dynamic-image", "src")
+]
+MAIN_IMAGE_PLAN = SelectorPlan(selector for selector, _ in MAIN_IMAGE_SELECTORS)
+
+
 def try_main_image(soup):
-    selectors = [
-        ("#landingImage", "data-old-hires"),
-        ("#imgTagWrapperId img", "data-old-hires"),
-        ("#imgTagWrapperId img", "src"),
-        ("#imageBlock img[data-old-hires]", "data-old-hires"),
-        ("#main-image-container img", "src"),
-        ("#main-image", "src"),
-        ("#imgBlkFront", "src"),
-        ("#ebooksImgBlkFront", "src"),
-        ("#img-canvas img", "src"),
-        ("#ivLargeImage img", "src"),
-        ("#imgTagWrapperId img", "data-a-dynamic-image"),
-        ("#altImages img", "src"),
-        (".a-dynamic-image", "src")
-    ]
-    for selector, attr in selectors:
-        el = soup.select_one(selector)
-        if el:
-            val = el.get(attr)
-            if val:
-                # If data-a-dynamic-image, extract first URL
-                if attr == "data-a-dynamic-image":
-                    try:
-                        import ast
-                        img_dict = ast.literal_eval(val)
-                        if isinstance(img_dict, dict):
-                            return list(img_dict.keys())[0]
-                    except Exception:
-                        continue
-                else:
-                    return val
+    for (selector, attr), elements in zip(MAIN_IMAGE_SELECTORS, MAIN_IMAGE_PLAN.matches(soup)):
+        if not elements:
+            continue
+        val = elements[0].get(attr)
+        if val:
+            # If data-a-dynamic-image, extract first URL
+            if attr == "data-a-dynamic-image":
+                try:
+                    import ast
+                    img_dict = ast.literal_eval(val)
+                    if isinstance(img_dict, dict):
+                        return list(img_dict.keys())[0]
+                except Exception:
+                    continue
+            else:
+                return val
     return None
 
 
+BRAND_SELECTORS = SelectorPlan([
+    "#bylineInfo",
+    "#brand",
+    ".po-brand .a-span9",
+    ".a-row .a-link-normal",
+    ".a-row .a-size-base",
+    "[data-automation-id='brand-name']",
+    ".author .a-link-normal"
+])
+
+
 def try_brand(soup):
-    selectors = [
-        "#bylineInfo",
-        "#brand",
-        ".po-brand .a-span9",
-        ".a-row .a-link-normal",
-        ".a-row .a-size-base",
-        "[data-automation-id='brand-name']",
-        ".author .a-link-normal"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            txt = el.get_text(strip=True)
-            if txt and not txt.lower().startswith("visit the"):
-                return clean_text(txt)
+    for el in BRAND_SELECTORS.first_matches(soup):
+        txt = el.get_text(strip=True)
+        if txt and not txt.lower().startswith("visit the"):
+            return clean_text(txt)
     # Try meta tag
     meta = soup.find("meta", {"name": "brand"})
     if meta and meta.get("content"):
@@ -368,85 +395,85 @@ def try_brand(soup):
     return None
 
 
+TITLE_SELECTORS = SelectorPlan([
+    "#productTitle",
+    "#titleSection .a-size-large",
+    "#ebooksProductTitle",
+    "#item_title",
+    ".product-title-word-break",
+    "#title",
+    "[data-automation-id='title']"
+])
+
+
 def try_title(soup):
-    selectors = [
-        "#productTitle",
-        "#titleSection .a-size-large",
-        "#ebooksProductTitle",
-        "#item_title",
-        ".product-title-word-break",
-        "#title",
-        "[data-automation-id='title']"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            txt = el.get_text(strip=True)
-            if txt:
-                return clean_text(txt)
+    for el in TITLE_SELECTORS.first_matches(soup):
+        txt = el.get_text(strip=True)
+        if txt:
+            return clean_text(txt)
     return None
 
 
+TOTAL_REVIEWS_SELECTORS = SelectorPlan([
+    "#acrCustomerReviewText",
+    "#acrCustomerWriteReviewText",
+    "#reviewSummary .a-size-base",
+    ".reviewCountTextLinkedHistogram",
+    "#averageCustomerReviews .a-size-base",
+    "[data-hook='total-review-count']",
+    "#acrCustomerReviewLink"
+])
+
+
 def try_total_reviews(soup):
-    selectors = [
-        "#acrCustomerReviewText",
-        "#acrCustomerWriteReviewText",
-        "#reviewSummary .a-size-base",
-        ".reviewCountTextLinkedHistogram",
-        "#averageCustomerReviews .a-size-base",
-        "[data-hook='total-review-count']",
-        "#acrCustomerReviewLink"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            txt = el.get_text(strip=True)
-            if txt:
-                return clean_text(txt)
+    for el in TOTAL_REVIEWS_SELECTORS.first_matches(soup):
+        txt = el.get_text(strip=True)
+        if txt:
+            return clean_text(txt)
     return None
 
 
+# Comprehensive selectors for about this item
+ABOUT_SELECTORS = SelectorPlan([
+    # Primary feature bullets selectors
+    "#feature-bullets ul li span.a-list-item",
+    "#feature-bullets ul li .a-list-item",
+    "#feature-bullets ul li",
+    "#feature-bullets .a-list-item",
+    
+    # Feature bullets variations
+    "#featurebullets_feature_div ul li",
+    "#featurebullets_feature_div .a-list-item",
+    "[data-feature-name='featurebullets'] ul li",
+    "[data-feature-name='featurebullets'] .a-list-item",
+    
+    # Product overview
+    "#productOverview_feature_div .a-list-item",
+    "#productOverview_feature_div ul li",
+    "#productOverview_feature_div .a-row",
+    
+    # A+ content feature bullets
+    "#aplus_feature_div ul li",
+    "#aplus_feature_div .a-list-item",
+    
+    # Alternative layouts
+    ".a-unordered-list.a-vertical li",
+    ".feature .a-list-item",
+    "[data-automation-id='feature-bullets'] ul li",
+    "[data-automation-id='feature-bullets'] .a-list-item",
+    
+    # Fallback selectors
+    ".feature-bullets ul li",
+    ".product-bullets ul li",
+    ".feature-list li"
+])
+
+
 def extract_about_this_item(soup):
     """Enhanced extraction of 'About this item' section"""
     about_items = []
     
-    # Comprehensive selectors for about this item
-    about_selectors = [
-        # Primary feature bullets selectors
-        "#feature-bullets ul li span.a-list-item",
-        "#feature-bullets ul li .a-list-item",
-        "#feature-bullets ul li",
-        "#feature-bullets .a-list-item",
-        
-        # Feature bullets variations
-        "#featurebullets_feature_div ul li",
-        "#featurebullets_feature_div .a-list-item",
-        "[data-feature-name='featurebullets'] ul li",
-        "[data-feature-name='featurebullets'] .a-list-item",
-        
-        # Product overview
-        "#productOverview_feature_div .a-list-item",
-        "#productOverview_feature_div ul li",
-        "#productOverview_feature_div .a-row",
-        
-        # A+ content feature bullets
-        "#aplus_feature_div ul li",
-        "#aplus_feature_div .a-list-item",
-        
-        # Alternative layouts
-        ".a-unordered-list.a-vertical li",
-        ".feature .a-list-item",
-        "[data-automation-id='feature-bullets'] ul li",
-        "[data-automation-id='feature-bullets'] .a-list-item",
-        
-        # Fallback selectors
-        ".feature-bullets ul li",
-        ".product-bullets ul li",
-        ".feature-list li"
-    ]
-
-    for selector in about_selectors:
-        elements = soup.select(selector)
+    for elements in ABOUT_SELECTORS.matches(soup):
         if elements:
             temp_items = []
             for li in elements:
@@ -530,7 +557,7 @@ def extract_from_manufacturer(soup):
     
     manufacturer_section = None
     for selector in manufacturer_selectors:
-        manufacturer_section = soup.select_one(selector)
+        manufacturer_section = select_one(soup, selector)
         if manufacturer_section:
             break
     
@@ -629,7 +656,7 @@ def extract_product_description(soup):
     ]
     
     for selector in description_selectors:
-        desc_section = soup.select_one(selector)
+        desc_section = select_one(soup, selector)
         if desc_section:
             # Extract paragraphs and meaningful text blocks
             text_elements = desc_section.find_all(['p', 'div'], recursive=True)
@@ -648,8 +675,11 @@ def extract_product_description(soup):
     return description_content[:3]  # Limit to 3 main description paragraphs
 
 
-def setup_driver(domain_config):
-    """Setup Chrome driver with appropriate settings for the domain"""
+def setup_driver(domain_config, lean=False):
+    """Setup Chrome driver with appropriate settings for the domain.
+
+    With lean=True images, fonts, media and ad/tracking hosts are blocked over CDP.
+    """
     options = Options()
     options.add_argument("--headless")
     options.add_argument("--no-sandbox")
@@ -668,8 +698,12 @@ def setup_driver(domain_config):
     
     # Set language preference
     options.add_argument(f"--lang={domain_config.get('lang', 'en-US')}")
+    if lean:
+        apply_lean_profile(options)
     
     driver = webdriver.Chrome(options=options)
+    if lean:
+        enable_request_blocking(driver)
     
     # Execute script to remove webdriver property
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
@@ -677,317 +711,450 @@ def setup_driver(domain_config):
     return driver
 
 
-def scrape_amazon_product(url):
-    # Get domain configuration
-    domain_config = get_domain_info(url)
+def extract_asin(url):
+    """Extract the ASIN from a /dp/ product URL"""
+    try:
+        return url.split("/dp/")[1].split("/")[0]
+    except Exception:
+        return None
+
+
+def extract_product_fields(soup, url, domain_config):
+    """Extract the fields available on the initial page load"""
+    product = {}
+    # ASIN
+    product["asin"] = extract_asin(url)
     
-    # Setup driver with domain-specific settings
-    driver = setup_driver(domain_config)
-    wait = WebDriverWait(driver, 15)  # Increased timeout
+    product["url"] = url
+    product["domain"] = domain_config
+    
+    # Title
+    product["title"] = try_title(soup)
+    
+    # Brand
+    product["brand"] = try_brand(soup)
+    
+    # Rating
+    product["rating"] = try_rating(soup)
+    
+    # Total Reviews
+    product["total_reviews"] = try_total_reviews(soup)
+    
+    # Price with domain-specific handling
+    product["price"] = try_price(soup, domain_config, debug=False)
+    
+    # Deal
+    product["deal"] = try_deal(soup)
+    
+    # Main Image
+    product["main_image"] = try_main_image(soup)
 
-    try:
-        driver.get(url)
-        time.sleep(5)  # Wait for page to load
+    # Enhanced About This Item
+    product["about_this_item"] = extract_about_this_item(soup)
+    
+    # From the Manufacturer
+    product["from_manufacturer"] = extract_from_manufacturer(soup)
+    
+    # Product Description
+    product["product_description"] = extract_product_description(soup)
 
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+    return product
 
-        product = {}
-        # ASIN
-        try:
-            product["asin"] = url.split("/dp/")[1].split("/")[0]
-        except Exception:
-            product["asin"] = None
-        
-        product["url"] = url
-        product["domain"] = domain_config
-        
-        # Title
-        product["title"] = try_title(soup)
-        
-        # Brand
-        product["brand"] = try_brand(soup)
-        
-        # Rating
-        product["rating"] = try_rating(soup)
-        
-        # Total Reviews
-        product["total_reviews"] = try_total_reviews(soup)
-        
-        # Price with domain-specific handling
-        product["price"] = try_price(soup, domain_config, debug=False)
-        
-        # Deal
-        product["deal"] = try_deal(soup)
-        
-        # Main Image
-        product["main_image"] = try_main_image(soup)
 
-        # Enhanced About This Item
-        product["about_this_item"] = extract_about_this_item(soup)
+def extract_offer_fields(soup, url, domain_config):
+    """Extract only what an offer refresh needs: the price, deal and buy box"""
+    return {
+        "asin": extract_asin(url),
+        "url": url,
+        "domain": domain_config,
+        "title": try_title(soup),
+        "price": try_price(soup, domain_config, debug=False),
+        "deal": try_deal(soup),
+        "buybox": extract_buybox(soup),
+    }
+
+
+def extract_buybox(soup):
+    """Extract seller, delivery and stock information from the buybox"""
+    buybox = {}
+
+    # Enhanced buybox area detection
+    buybox_selectors = [
+        "#desktop_buyBox",
+        "#rightCol", 
+        "#buybox",
+        "#apex_desktop",
+        "#newAccordionCaption_feature_div",
+        "[data-automation-id='buybox']",
+        "#desktop_qualifiedBuybox"
+    ]
+    
+    buybox_area = None
+    for selector in buybox_selectors:
+        buybox_area = select_one(soup, selector)
+        if buybox_area:
+            break
+
+    if buybox_area:
+        all_text = buybox_area.get_text(separator='|').split('|')
+        for i, text in enumerate(all_text):
+            text = clean_text(text)
+            if text.lower() in ["ships from", "dispatched from"] and i + 1 < len(all_text):
+                next_text = clean_text(all_text[i + 1])
+                if next_text and next_text.lower() not in ["ships from", "sold by", "payment", "dispatched from"]:
+                    buybox["ships_from"] = next_text
+            elif text.lower() == "sold by" and i + 1 < len(all_text):
+                next_text = clean_text(all_text[i + 1])
+                if next_text and next_text.lower() not in ["ships from", "sold by", "payment"]:
+                    buybox["sold_by"] = next_text
+
+    # Enhanced seller detection with domain-specific patterns
+    if not buybox.get("sold_by"):
+        page = page_text(soup)
+        for pattern in SELLER_PATTERNS:
+            match = page.search(pattern)
+            if match:
+                sold_by = clean_text(match.group(1))
+                if sold_by and len(sold_by) > 2:
+                    buybox["sold_by"] = sold_by
+                    break
+
+    # Extract additional buybox information
+    if buybox_area:
+        # Delivery information
+        delivery_selectors = [
+            "#mir-layout-DELIVERY_BLOCK",
+            "#deliveryBlockMessage",
+            "#fast-track-message",
+            "#delivery-block",
+            ".a-spacing-top-base"
+        ]
         
-        # From the Manufacturer
-        product["from_manufacturer"] = extract_from_manufacturer(soup)
+        for selector in delivery_selectors:
+            delivery_elem = buybox_area.select_one(selector)
+            if delivery_elem:
+                delivery_text = clean_text(delivery_elem.get_text())
+                if delivery_text and len(delivery_text) > 10:
+                    buybox["delivery_info"] = delivery_text
+                    break
         
-        # Product Description
-        product["product_description"] = extract_product_description(soup)
-
-        # Enhanced Buy Box Info
-        buybox = {}
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-        time.sleep(2)
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-
-        # Enhanced buybox area detection
-        buybox_selectors = [
-            "#desktop_buyBox",
-            "#rightCol", 
-            "#buybox",
-            "#apex_desktop",
-            "#newAccordionCaption_feature_div",
-            "[data-automation-id='buybox']",
-            "#desktop_qualifiedBuybox"
+        # Stock status
+        stock_selectors = [
+            "#availability span",
+            "#availability .a-color-success",
+            "#availability .a-color-state",
+            ".a-color-success",
+            ".a-color-state"
         ]
         
-        buybox_area = None
-        for selector in buybox_selectors:
-            buybox_area = soup.select_one(selector)
-            if buybox_area:
+        for selector in stock_selectors:
+            stock_elem = buybox_area.select_one(selector)
+            if stock_elem:
+                stock_text = clean_text(stock_elem.get_text())
+                if stock_text and 'stock' in stock_text.lower():
+                    buybox["stock_status"] = stock_text
+                    break
+
+    return buybox
+
+
+# Enhanced variant detection
+VARIANT_SELECTORS = [
+    "li[data-asin][data-csa-c-item-id]",
+    "[data-automation-id='color-picker'] li",
+    "[data-automation-id='size-picker'] li",
+    "#variation_color_name li",
+    "#variation_style_name li",
+    "#variation_size_name li",
+    ".swatches li",
+    ".a-button-group .a-button"
+]
+
+
+def extract_child_skus(driver, url, product_asin):
+    """Enhanced Child SKU Links (Color/Model Variants) from the live page"""
+    child_skus = []
+    try:
+        for selector in VARIANT_SELECTORS:
+            dimension_items = driver.find_elements(By.CSS_SELECTOR, selector)
+            for item in dimension_items:
+                try:
+                    asin = item.get_attribute("data-asin")
+                    if asin and asin != product_asin:
+                        base_domain = url.split('/dp/')[0]
+                        variant_url = f"{base_domain}/dp/{asin}"
+                        
+                        # Try to get variant name/description
+                        variant_name = None
+                        try:
+                            variant_name = item.get_attribute("title") or item.get_attribute("aria-label")
+                            if not variant_name:
+                                variant_name = clean_text(item.text)
+                        except:
+                            pass
+                        
+                        variant_info = {
+                            "url": variant_url, 
+                            "asin": asin,
+                            "variant_name": variant_name if variant_name else f"Variant {asin}"
+                        }
+                        
+                        if not any(sku["asin"] == asin for sku in child_skus):
+                            child_skus.append(variant_info)
+                except Exception:
+                    continue
+            if child_skus:
                 break
+                
+    except Exception as e:
+        print(f"Error extracting child SKUs: {e}")
 
-        if buybox_area:
-            all_text = buybox_area.get_text(separator='|').split('|')
-            for i, text in enumerate(all_text):
-                text = clean_text(text)
-                if text.lower() in ["ships from", "dispatched from"] and i + 1 < len(all_text):
-                    next_text = clean_text(all_text[i + 1])
-                    if next_text and next_text.lower() not in ["ships from", "sold by", "payment", "dispatched from"]:
-                        buybox["ships_from"] = next_text
-                elif text.lower() == "sold by" and i + 1 < len(all_text):
-                    next_text = clean_text(all_text[i + 1])
-                    if next_text and next_text.lower() not in ["ships from", "sold by", "payment"]:
-                        buybox["sold_by"] = next_text
-
-        # Enhanced seller detection with domain-specific patterns
-        if not buybox.get("sold_by"):
-            seller_patterns = [
-                r"sold by\s*:?\s*([^,\n\|]+)",
-                r"seller\s*:?\s*([^,\n\|]+)",
-                r"merchant\s*:?\s*([^,\n\|]+)",
-                r"shipped and sold by\s*:?\s*([^,\n\|]+)"
-            ]
-            page_text = soup.get_text()
-            for pattern in seller_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE)
-                if match:
-                    sold_by = clean_text(match.group(1))
-                    if sold_by and len(sold_by) > 2:
-                        buybox["sold_by"] = sold_by
-                        break
-
-        # Extract additional buybox information
-        if buybox_area:
-            # Delivery information
-            delivery_selectors = [
-                "#mir-layout-DELIVERY_BLOCK",
-                "#deliveryBlockMessage",
-                "#fast-track-message",
-                "#delivery-block",
-                ".a-spacing-top-base"
-            ]
+    return child_skus
+
+
+def extract_child_skus_from_soup(soup, url, product_asin):
+    """Same as extract_child_skus, but over parsed HTML instead of a live driver"""
+    child_skus = []
+    for selector in VARIANT_SELECTORS:
+        for item in select(soup, selector):
+            asin = item.get("data-asin")
+            if asin and asin != product_asin:
+                base_domain = url.split('/dp/')[0]
+                variant_url = f"{base_domain}/dp/{asin}"
+                variant_name = item.get("title") or item.get("aria-label") or clean_text(item.get_text(" ", strip=True))
+                variant_info = {
+                    "url": variant_url,
+                    "asin": asin,
+                    "variant_name": variant_name if variant_name else f"Variant {asin}"
+                }
+                if not any(sku["asin"] == asin for sku in child_skus):
+                    child_skus.append(variant_info)
+        if child_skus:
+            break
+    return child_skus
+
+
+def extract_specifications(soup):
+    """Extract the technical details and detail bullets tables"""
+    specs = {}
+    
+    # Technical details table
+    tech_details_selectors = [
+        "#productDetails_techSpec_section_1",
+        "#technicalSpecifications_section_1", 
+        "#productDetails_detailBullets_sections1",
+        "#detail-bullets",
+        "#productDetails_feature_div"
+    ]
+    
+    for selector in tech_details_selectors:
+        tech_section = select_one(soup, selector)
+        if tech_section:
+            # Extract table rows
+            rows = tech_section.find_all('tr')
+            for row in rows:
+                cells = row.find_all(['td', 'th'])
+                if len(cells) >= 2:
+                    key = clean_text(cells[0].get_text(strip=True))
+                    value = clean_text(cells[1].get_text(strip=True))
+                    if key and value and len(key) < 100 and len(value) < 200:
+                        specs[key] = value
             
-            for selector in delivery_selectors:
-                delivery_elem = buybox_area.select_one(selector)
-                if delivery_elem:
-                    delivery_text = clean_text(delivery_elem.get_text())
-                    if delivery_text and len(delivery_text) > 10:
-                        buybox["delivery_info"] = delivery_text
-                        break
+            # Extract definition lists
+            dts = tech_section.find_all('dt')
+            for dt in dts:
+                dd = dt.find_next_sibling('dd')
+                if dd:
+                    key = clean_text(dt.get_text(strip=True))
+                    value = clean_text(dd.get_text(strip=True))
+                    if key and value:
+                        specs[key] = value
             
-            # Stock status
-            stock_selectors = [
-                "#availability span",
-                "#availability .a-color-success",
-                "#availability .a-color-state",
-                ".a-color-success",
-                ".a-color-state"
-            ]
+            if specs:
+                break
+    
+    # Additional product details
+    detail_bullets = select_one(soup, "#detail-bullets")
+    if detail_bullets:
+        detail_items = detail_bullets.find_all('li')
+        for item in detail_items:
+            text = clean_text(item.get_text())
+            if ':' in text:
+                parts = text.split(':', 1)
+                if len(parts) == 2:
+                    key = clean_text(parts[0])
+                    value = clean_text(parts[1])
+                    if key and value and len(key) < 50:
+                        specs[key] = value
+
+    return specs
+
+
+# Image thumbnails
+THUMBNAIL_SELECTORS = SelectorPlan([
+    "#altImages img",
+    "#imageBlock_thumb img", 
+    ".a-button-thumbnail img",
+    ".imageThumb img",
+    "[data-action='main-image-click'] img"
+])
+
+
+def extract_additional_images(soup, main_image=None):
+    """Extract thumbnail images, upgraded to their high resolution versions"""
+    additional_images = []
+    
+    for imgs in THUMBNAIL_SELECTORS.matches(soup):
+        for img in imgs:
+            src = img.get('src') or img.get('data-src')
+            if src and src not in [main_image] and 'amazon' in src:
+                # Try to get higher resolution version
+                if '_SS' in src or '_SX' in src or '_SY' in src:
+                    # Replace with larger version
+                    src = re.sub(r'_S[XY]\d+_', '_SL1600_', src)
+                    src = re.sub(r'_SS\d+_', '_SL1600_', src)
+                
+                additional_images.append(src)
+    
+    # Remove duplicates and limit
+    return list(dict.fromkeys(additional_images))[:10]
+
+
+def extract_qa(soup):
+    """Extract up to 5 question/answer pairs"""
+    qa_data = []
+    qa_section = select_one(soup, "#ask-dp-search_feature_div, #customerQA")
+    if qa_section:
+        qa_items = qa_section.select("[data-hook='pa-answer-display-question']")[:5]  # Limit to 5 Q&As
+        
+        for qa_item in qa_items:
+            question_elem = qa_item.select_one("[data-hook='pa-answer-display-question-title']")
+            answer_elem = qa_item.select_one("[data-hook='pa-answer-display-answer-body']")
             
-            for selector in stock_selectors:
-                stock_elem = buybox_area.select_one(selector)
-                if stock_elem:
-                    stock_text = clean_text(stock_elem.get_text())
-                    if stock_text and 'stock' in stock_text.lower():
-                        buybox["stock_status"] = stock_text
-                        break
+            if question_elem and answer_elem:
+                question = clean_text(question_elem.get_text())
+                answer = clean_text(answer_elem.get_text())
+                
+                if question and answer:
+                    qa_data.append({
+                        "question": question,
+                        "answer": answer
+                    })
+    return qa_data
+
+
+def extract_product(soup, url, domain_config=None):
+    """Extract a full product record from parsed HTML, without a browser"""
+    domain_config = domain_config or get_domain_info(url)
+    product = extract_product_fields(soup, url, domain_config)
+    product["buybox"] = extract_buybox(soup)
+    product["child_skus"] = extract_child_skus_from_soup(soup, url, product["asin"])
+    product["specifications"] = extract_specifications(soup)
+    product["additional_images"] = extract_additional_images(soup, product.get("main_image"))
+    product["qa"] = extract_qa(soup)
+    return product
+
+
+def extract_product_from_html(html, url, parser=None):
+    """Parse a raw product page (e.g. fetched over plain HTTP) into a product record"""
+    return extract_product(make_soup(html, parser), url)
+
+
+def scrape_amazon_product(url, driver=None, network_stats=None, wait_log=None, cache=None, sections=None,
+                          offer_only=False):
+    """Scrape a product page. Pass `driver` to reuse a pooled browser; it is left open.
+
+    If `network_stats` (a lean_profile.NetworkStats) is given, the page's bytes
+    transferred and load timings are recorded into it. Time spent waiting on each
+    page section is recorded into `wait_log` (a page_readiness.WaitLog).
+    With an html_cache.HtmlCache, a fresh cached copy of the page is parsed
+    instead of loading it, and pages loaded in the browser are stored.
+    With `sections`, only those page_readiness sections are waited for. With
+    `offer_only`, only the offer fields are read, from the first screen of the page.
+    """
+    html = cache.get(url) if cache else None
+    if html:
+        return extract_product_from_html(html, url)
+
+    # Get domain configuration
+    domain_config = get_domain_info(url)
+    
+    # Setup driver with domain-specific settings unless one was borrowed from a pool
+    owns_driver = driver is None
+    if owns_driver:
+        driver = setup_driver(domain_config)
+    wait = WebDriverWait(driver, 15)  # Increased timeout
+
+    try:
+        profile = network_stats.before_page(driver) if network_stats else None
+        driver.get(url)
+        # Give up on robot checks and error pages before waiting for sections they will never have
+        blocked = check_page(driver)
+        if blocked:
+            raise BlockedPage(blocked)
+        # Wait for the elements the first-pass extractors need instead of a fixed sleep
+        timings = wait_for_sections(driver, ["title", "price"], only=sections)
+        if network_stats:
+            network_stats.after_page(driver, url, profile)
 
-        product["buybox"] = buybox
+        if offer_only:
+            # A city's offer refresh: the price and buy box are on the first screen, so no
+            # scrolling, variant lookups or content extractors. The page is not cached, as
+            # its lazily loaded sections never rendered.
+            wait_for_sections(driver, ["buybox"], timings, only=sections)
+            snapshot = DomSnapshot(driver)
+            product = extract_offer_fields(snapshot.soup, url, domain_config)
+            if wait_log:
+                wait_log.record(url, timings, snapshot.stats)
+            return product
+
+        # Parse the full page once; later passes only re-parse lazily loaded sections
+        snapshot = DomSnapshot(driver)
+        soup = snapshot.soup
+
+        product = extract_product_fields(soup, url, domain_config)
+
+        # Enhanced Buy Box Info
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+        wait_for_sections(driver, ["buybox"], timings, only=sections)
+        soup = snapshot.refresh(["buybox", "details"])
+
+        product["buybox"] = extract_buybox(soup)
 
         # Enhanced Child SKU Links (Color/Model Variants)
-        product["child_skus"] = []
-        try:
-            # Enhanced variant detection
-            variant_selectors = [
-                "li[data-asin][data-csa-c-item-id]",
-                "[data-automation-id='color-picker'] li",
-                "[data-automation-id='size-picker'] li",
-                "#variation_color_name li",
-                "#variation_style_name li",
-                "#variation_size_name li",
-                ".swatches li",
-                ".a-button-group .a-button"
-            ]
-            
-            for selector in variant_selectors:
-                dimension_items = driver.find_elements(By.CSS_SELECTOR, selector)
-                for item in dimension_items:
-                    try:
-                        asin = item.get_attribute("data-asin")
-                        if asin and asin != product["asin"]:
-                            base_domain = url.split('/dp/')[0]
-                            variant_url = f"{base_domain}/dp/{asin}"
-                            
-                            # Try to get variant name/description
-                            variant_name = None
-                            try:
-                                variant_name = item.get_attribute("title") or item.get_attribute("aria-label")
-                                if not variant_name:
-                                    variant_name = clean_text(item.text)
-                            except:
-                                pass
-                            
-                            variant_info = {
-                                "url": variant_url, 
-                                "asin": asin,
-                                "variant_name": variant_name if variant_name else f"Variant {asin}"
-                            }
-                            
-                            if not any(sku["asin"] == asin for sku in product["child_skus"]):
-                                product["child_skus"].append(variant_info)
-                    except Exception:
-                        continue
-                if product["child_skus"]:
-                    break
-                    
-        except Exception as e:
-            print(f"Error extracting child SKUs: {e}")
+        product["child_skus"] = extract_child_skus(driver, url, product["asin"])
 
         # Product Specifications
-        specs = {}
-        
-        # Technical details table
-        tech_details_selectors = [
-            "#productDetails_techSpec_section_1",
-            "#technicalSpecifications_section_1", 
-            "#productDetails_detailBullets_sections1",
-            "#detail-bullets",
-            "#productDetails_feature_div"
-        ]
-        
-        for selector in tech_details_selectors:
-            tech_section = soup.select_one(selector)
-            if tech_section:
-                # Extract table rows
-                rows = tech_section.find_all('tr')
-                for row in rows:
-                    cells = row.find_all(['td', 'th'])
-                    if len(cells) >= 2:
-                        key = clean_text(cells[0].get_text(strip=True))
-                        value = clean_text(cells[1].get_text(strip=True))
-                        if key and value and len(key) < 100 and len(value) < 200:
-                            specs[key] = value
-                
-                # Extract definition lists
-                dts = tech_section.find_all('dt')
-                for dt in dts:
-                    dd = dt.find_next_sibling('dd')
-                    if dd:
-                        key = clean_text(dt.get_text(strip=True))
-                        value = clean_text(dd.get_text(strip=True))
-                        if key and value:
-                            specs[key] = value
-                
-                if specs:
-                    break
-        
-        # Additional product details
-        detail_bullets = soup.select_one("#detail-bullets")
-        if detail_bullets:
-            detail_items = detail_bullets.find_all('li')
-            for item in detail_items:
-                text = clean_text(item.get_text())
-                if ':' in text:
-                    parts = text.split(':', 1)
-                    if len(parts) == 2:
-                        key = clean_text(parts[0])
-                        value = clean_text(parts[1])
-                        if key and value and len(key) < 50:
-                            specs[key] = value
-
-        product["specifications"] = specs
+        product["specifications"] = extract_specifications(soup)
 
         # Additional Images
-        additional_images = []
-        
-        # Look for image thumbnails
-        image_selectors = [
-            "#altImages img",
-            "#imageBlock_thumb img", 
-            ".a-button-thumbnail img",
-            ".imageThumb img",
-            "[data-action='main-image-click'] img"
-        ]
-        
-        for selector in image_selectors:
-            imgs = soup.select(selector)
-            for img in imgs:
-                src = img.get('src') or img.get('data-src')
-                if src and src not in [product.get("main_image")] and 'amazon' in src:
-                    # Try to get higher resolution version
-                    if '_SS' in src or '_SX' in src or '_SY' in src:
-                        # Replace with larger version
-                        src = re.sub(r'_S[XY]\d+_', '_SL1600_', src)
-                        src = re.sub(r'_SS\d+_', '_SL1600_', src)
-                    
-                    additional_images.append(src)
-        
-        # Remove duplicates and limit
-        additional_images = list(dict.fromkeys(additional_images))[:10]
-        product["additional_images"] = additional_images
+        product["additional_images"] = extract_additional_images(soup, product.get("main_image"))
 
         # Q&A Section
         qa_data = []
         try:
             # Scroll to Q&A section
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
+            wait_for_sections(driver, ["qa"], timings, only=sections)
+            soup = snapshot.refresh(["qa"])
             
-            qa_section = soup.select_one("#ask-dp-search_feature_div, #customerQA")
-            if qa_section:
-                qa_items = qa_section.select("[data-hook='pa-answer-display-question']")[:5]  # Limit to 5 Q&As
-                
-                for qa_item in qa_items:
-                    question_elem = qa_item.select_one("[data-hook='pa-answer-display-question-title']")
-                    answer_elem = qa_item.select_one("[data-hook='pa-answer-display-answer-body']")
-                    
-                    if question_elem and answer_elem:
-                        question = clean_text(question_elem.get_text())
-                        answer = clean_text(answer_elem.get_text())
-                        
-                        if question and answer:
-                            qa_data.append({
-                                "question": question,
-                                "answer": answer
-                            })
+            qa_data = extract_qa(soup)
             
         except Exception as e:
             print(f"Error extracting Q&A: {e}")
         
         product["qa"] = qa_data
 
+        if wait_log:
+            wait_log.record(url, timings, snapshot.stats)
+        if cache and (product.get("title") or product.get("price")):
+            cache.put(url, driver.page_source, source="browser")
+
         return product
 
     finally:
-        driver.quit()
+        if owns_driver:
+            driver.quit()
 
 
 # Enhanced Example Usage
@@ -1,7 +1,8 @@
 import json
-import time
+import os
+import sys
 import re
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
@@ -9,6 +10,32 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lean_profile import apply_lean_profile, enable_request_blocking
+from page_readiness import wait_for_sections
+from dom_snapshot import DomSnapshot
+from html_parsers import make_soup
+from selector_plans import SelectorPlan
+from dom_index import page_text, select, select_one
+from failures import BlockedPage, check_page
+
+
+# Regex bank for clean_text and the price/seller fallbacks, compiled once at import
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Tried in order against the page text when the buybox has no ships-from / seller
+SHIPS_FROM_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"ships from\s*:?\s*([^,\n\|]+)",
+    r"dispatched from\s*:?\s*([^,\n\|]+)",
+    r"fulfilled by\s*:?\s*([^,\n\|]+)"
+]]
+SOLD_BY_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"sold by\s*:?\s*([^,\n\|]+)",
+    r"seller\s*:?\s*([^,\n\|]+)",
+    r"merchant\s*:?\s*([^,\n\|]+)"
+]]
+PRIME_RE = re.compile(r'prime', re.IGNORECASE)
+
 
 def clean_text(text):
     """Clean text by removing extra spaces, newlines, normalizing whitespace, and removing Unicode control characters"""
@@ -26,15 +53,14 @@ def clean_text(text):
     text = text.replace('\n', ' ').replace('\r', ' ')
     
     # Replace multiple spaces with single space and strip
-    import re
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE_RE.sub(' ', text)
     
     return text.strip()
 
 
 def try_selectors(soup, selectors, attr=None, regex=None, default=None):
     for selector in selectors:
-        el = soup.select_one(selector)
+        el = select_one(soup, selector)
         if el:
             if attr:
                 val = el.get(attr)
@@ -51,113 +77,116 @@ def try_selectors(soup, selectors, attr=None, regex=None, default=None):
     return default
 
 
+RATING_SELECTORS = SelectorPlan([
+    "span[data-asin-rating]",
+    "span.a-icon-alt",
+    "#acrPopover",
+    ".reviewCountTextLinkedHistogram",
+    "#averageCustomerReviews .a-icon-alt",
+    "#averageCustomerReviews .a-size-base.a-color-base"
+])
+
+
 def try_rating(soup):
-    selectors = [
-        "span[data-asin-rating]",
-        "span.a-icon-alt",
-        "#acrPopover",
-        ".reviewCountTextLinkedHistogram",
-        "#averageCustomerReviews .a-icon-alt",
-        "#averageCustomerReviews .a-size-base.a-color-base"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            # Try aria-label first
-            aria = el.get('aria-label')
-            if aria:
-                return clean_text(aria)
-            txt = el.get_text(strip=True)
-            if txt:
-                return clean_text(txt)
+    for el in RATING_SELECTORS.first_matches(soup):
+        # Try aria-label first
+        aria = el.get('aria-label')
+        if aria:
+            return clean_text(aria)
+        txt = el.get_text(strip=True)
+        if txt:
+            return clean_text(txt)
     return None
 
 
+PRICE_SELECTORS = SelectorPlan([
+    ".a-price .a-offscreen",
+    "#priceblock_ourprice",
+    "#priceblock_dealprice",
+    "#priceblock_saleprice",
+    "#priceblock_vatprice",
+    "#priceblock_businessprice",
+    "#corePriceDisplay_desktop_feature_div .a-offscreen",
+    ".apexPriceToPay .a-offscreen",
+    ".a-price-whole"
+])
+
+
 def try_price(soup):
-    selectors = [
-        ".a-price .a-offscreen",
-        "#priceblock_ourprice",
-        "#priceblock_dealprice",
-        "#priceblock_saleprice",
-        "#priceblock_vatprice",
-        "#priceblock_businessprice",
-        "#corePriceDisplay_desktop_feature_div .a-offscreen",
-        ".apexPriceToPay .a-offscreen",
-        ".a-price-whole"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            txt = el.get_text(strip=True)
-            if txt:
-                return clean_text(txt)
+    for el in PRICE_SELECTORS.first_matches(soup):
+        txt = el.get_text(strip=True)
+        if txt:
+            return clean_text(txt)
     return None
 
 
+DEAL_SELECTORS = SelectorPlan([
+    ".dealBadge",
+    ".savingsPercentage",
+    ".a-size-medium.a-color-price.savingPriceOverride.aok-align-center.reinventPriceSavingsPercentageMargin.savingsPercentage",
+    ".a-size-medium.a-color-success",
+    ".a-size-base.a-color-price"
+])
+
+
 def try_deal(soup):
-    selectors = [
-        ".dealBadge",
-        ".savingsPercentage",
-        ".a-size-medium.a-color-price.savingPriceOverride.aok-align-center.reinventPriceSavingsPercentageMargin.savingsPercentage",
-        ".a-size-medium.a-color-success",
-        ".a-size-base.a-color-price"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            txt = el.get_text(strip=True)
-            if txt:
-                return clean_text(txt)
+    for el in DEAL_SELECTORS.first_matches(soup):
+        txt = el.get_text(strip=True)
+        if txt:
+            return clean_text(txt)
     return None
 
 
+MAIN_IMAGE_SELECTORS = [
+    ("#landingImage", "data-old-hires"),
+    ("#imgTagWrapperId img", "data-old-hires"),
+    ("#imgTagWrapperId img", "src"),
+    ("#imageBlock img[data-old-hires]", "data-old-hires"),
+    ("#main-image-container img", "src"),
+    ("#main-image", "src"),
+    ("#imgBlkFront", "src"),
+    ("#ebooksImgBlkFront", "src"),
+    ("#img-canvas img", "src"),
+    ("#ivLargeImage img", "src"),
+    ("#imgTagWrapperId img", "data-a-dynamic-image")
+]
+MAIN_IMAGE_PLAN = SelectorPlan(selector for selector, _ in MAIN_IMAGE_SELECTORS)
+
+
 def try_main_image(soup):
-    selectors = [
-        ("#landingImage", "data-old-hires"),
-        ("#imgTagWrapperId img", "data-old-hires"),
-        ("#imgTagWrapperId img", "src"),
-        ("#imageBlock img[data-old-hires]", "data-old-hires"),
-        ("#main-image-container img", "src"),
-        ("#main-image", "src"),
-        ("#imgBlkFront", "src"),
-        ("#ebooksImgBlkFront", "src"),
-        ("#img-canvas img", "src"),
-        ("#ivLargeImage img", "src"),
-        ("#imgTagWrapperId img", "data-a-dynamic-image")
-    ]
-    for selector, attr in selectors:
-        el = soup.select_one(selector)
-        if el:
-            val = el.get(attr)
-            if val:
-                # If data-a-dynamic-image, extract first URL
-                if attr == "data-a-dynamic-image":
-                    try:
-                        import ast
-                        img_dict = ast.literal_eval(val)
-                        if isinstance(img_dict, dict):
-                            return list(img_dict.keys())[0]
-                    except Exception:
-                        continue
-                else:
-                    return val
+    for (selector, attr), elements in zip(MAIN_IMAGE_SELECTORS, MAIN_IMAGE_PLAN.matches(soup)):
+        if not elements:
+            continue
+        val = elements[0].get(attr)
+        if val:
+            # If data-a-dynamic-image, extract first URL
+            if attr == "data-a-dynamic-image":
+                try:
+                    import ast
+                    img_dict = ast.literal_eval(val)
+                    if isinstance(img_dict, dict):
+                        return list(img_dict.keys())[0]
+                except Exception:
+                    continue
+            else:
+                return val
     return None
 
 
+BRAND_SELECTORS = SelectorPlan([
+    "#bylineInfo",
+    "#brand",
+    ".po-brand .a-span9",
+    ".a-row .a-link-normal",
+    ".a-row .a-size-base"
+])
+
+
 def try_brand(soup):
-    selectors = [
-        "#bylineInfo",
-        "#brand",
-        ".po-brand .a-span9",
-        ".a-row .a-link-normal",
-        ".a-row .a-size-base"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            txt = el.get_text(strip=True)
-            if txt and not txt.lower().startswith("visit the"):
-                return clean_text(txt)
+    for el in BRAND_SELECTORS.first_matches(soup):
+        txt = el.get_text(strip=True)
+        if txt and not txt.lower().startswith("visit the"):
+            return clean_text(txt)
     # Try meta tag
     meta = soup.find("meta", {"name": "brand"})
     if meta and meta.get("content"):
@@ -165,62 +194,69 @@ def try_brand(soup):
     return None
 
 
+TITLE_SELECTORS = SelectorPlan([
+    "#productTitle",
+    "#titleSection .a-size-large",
+    "#ebooksProductTitle",
+    "#item_title",
+    ".product-title-word-break",
+    "#title"
+])
+
+
 def try_title(soup):
-    selectors = [
-        "#productTitle",
-        "#titleSection .a-size-large",
-        "#ebooksProductTitle",
-        "#item_title",
-        ".product-title-word-break",
-        "#title"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            txt = el.get_text(strip=True)
-            if txt:
-                return clean_text(txt)
+    for el in TITLE_SELECTORS.first_matches(soup):
+        txt = el.get_text(strip=True)
+        if txt:
+            return clean_text(txt)
     return None
 
 
+TOTAL_REVIEWS_SELECTORS = SelectorPlan([
+    "#acrCustomerReviewText",
+    "#acrCustomerWriteReviewText",
+    "#reviewSummary .a-size-base",
+    ".reviewCountTextLinkedHistogram",
+    "#averageCustomerReviews .a-size-base"
+])
+
+
 def try_total_reviews(soup):
-    selectors = [
-        "#acrCustomerReviewText",
-        "#acrCustomerWriteReviewText",
-        "#reviewSummary .a-size-base",
-        ".reviewCountTextLinkedHistogram",
-        "#averageCustomerReviews .a-size-base"
-    ]
-    for selector in selectors:
-        el = soup.select_one(selector)
-        if el:
-            txt = el.get_text(strip=True)
-            if txt:
-                return clean_text(txt)
+    for el in TOTAL_REVIEWS_SELECTORS.first_matches(soup):
+        txt = el.get_text(strip=True)
+        if txt:
+            return clean_text(txt)
     return None
 
 
-def scrape_amazon_product(url):
-    # --- Setup Headless Chrome ---
+def setup_driver(lean=False):
+    """Setup headless Chrome driver. With lean=True images, fonts, media and ad/tracking hosts are blocked over CDP."""
     options = Options()
     options.add_argument("--headless")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+    if lean:
+        apply_lean_profile(options)
     driver = webdriver.Chrome(options=options)
-    wait = WebDriverWait(driver, 10)
+    if lean:
+        enable_request_blocking(driver)
+    return driver
 
-    driver.get(url)
-    time.sleep(3)  # Allow JS to load
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+def extract_asin(url):
+    """Extract the ASIN from a /dp/ product URL"""
+    try:
+        return url.split("/dp/")[1].split("/")[0]
+    except Exception:
+        return None
+
 
+def extract_product_fields(soup, url):
+    """Extract the fields available on the initial page load"""
     product = {}
     # ASIN
-    try:
-        product["asin"] = url.split("/dp/")[1].split("/")[0]
-    except Exception:
-        product["asin"] = None
+    product["asin"] = extract_asin(url)
     product["url"] = url
     # Title
     product["title"] = try_title(soup)
@@ -237,24 +273,41 @@ def scrape_amazon_product(url):
     # Main Image
     product["main_image"] = try_main_image(soup)
 
-    # --- About This Item ---
+    return product
+
+
+def extract_offer_fields(soup, url):
+    """Extract only what an offer refresh needs: the price, deal and buy box"""
+    return {
+        "asin": extract_asin(url),
+        "url": url,
+        "title": try_title(soup),
+        "price": try_price(soup),
+        "deal": try_deal(soup),
+        "buybox": extract_buybox(soup),
+    }
+
+
+ABOUT_SELECTORS = SelectorPlan([
+    "#feature-bullets ul li span.a-list-item",
+    "#feature-bullets ul li",
+    "#feature-bullets .a-list-item",
+    "#productOverview_feature_div .a-list-item",
+    "#productOverview_feature_div ul li",
+    "#productOverview_feature_div .a-row",
+    "#aplus_feature_div ul li",
+    "#featurebullets_feature_div ul li",
+    ".a-unordered-list.a-vertical li",
+    "[data-feature-name='featurebullets'] ul li",
+    ".feature .a-list-item"
+])
+
+
+def extract_about_this_item(soup):
+    """Extract the 'About this item' bullet points"""
     about_items = []
-    about_selectors = [
-        "#feature-bullets ul li span.a-list-item",
-        "#feature-bullets ul li",
-        "#feature-bullets .a-list-item",
-        "#productOverview_feature_div .a-list-item",
-        "#productOverview_feature_div ul li",
-        "#productOverview_feature_div .a-row",
-        "#aplus_feature_div ul li",
-        "#featurebullets_feature_div ul li",
-        ".a-unordered-list.a-vertical li",
-        "[data-feature-name='featurebullets'] ul li",
-        ".feature .a-list-item"
-    ]
 
-    for selector in about_selectors:
-        elements = soup.select(selector)
+    for elements in ABOUT_SELECTORS.matches(soup):
         if elements:
             about_items = []
             for li in elements:
@@ -281,16 +334,15 @@ def scrape_amazon_product(url):
                 if about_items:
                     break
 
-    product["about_this_item"] = about_items
+    return about_items
 
-    # --- Buy Box Info (with backups) ---
+
+def extract_buybox(soup):
+    """Extract buybox info, falling back through several backup strategies"""
     buybox = {}
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-    time.sleep(1)
-    soup = BeautifulSoup(driver.page_source, "html.parser")
 
     # Primary buybox area detection
-    buybox_area = soup.select_one("#desktop_buyBox") or soup.select_one("#rightCol") or soup.select_one("#buybox") or soup.select_one("#apex_desktop") or soup.select_one("#newAccordionCaption_feature_div")
+    buybox_area = select_one(soup, "#desktop_buyBox") or select_one(soup, "#rightCol") or select_one(soup, "#buybox") or select_one(soup, "#apex_desktop") or select_one(soup, "#newAccordionCaption_feature_div")
 
     if buybox_area:
         all_text = buybox_area.get_text(separator='|').split('|')
@@ -307,7 +359,7 @@ def scrape_amazon_product(url):
 
     # Backup 1: Enhanced span detection
     if not buybox.get("ships_from") or not buybox.get("sold_by"):
-        buybox_spans = soup.select("#desktop_buyBox span, #rightCol span, #buybox span, #apex_desktop span, #newAccordionCaption_feature_div span")
+        buybox_spans = select(soup, "#desktop_buyBox span, #rightCol span, #buybox span, #apex_desktop span, #newAccordionCaption_feature_div span")
         prev_text = ""
         for span in buybox_spans:
             current_text = clean_text(span.get_text(strip=True)) if span else None
@@ -335,7 +387,7 @@ def scrape_amazon_product(url):
             "a[href*='/s?merchant=']"
         ]
         for selector in seller_link_selectors:
-            seller_link = soup.select_one(selector)
+            seller_link = select_one(soup, selector)
             if seller_link:
                 seller_name = clean_text(seller_link.get_text(strip=True))
                 if seller_name and len(seller_name) > 2:
@@ -344,7 +396,7 @@ def scrape_amazon_product(url):
 
     # Backup 3: Enhanced merchant info detection
     if not buybox.get("sold_by"):
-        merchant_containers = soup.select("#merchant-info, [data-csa-c-type='element'], #tabular-buybox, #buybox-tabular-content")
+        merchant_containers = select(soup, "#merchant-info, [data-csa-c-type='element'], #tabular-buybox, #buybox-tabular-content")
         for container in merchant_containers:
             links = container.select("a")
             for link in links:
@@ -358,14 +410,9 @@ def scrape_amazon_product(url):
 
     # Backup 4: Text pattern matching for ships from
     if not buybox.get("ships_from"):
-        ships_patterns = [
-            r"ships from\s*:?\s*([^,\n\|]+)",
-            r"dispatched from\s*:?\s*([^,\n\|]+)",
-            r"fulfilled by\s*:?\s*([^,\n\|]+)"
-        ]
-        page_text = soup.get_text()
-        for pattern in ships_patterns:
-            match = re.search(pattern, page_text, re.IGNORECASE)
+        page = page_text(soup)
+        for pattern in SHIPS_FROM_PATTERNS:
+            match = page.search(pattern)
             if match:
                 ships_from = clean_text(match.group(1))
                 if ships_from and len(ships_from) > 2:
@@ -374,14 +421,9 @@ def scrape_amazon_product(url):
 
     # Backup 5: Text pattern matching for sold by
     if not buybox.get("sold_by"):
-        sold_patterns = [
-            r"sold by\s*:?\s*([^,\n\|]+)",
-            r"seller\s*:?\s*([^,\n\|]+)",
-            r"merchant\s*:?\s*([^,\n\|]+)"
-        ]
-        page_text = soup.get_text()
-        for pattern in sold_patterns:
-            match = re.search(pattern, page_text, re.IGNORECASE)
+        page = page_text(soup)
+        for pattern in SOLD_BY_PATTERNS:
+            match = page.search(pattern)
             if match:
                 sold_by = clean_text(match.group(1))
                 if sold_by and len(sold_by) > 2 and sold_by.lower() not in ["amazon", "prime"]:
@@ -403,7 +445,7 @@ def scrape_amazon_product(url):
         "[class*='delivery']"
     ]
     for selector in delivery_selectors:
-        delivery_element = soup.select_one(selector)
+        delivery_element = select_one(soup, selector)
         if delivery_element:
             delivery_text = clean_text(delivery_element.get_text(strip=True))
             if delivery_text and ("delivery" in delivery_text.lower() or "free" in delivery_text.lower() or "shipping" in delivery_text.lower()):
@@ -411,7 +453,7 @@ def scrape_amazon_product(url):
                 break
 
     # Backup 7: Enhanced Prime eligibility detection
-    prime_indicators = soup.select("#desktop_buyBox i, #rightCol i, #desktop_buyBox .a-icon, #rightCol .a-icon, #buybox i, #buybox .a-icon, #apex_desktop i, #apex_desktop .a-icon")
+    prime_indicators = select(soup, "#desktop_buyBox i, #rightCol i, #desktop_buyBox .a-icon, #rightCol .a-icon, #buybox i, #buybox .a-icon, #apex_desktop i, #apex_desktop .a-icon")
     for icon in prime_indicators:
         aria_label = icon.get("aria-label", "")
         class_name = " ".join(icon.get("class", []))
@@ -421,7 +463,7 @@ def scrape_amazon_product(url):
 
     # Backup 8: Prime detection via text search
     if not buybox.get("prime_eligible"):
-        prime_text_indicators = soup.find_all(text=re.compile(r'prime', re.IGNORECASE))
+        prime_text_indicators = soup.find_all(text=PRIME_RE)
         for text in prime_text_indicators:
             if text and "prime" in text.lower():
                 parent = text.parent
@@ -451,7 +493,7 @@ def scrape_amazon_product(url):
         "[data-csa-c-type='element'] span"
     ]
     for selector in availability_selectors:
-        availability_element = soup.select_one(selector)
+        availability_element = select_one(soup, selector)
         if availability_element:
             availability_text = clean_text(availability_element.get_text(strip=True))
             if availability_text and any(keyword in availability_text.lower() for keyword in ["in stock", "available", "out of stock", "temporarily unavailable"]):
@@ -465,7 +507,7 @@ def scrape_amazon_product(url):
         "#quantity option:last-child"
     ]
     for selector in quantity_selectors:
-        quantity_element = soup.select_one(selector)
+        quantity_element = select_one(soup, selector)
         if quantity_element:
             if quantity_element.name == "select":
                 options = quantity_element.select("option")
@@ -475,52 +517,89 @@ def scrape_amazon_product(url):
                         buybox["max_quantity"] = int(max_qty)
             break
 
-    product["buybox"] = buybox
+    return buybox
 
-    # --- Child SKU Links (Color/Model Variants) ---
-    product["child_skus"] = []
+
+# Variant lookups shared by the live-driver and parsed-HTML paths
+VARIANT_ITEM_SELECTOR = "li[data-asin][data-csa-c-item-id]"
+VARIANT_LINK_SELECTOR = "#variation_color_name a, #variation_style_name a, [data-dp-url]"
+
+
+def extract_child_skus(driver, product_asin):
+    """Child SKU Links (Color/Model Variants) from the live page"""
+    child_skus = []
     try:
-        dimension_items = driver.find_elements(By.CSS_SELECTOR, "li[data-asin][data-csa-c-item-id]")
+        dimension_items = driver.find_elements(By.CSS_SELECTOR, VARIANT_ITEM_SELECTOR)
         for item in dimension_items:
             try:
                 asin = item.get_attribute("data-asin")
-                if asin and asin != product["asin"]:
+                if asin and asin != product_asin:
                     variant_url = f"https://www.amazon.in/dp/{asin}"
                     variant_info = {"url": variant_url, "asin": asin}
-                    product["child_skus"].append(variant_info)
+                    child_skus.append(variant_info)
             except Exception:
                 continue
         # Fallback: links in variation sections
-        if not product["child_skus"]:
-            variation_links = driver.find_elements(By.CSS_SELECTOR, "#variation_color_name a, #variation_style_name a, [data-dp-url]")
+        if not child_skus:
+            variation_links = driver.find_elements(By.CSS_SELECTOR, VARIANT_LINK_SELECTOR)
             for link in variation_links:
                 try:
                     href = link.get_attribute("href") or link.get_attribute("data-dp-url")
                     if href and "/dp/" in href:
                         asin = href.split("/dp/")[1].split("/")[0]
-                        if asin != product["asin"]:
+                        if asin != product_asin:
                             variant_name = link.get_attribute("title") or link.get_attribute("aria-label") or ""
                             variant_info = {"url": href, "variant_name": variant_name or f"Variant {asin}", "asin": asin}
-                            if not any(sku["asin"] == asin for sku in product["child_skus"]):
-                                product["child_skus"].append(variant_info)
+                            if not any(sku["asin"] == asin for sku in child_skus):
+                                child_skus.append(variant_info)
                 except Exception:
                     continue
     except Exception as e:
         print(f"Error extracting child SKUs: {e}")
 
-    # --- Specs Table ---
+    return child_skus
+
+
+def extract_child_skus_from_soup(soup, url, product_asin):
+    """Same as extract_child_skus, but over parsed HTML instead of a live driver"""
+    child_skus = []
+    for item in select(soup, VARIANT_ITEM_SELECTOR):
+        asin = item.get("data-asin")
+        if asin and asin != product_asin:
+            variant_url = f"https://www.amazon.in/dp/{asin}"
+            variant_info = {"url": variant_url, "asin": asin}
+            child_skus.append(variant_info)
+    # Fallback: links in variation sections
+    if not child_skus:
+        for link in select(soup, VARIANT_LINK_SELECTOR):
+            href = link.get("href") or link.get("data-dp-url")
+            if href and href.startswith("/"):
+                href = urljoin(url, href)
+            if href and "/dp/" in href:
+                asin = href.split("/dp/")[1].split("/")[0]
+                if asin != product_asin:
+                    variant_name = link.get("title") or link.get("aria-label") or ""
+                    variant_info = {"url": href, "variant_name": variant_name or f"Variant {asin}", "asin": asin}
+                    if not any(sku["asin"] == asin for sku in child_skus):
+                        child_skus.append(variant_info)
+    return child_skus
+
+
+def extract_specs(soup):
+    """Extract the specs tables"""
     specs = {}
-    soup = BeautifulSoup(driver.page_source, "html.parser")
     for section in ["#productDetails_techSpec_section_1", "#productDetails_detailBullets_sections1", "#prodDetails"]:
-        for row in soup.select(f"{section} tr"):
+        for row in select(soup, f"{section} tr"):
             key = try_selectors(row, ["th", ".a-text-bold"])
             value = try_selectors(row, ["td:not(.a-text-bold)", "td"])
             if key and value:
                 specs[key] = value
-    product["specs"] = specs
+    return specs
 
-    # --- Product Details Table ---
-    product["product_details"] = {}
+
+def extract_product_details(soup):
+    """Extract the product details table and bullets"""
+    product_details = {}
     try:
         details_selectors = [
             "#productDetails_detailBullets_sections1",
@@ -529,7 +608,7 @@ def scrape_amazon_product(url):
             "#prodDetails"
         ]
         for selector in details_selectors:
-            details_section = soup.select_one(selector)
+            details_section = select_one(soup, selector)
             if details_section:
                 detail_items = details_section.select("li")
                 for item in detail_items:
@@ -540,14 +619,14 @@ def scrape_amazon_product(url):
                             key = clean_text(parts[0])
                             value = clean_text(parts[1])
                             if key and value:
-                                product["product_details"][key] = value
+                                product_details[key] = value
                     else:
                         spans = item.select("span")
                         if len(spans) >= 2:
                             key = clean_text(spans[0].get_text(strip=True))
                             value = clean_text(spans[1].get_text(strip=True))
                             if key and value and key != value:
-                                product["product_details"][key] = value
+                                product_details[key] = value
                 for row in details_section.select("tr"):
                     key_elem = row.select_one("th, .a-text-bold")
                     value_elem = row.select_one("td:not(.a-text-bold), td")
@@ -555,13 +634,17 @@ def scrape_amazon_product(url):
                         key = clean_text(key_elem.get_text(strip=True)).replace(":", "")
                         value = clean_text(value_elem.get_text(strip=True))
                         if key and value:
-                            product["product_details"][key] = value
+                            product_details[key] = value
                 break
     except Exception as e:
         print(f"Error extracting product details: {e}")
 
-    # --- From the Manufacturer ---
-    product["from_manufacturer"] = {}
+    return product_details
+
+
+def extract_from_manufacturer(soup):
+    """Extract 'From the Manufacturer' headings and their content"""
+    from_manufacturer = {}
     aplus_selectors = [
         "#aplus_feature_div",
         "[data-aplus-module]",
@@ -569,7 +652,7 @@ def scrape_amazon_product(url):
         "#aplus3p_feature_div"
     ]
     for selector in aplus_selectors:
-        aplus_section = soup.select_one(selector)
+        aplus_section = select_one(soup, selector)
         if aplus_section:
             headings = aplus_section.find_all(['h1', 'h2', 'h3', 'h4', 'h5'])
             for heading in headings:
@@ -584,10 +667,112 @@ def scrape_amazon_product(url):
                                 content.append(text)
                         next_elem = next_elem.find_next_sibling()
                     if content:
-                        product["from_manufacturer"][heading_text] = content
+                        from_manufacturer[heading_text] = content
             break
 
-    driver.quit()
+    return from_manufacturer
+
+
+def extract_product(soup, url):
+    """Extract a full product record from parsed HTML, without a browser"""
+    product = extract_product_fields(soup, url)
+    product["about_this_item"] = extract_about_this_item(soup)
+    product["buybox"] = extract_buybox(soup)
+    product["child_skus"] = extract_child_skus_from_soup(soup, url, product["asin"])
+    product["specs"] = extract_specs(soup)
+    product["product_details"] = extract_product_details(soup)
+    product["from_manufacturer"] = extract_from_manufacturer(soup)
+    return product
+
+
+def extract_product_from_html(html, url, parser=None):
+    """Parse a raw product page (e.g. fetched over plain HTTP) into a product record"""
+    return extract_product(make_soup(html, parser), url)
+
+
+def scrape_amazon_product(url, driver=None, network_stats=None, wait_log=None, cache=None, sections=None,
+                          offer_only=False):
+    """Scrape a product page. Pass `driver` to reuse a pooled browser; it is left open.
+
+    If `network_stats` (a lean_profile.NetworkStats) is given, the page's bytes
+    transferred and load timings are recorded into it. Time spent waiting on each
+    page section is recorded into `wait_log` (a page_readiness.WaitLog).
+    With an html_cache.HtmlCache, a fresh cached copy of the page is parsed
+    instead of loading it, and pages loaded in the browser are stored.
+    With `sections`, only those page_readiness sections are waited for. With
+    `offer_only`, only the offer fields are read, from the first screen of the page.
+    """
+    html = cache.get(url) if cache else None
+    if html:
+        return extract_product_from_html(html, url)
+
+    # --- Setup Headless Chrome (unless one was borrowed from a pool) ---
+    owns_driver = driver is None
+    if owns_driver:
+        driver = setup_driver()
+    wait = WebDriverWait(driver, 10)
+
+    profile = network_stats.before_page(driver) if network_stats else None
+    driver.get(url)
+    # Give up on robot checks and error pages before waiting for sections they will never have
+    blocked = check_page(driver)
+    if blocked:
+        if owns_driver:
+            driver.quit()
+        raise BlockedPage(blocked)
+    # Wait for the elements the first-pass extractors need instead of a fixed sleep
+    timings = wait_for_sections(driver, ["title", "price"], only=sections)
+    if network_stats:
+        network_stats.after_page(driver, url, profile)
+
+    if offer_only:
+        # A city's offer refresh: the price and buy box are on the first screen, so no
+        # scrolling, variant lookups or content extractors. The page is not cached, as
+        # its lazily loaded sections never rendered.
+        wait_for_sections(driver, ["buybox"], timings, only=sections)
+        snapshot = DomSnapshot(driver)
+        product = extract_offer_fields(snapshot.soup, url)
+        if wait_log:
+            wait_log.record(url, timings, snapshot.stats)
+        if owns_driver:
+            driver.quit()
+        return product
+
+    # Parse the full page once; later passes only re-parse lazily loaded sections
+    snapshot = DomSnapshot(driver)
+    soup = snapshot.soup
+
+    product = extract_product_fields(soup, url)
+
+    # --- About This Item ---
+    product["about_this_item"] = extract_about_this_item(soup)
+
+    # --- Buy Box Info (with backups) ---
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+    wait_for_sections(driver, ["buybox"], timings, only=sections)
+    soup = snapshot.refresh(["buybox"])
+    product["buybox"] = extract_buybox(soup)
+
+    # --- Child SKU Links (Color/Model Variants) ---
+    product["child_skus"] = extract_child_skus(driver, product["asin"])
+
+    # --- Specs Table ---
+    soup = snapshot.refresh(["details", "aplus"])
+    product["specs"] = extract_specs(soup)
+
+    # --- Product Details Table ---
+    product["product_details"] = extract_product_details(soup)
+
+    # --- From the Manufacturer ---
+    product["from_manufacturer"] = extract_from_manufacturer(soup)
+
+    if wait_log:
+        wait_log.record(url, timings, snapshot.stats)
+    if cache and (product.get("title") or product.get("price")):
+        cache.put(url, driver.page_source, source="browser")
+
+    if owns_driver:
+        driver.quit()
     return product
 
 
@@ -10,10 +10,19 @@ from selenium.webdriver.chrome.options import Options
 import time
 import json
 import re
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from location import LocationSessions
+from search_pages import SearchPages, product_urls_from_driver
+
+# Delivery location cookies, shared with scraping_all_products_data.py
+LOCATION_COOKIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "location_cookies.json")
 
 
 class AmazonUKScraper:
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, direct_pages=True):
         """Initialize the Amazon UK scraper with Chrome driver"""
         self.options = Options()
         if headless:
@@ -26,6 +35,10 @@ class AmazonUKScraper:
             options=self.options
         )
         self.wait = WebDriverWait(self.driver, 15)
+        self.locations = LocationSessions(LOCATION_COOKIES)
+        self.postcode = None  # delivery postcode pinned by set_location
+        # Fetch result pages by URL, falling back to clicking "Next" in the browser
+        self.pages = SearchPages("amazon.co.uk", lang="en-GB") if direct_pages else None
         
     def setup_amazon(self):
         """Navigate to Amazon UK homepage and handle bot checks"""
@@ -44,94 +57,14 @@ class AmazonUKScraper:
             print("No cookies banner detected.")
     
     def set_location(self, postcode, location_name):
-        """Set the delivery location using UK postcode"""
+        """Set the delivery location using UK postcode, reusing the cookies of an earlier run while fresh"""
         print(f"📍 Setting location to {location_name} ({postcode})...")
-        
-        try:
-            # Click the "Deliver to" location box
-            location_selectors = [
-                "#nav-global-location-popover-link",
-                "#glow-ingress-block",
-                "[data-csa-c-content-id='nav_youraccount_btn']",
-                "#nav-global-location-slot"
-            ]
-            
-            location_button = None
-            for selector in location_selectors:
-                try:
-                    location_button = self.wait.until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                    )
-                    break
-                except:
-                    continue
-            
-            if not location_button:
-                raise Exception("Could not find location button")
-            
-            location_button.click()
-            time.sleep(2)
-
-            # Wait for the postcode input field to appear (UK has a single input field)
-            postcode_selectors = [
-                "input[name='GLUXZipUpdateInput']",
-                "#GLUXZipUpdateInput",
-                "input[placeholder*='postcode']",
-                "input[aria-label*='postcode']"
-            ]
-            
-            postcode_input = None
-            for selector in postcode_selectors:
-                try:
-                    postcode_input = self.wait.until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    break
-                except:
-                    continue
-            
-            if not postcode_input:
-                raise Exception("Could not find postcode input field")
-
-            postcode_input.clear()
-            postcode_input.send_keys(postcode)
-            time.sleep(1)
-
-            # Click Apply button
-            apply_selectors = [
-                "span#GLUXZipUpdate .a-button-input",
-                "#GLUXZipUpdate input[type='submit']",
-                "input[aria-labelledby='GLUXZipUpdate-announce']",
-                ".a-popover-footer .a-button-primary input"
-            ]
-            
-            apply_btn = None
-            for selector in apply_selectors:
-                try:
-                    apply_btn = self.wait.until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                    )
-                    break
-                except:
-                    continue
-            
-            if not apply_btn:
-                raise Exception("Could not find Apply button")
-            
-            apply_btn.click()
-
-            # Wait for location to update
-            time.sleep(3)
-            
-            # Optional: Refresh to ensure location is set
-            self.driver.refresh()
-            time.sleep(2)
-            
+        self.postcode = None
+        if self.locations.pin(self.driver, "https://www.amazon.co.uk/", postcode):
+            self.postcode = postcode
+            self.driver.refresh()  # the injected cookies apply from the next page load
             print(f"✅ Location set to {location_name}")
-
-        except Exception as e:
-            print(f"❌ Error setting location: {e}")
-            # Try to continue without failing completely
+        else:
             print("⚠️ Continuing without location setting...")
     
     def search_products(self, search_term):
@@ -161,38 +94,9 @@ class AmazonUKScraper:
                 EC.presence_of_element_located((By.CSS_SELECTOR, '[data-component-type="s-search-result"]'))
             )
             
-            # Multiple selectors to find product links
-            product_selectors = [
-                'a.a-link-normal.s-no-outline',
-                'h2.a-size-mini a',
-                '[data-component-type="s-search-result"] h2 a',
-                '.s-result-item h2 a',
-                'a[href*="/dp/"]'
-            ]
-            
-            page_urls = set()
-            
-            for selector in product_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for elem in elements:
-                        href = elem.get_attribute("href")
-                        if href:
-                            # Normalize relative URLs
-                            if href.startswith("/"):
-                                full_url = "https://www.amazon.co.uk" + href
-                            else:
-                                full_url = href
-
-                            # Accept only product links from amazon.co.uk
-                            if "amazon.co.uk" in full_url and \
-                            ("/dp/" in full_url or "/gp/product/" in full_url) and \
-                            "/sspa/" not in full_url and \
-                            not full_url.startswith("https://aax-"):
-                                page_urls.add(full_url)
-                except Exception:
-                    continue
-            
+            # All candidate links and result ASINs come back from a single script call
+            page_urls, saved = product_urls_from_driver(self.driver, "amazon.co.uk")
+            print(f"   🔗 Read {len(page_urls)} product URLs in one call ({saved} WebDriver round trips saved)")
             return page_urls
             
         except Exception as e:
@@ -301,13 +205,20 @@ class AmazonUKScraper:
         print(f"\nStarting scrape for: {search_term}")
         print(f"Target: {max_products} URLs")
         
-        # Search for the category
-        self.search_products(search_term)
-        
         product_links = set()
         page_num = 1
+        if self.pages:
+            cookies = self.locations.request_cookies("https://www.amazon.co.uk/", self.postcode) if self.postcode else None
+            product_links, page_num = self.pages.collect(search_term, max_products, cookies)
+        
+        # Search for the category, or carry on from the first page that could not be fetched directly
+        if page_num == 1:
+            self.search_products(search_term)
+        elif page_num:
+            print(f"   ➡️ Continuing from page {page_num} in the browser...")
+            self.driver.get(self.pages.url(search_term, page_num))
         
-        while len(product_links) < max_products:
+        while page_num and len(product_links) < max_products:
             print(f" Scraping page {page_num}...")
             
             # Extract URLs from current page
@@ -1,86 +1,380 @@
 import json
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from scraper import scrape_amazon_product  # Make sure this exists and works
-import random
-import time
+import sys
+from scraper import scrape_amazon_product, extract_product_from_html, setup_driver, get_domain_info  # Make sure this exists and works
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver_pool import DriverPool
+from http_fetch import HttpFetcher, fetch_product
+from html_cache import HtmlCache, format_cache
+from location import LocationSessions, format_locations
+from failures import BOT_WALL, BlockedPage, Failure, RetryQueue, classify_exception, classify_page, failure_kind, format_retries
+from journal import ScrapeJournal
+from freshness import RefreshPlanner, format_freshness, merge_freshness
+from output_stream import ProductStream, convert, stream_path
+from lean_profile import NetworkStats
+from page_readiness import WaitLog, format_timings
+from scrape_plan import ScrapePlan
+from pipeline import WorkPipeline, format_utilisation
+from rate_limit import RateController, format_rates
 
 # ---------- SETTINGS ----------
 INPUT_FILE = "amazon_usa_products.json"
+CITIES = ["new york"]  # Any of: New York, Washington DC, San Francisco, Austin
 OUTPUT_FOLDER = "scraped_output"
+STREAM_OUTPUT = False  # Also write <city>.jsonl line by line as products arrive; <city>.json is rebuilt from it
 MAX_WORKERS = 3  # Number of threads in parallel
+RESUME = True  # Reuse products already saved in the scrape journal; False starts a fresh journal
+FRESHNESS_HOURS = {}  # Per-field-group overrides of freshness.FRESHNESS_HOURS, e.g. {"offer": 6}
+CITY_OFFERS = True  # Scrape each product in full once, plus an offer pass (price, deal, buy box) per extra city
+PIN_LOCATION = True  # Scrape each city with its delivery postcode; the postcode flow runs once per city and day
+RETRY_POLICIES = {}  # Per-failure overrides of failures.RETRY_POLICIES, e.g. {"bot wall": {"retries": 5}}
+UTILISATION_SAMPLE_SECONDS = 30  # Interval for the worker utilisation timeline in the run log
+MAX_PAGES_PER_DRIVER = 50  # Recycle a browser after this many product pages
+MAX_DRIVER_RSS_MB = 1500  # ...or once its processes use this much memory (needs psutil)
+HTTP_FIRST = True  # Try a plain HTTP fetch before falling back to Selenium
+HTTP_LANG = "en-US"
+LEAN_BROWSER = False  # Block images, fonts, media and ad/tracking hosts in Chrome
+LEAN_BASELINE_EVERY = 20  # With LEAN_BROWSER, load every Nth page unblocked to measure savings
+RATE_LIMITS = {}  # Per-marketplace overrides of rate_limit.RATE_LIMITS, e.g. {"amazon.com": {"max_rate": 1.0}}
+HTML_CACHE_HOURS = 24  # Reuse product pages fetched within this many hours; 0 disables the page cache
+HTML_CACHE_MAX_MB = 2048  # Least recently used pages are evicted beyond this size
+HTML_CACHE_RETAIN_DAYS = 30  # Keep pages this long for reextract.py, size limit permitting
 # ------------------------------
 
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+# Paths are relative to this folder, so the script also works when loaded by run_scrape.py
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(BASE_DIR, OUTPUT_FOLDER)
+JOURNAL_PATH = os.path.join(OUTPUT_DIR, "scrape_journal.jsonl")
+HTML_CACHE_DIR = os.path.join(BASE_DIR, "html_cache")
+LOCATION_COOKIES = os.path.join(BASE_DIR, "location_cookies.json")  # shared with the get_*_product_urls.py script
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+def create_driver_pool(size=MAX_WORKERS, budget=None):
+    return DriverPool(
+        factory=lambda: setup_driver(get_domain_info("https://www.amazon.com/"), lean=LEAN_BROWSER),
+        size=size,
+        max_pages=MAX_PAGES_PER_DRIVER,
+        max_rss_mb=MAX_DRIVER_RSS_MB,
+        budget=budget,
+    )
+
+def scrape_with_browser(url, pool, network_stats=None, wait_log=None, rates=None, cache=None, sections=None,
+                        locations=None, postcode=None, offer_only=False):
+    # A fresh cached page needs neither a rate limit slot nor a browser
+    html = cache.get(url) if cache else None
+    if html:
+        return extract_product_from_html(html, url)
+    if rates:
+        rates.wait(url)
+    with pool.driver() as driver:
+        # A driver left with another city's cookies is reset to the default location if the postcode fails
+        if locations and postcode and not locations.pin(driver, url, postcode):
+            cache = cache.at("") if cache else None
+        try:
+            product = scrape_amazon_product(url, driver=driver, network_stats=network_stats, wait_log=wait_log,
+                                            cache=cache, sections=sections, offer_only=offer_only)
+        except BlockedPage as e:
+            print(f"🚫 {e.kind} page for {url}")
+            product = Failure(e.kind, "detected on first load")
+        if not is_successful(product) and not isinstance(product, Failure):
+            # An empty page may still be a robot check or a 404 rather than a sparse listing
+            kind = classify_page(driver.page_source)
+            if kind:
+                product = Failure(kind)
+    if rates:
+        if is_successful(product):
+            rates.report(url, "ok")
+        elif failure_kind(product) == BOT_WALL:
+            rates.report(url, "blocked")
+    return product
 
-def scrape_url_safe(url):
+def scrape_url_safe(url, pool, fetcher=None, network_stats=None, wait_log=None, rates=None, cache=None,
+                    locations=None, refresh=None, postcode=None):
+    """Scrape one product; with a freshness.Refresh, only what its stale field groups need.
+
+    With a `postcode`, the page is scraped for that delivery location (see location.py).
+    """
+    sections, offer_only = None, False
+    # A full scrape includes the offer, so it never reuses a page older than the offer freshness policy
+    max_age = merge_freshness(FRESHNESS_HOURS)["offer"] * 3600
+    if refresh:
+        sections, offer_only = refresh.sections, refresh.offer_only
+        max_age = refresh.max_age
+    cache = cache.within(max_age) if cache else None
+    cookies = None
+    pinned = bool(locations and postcode)
+    if pinned and locations.has_failed(url, postcode):
+        pinned = False  # the postcode cannot be set this run: default location, over HTTP where possible
+    if pinned:
+        cache = cache.at(postcode) if cache else None
+        # Until a browser has run the postcode flow there are no cookies to send over HTTP
+        cookies = locations.request_cookies(url, postcode)
     try:
-        return scrape_amazon_product(url)
+        browser = lambda u: scrape_with_browser(u, pool, network_stats, wait_log, rates, cache, sections, locations,
+                                                postcode, offer_only)
+        if fetcher and (refresh is None or refresh.static) and (cookies or not pinned):
+            product = fetch_product(url, fetcher, extract_product_from_html, browser, cache=cache, cookies=cookies)
+        else:
+            product = browser(url)
     except Exception as e:
         print(f"❌ Error scraping {url}: {e}")
-        return None
-
-def scrape_city(city_data):
-    city_name = city_data["location"]
-    print(f"\n📍 Starting scrape for: {city_name}")
-    city_result = {}
-    scrape_log = []
-    sc = 0
-    fc = 0
-
-    for category, category_data in city_data["categories"].items():
-        print(f"\n  🧵 Scraping category: {category}")
-        urls = category_data["urls"]
-        category_results = []
-
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            future_to_url = {executor.submit(scrape_url_safe, url): url for url in urls}
-            for i, future in enumerate(as_completed(future_to_url), 1):
-                url = future_to_url[future]
-                result = future.result()
-                main_fields = [
-                    result.get('title') if isinstance(result, dict) else None,
-                    result.get('price') if isinstance(result, dict) else None
-                ]
-                if result and any(field not in [None, '', []] for field in main_fields):
-                    category_results.append(result)
-                    print(f"    [{i}/{len(urls)}] SUCCESS: {url[:80]}...")
-                    scrape_log.append(f"{i}. SUCCESS: {url}")
-                    sc += 1
-                else:
-                    print(f"    [{i}/{len(urls)}] FAILED: {url[:80]}... | All main fields None or Empty")
-                    scrape_log.append(f"{i}. FAILED: {url}")
-                    fc += 1
-                    # Rate limit avoidance system cuz we are cool like that
-                time.sleep(random.uniform(2, 7))
-
-        city_result[category] = category_results
-        print(f"  ✅ Finished {category}: {len(category_results)}/{len(urls)} successfully scraped.")
+        return Failure(classify_exception(e), str(e))
+    if locations and postcode and locations.has_failed(url, postcode):
+        locations.mark_unpinned(url, postcode)
+    return product
+
+def is_successful(result):
+    main_fields = [
+        result.get('title') if isinstance(result, dict) else None,
+        result.get('price') if isinstance(result, dict) else None
+    ]
+    return bool(result) and any(field not in [None, '', []] for field in main_fields)
+
+def scrape_unique_products(plan, pool, fetcher=None, network_stats=None, wait_log=None, rates=None, journal=None,
+                           stream=None, cache=None, locations=None):
+    """Scrape every unique product in the plan once on one pipeline for the whole run.
+
+    Products with a successful record in `journal` are reused while their
+    fields are within FRESHNESS_HOURS; only the stale field groups of the
+    others are refreshed, and a product whose refresh fails keeps its old
+    fields. The plan's city offer passes (see CITY_OFFERS) only scrape and
+    keep the offer fields. With `locations` (see PIN_LOCATION), each product
+    is scraped for the postcode of the city it is scraped for. Every new outcome is written to the journal as
+    soon as it completes, and every completed listing to `stream` (a
+    ProductStream). Failures are retried after the main pass as their
+    RETRY_POLICIES allow.
+    Returns ({plan key: product or None}, worker utilisation summary, retry summary, freshness summary).
+    """
+    targets = plan.targets
+    planner = RefreshPlanner(FRESHNESS_HOURS)
+    results, refreshes = planner.plan(journal, targets, plan.offers, plan.city_for)
+    if stream:
+        for key in results:
+            if key not in plan.offers:  # a product's listings include those joined with its city offers
+                stream.add_completed(key, results)
+    pending = [key for key in targets if key not in results]
+    if results or refreshes:
+        print(f"  ↩️ Resuming: {len(results)} products current in the journal, {len(refreshes)} to refresh, "
+              f"{len(pending) - len(refreshes)} left to scrape")
+    pipeline = WorkPipeline(
+        lambda key: scrape_url_safe(targets[key], pool, fetcher, network_stats, wait_log, rates, cache, locations,
+                                    refreshes.get(key), plan.postcode_for(key)),
+        workers=MAX_WORKERS,
+        sample_every=UTILISATION_SAMPLE_SECONDS,
+    )
+    retries = RetryQueue(RETRY_POLICIES)
+
+    def collect(keys):
+        for i, (key, result) in enumerate(pipeline.run(keys), 1):
+            refresh = refreshes.get(key)
+            if is_successful(result):
+                results[key] = refresh.merge(result) if refresh else result
+                retries.succeeded(key)
+                print(f"    [{i}/{len(keys)}] SUCCESS: {targets[key]}")
+            else:
+                results[key] = None
+                kind = failure_kind(result)
+                delay = retries.defer(key, kind)
+                retry = f"retry queued ({delay}s backoff)" if delay is not None else "giving up"
+                print(f"    [{i}/{len(keys)}] FAILED: {targets[key]} | {kind}, {retry}")
+            if journal and (results[key] or not refresh):  # a failed refresh leaves the old record in place
+                fields_at = None
+                if results[key]:
+                    fields_at = planner.fields_at(journal, key, refresh, plan.city_for(key), result)
+                journal.record(key, targets[key], results[key], fields_at)
+            if stream and results[key]:
+                stream.add_completed(key, results)
+
+    collect(pending)
+    for batch in retries.rounds():
+        print(f"  🔁 Retrying {len(batch)} failed products")
+        collect(batch)
+    for key, refresh in refreshes.items():
+        planner.finished(refresh, results[key] is not None)
+        if results[key] is None and refresh.previous:
+            results[key] = refresh.previous
+            if stream:
+                stream.add_completed(key, results)
+    return results, pipeline.utilisation.summary(), retries.summary(), planner.summary()
+
+def open_resources(workers=None, budget=None):
+    """Driver pool, HTTP fetcher, rate limits, page cache, location cookies and per-page stats shared by a run.
+
+    The driver pool and HTTP sessions are sized for `workers` threads (default: MAX_WORKERS). With a
+    driver_pool.BrowserBudget, the pool's browsers also count against a limit shared with other countries.
+    """
+    workers = workers or MAX_WORKERS
+    pool = create_driver_pool(workers, budget)
+    rates = RateController(RATE_LIMITS)
+    cache = None
+    if HTML_CACHE_HOURS:
+        cache = HtmlCache(HTML_CACHE_DIR, ttl=HTML_CACHE_HOURS * 3600, max_mb=HTML_CACHE_MAX_MB,
+                          retain=HTML_CACHE_RETAIN_DAYS * 24 * 3600)
+    fetcher = HttpFetcher(lang=HTTP_LANG, pool_size=workers, rates=rates) if HTTP_FIRST else None
+    network_stats = NetworkStats(baseline_every=LEAN_BASELINE_EVERY) if LEAN_BROWSER else None
+    wait_log = WaitLog()
+    locations = LocationSessions(LOCATION_COOKIES) if PIN_LOCATION else None
+    return pool, fetcher, network_stats, wait_log, rates, cache, locations
 
+def open_journal():
+    return ScrapeJournal(JOURNAL_PATH, resume=RESUME)
+
+def open_stream(plan):
+    return ProductStream(OUTPUT_DIR, plan) if STREAM_OUTPUT else None
+
+def plan_cities(cities_data):
+    plan = ScrapePlan.from_cities(cities_data, city_offers=CITY_OFFERS)
+    summary = plan.summary()
+    city_names = ", ".join(city_data["location"] for city_data in cities_data)
+    print(f"\n📍 Starting scrape for: {city_names}")
+    print(f"  🧮 {summary['total_urls']} URLs -> {summary['unique_products']} unique products "
+          f"(dedupe ratio {summary['dedupe_ratio']:.2f}x)")
+    if summary["offer_passes"]:
+        print(f"  🏷️ {summary['offer_passes']} offer passes for products listed in more than one city")
+    return plan
+
+def scrape_cities(cities_data):
+    plan = plan_cities(cities_data)
+    pool, fetcher, network_stats, wait_log, rates, cache, locations = open_resources()
+    journal = open_journal()
+    stream = open_stream(plan)
+    try:
+        results, utilisation, retries, freshness = scrape_unique_products(plan, pool, fetcher, network_stats,
+                                                                          wait_log, rates, journal, stream, cache,
+                                                                          locations)
+    finally:
+        pool.close()
+        journal.close()
+        if stream:
+            stream.close()
+    write_results(cities_data, plan, results, fetcher, network_stats, wait_log, utilisation, rates, retries, cache,
+                  freshness, locations)
+
+def write_results(cities_data, plan, results, fetcher=None, network_stats=None, wait_log=None, utilisation=None,
+                  rates=None, retries=None, cache=None, freshness=None, locations=None):
+    """Fan each product back out to every city/category that listed it, then save"""
+    summary = plan.summary()
+    city_results = {}
+    for city_data in cities_data:
+        city_results[city_data["location"]] = {
+            "result": {category: [] for category in city_data["categories"]},
+            "log": [],
+            "counts": {},
+            "succeeded": {},  # per category, as streamed products never reach "result"
+            "sc": 0,
+            "fc": 0,
+        }
+    for city_name, category, url, product in plan.fan_out(results):
+        city = city_results[city_name]
+        i = city["counts"][category] = city["counts"].get(category, 0) + 1
+        if product:
+            if not STREAM_OUTPUT:  # streamed products are read back from <city>.jsonl instead
+                city["result"][category].append(product)
+            city["log"].append(f"{i}. SUCCESS: {url}")
+            city["succeeded"][category] = city["succeeded"].get(category, 0) + 1
+            city["sc"] += 1
+        else:
+            city["log"].append(f"{i}. FAILED: {url}")
+            city["fc"] += 1
+
+    for city_name, city in city_results.items():
+        for category in city["result"]:
+            print(f"  ✅ {city_name} / {category}: {city['succeeded'].get(category, 0)}/"
+                  f"{city['counts'].get(category, 0)} successfully scraped.")
+        write_city_output(city_name, city["result"], city["log"], city["sc"], city["fc"], summary)
+    write_run_log(summary, fetcher, network_stats, wait_log or WaitLog(), utilisation, rates, retries, cache,
+                  freshness, locations)
+
+def write_city_output(city_name, city_result, scrape_log, sc, fc, plan_summary):
     # Save per-city JSON file
-    output_path = os.path.join(OUTPUT_FOLDER, f"{city_name.lower()}.json")
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(city_result, f, indent=2, ensure_ascii=False)
+    output_path = os.path.join(OUTPUT_DIR, f"{city_name.lower()}.json")
+    if STREAM_OUTPUT:
+        convert(stream_path(OUTPUT_DIR, city_name), output_path, categories=list(city_result))
+    else:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(city_result, f, indent=2, ensure_ascii=False)
     print(f"\n✅ Done with {city_name}. Saved to {output_path}\n")
     # Log file with results
-    log_path = os.path.join(OUTPUT_FOLDER, f"{city_name.lower()}_scrape_log.txt")
+    log_path = os.path.join(OUTPUT_DIR, f"{city_name.lower()}_scrape_log.txt")
     with open(log_path, "w", encoding="utf-8") as f:
         for line in scrape_log:
             f.write(line + "\n")
         f.write(f"\nTotal URLs: {len(scrape_log)}\n")
         f.write(f"Total succeeded: {sc}\n")
         f.write(f"Total failed: {fc}\n")
+        f.write(f"Unique products scraped this run: {plan_summary['unique_products']} "
+                f"for {plan_summary['total_urls']} URLs (dedupe ratio {plan_summary['dedupe_ratio']:.2f}x)\n")
     print(f"Scrape log saved to {log_path}")
 
-def main():
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+def write_run_log(plan_summary, fetcher, network_stats, wait_log, utilisation=None, rates=None, retries=None,
+                  cache=None, freshness=None, locations=None):
+    """Fetch tiers, freshness, delivery locations, page cache use, network savings, section waits, DOM parsing,
+    utilisation, rates and retries"""
+    log_path = os.path.join(OUTPUT_DIR, "run_scrape_log.txt")
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write(f"Input URLs: {plan_summary['total_urls']}\n")
+        f.write(f"Unique products: {plan_summary['unique_products']}\n")
+        f.write(f"Duplicates skipped: {plan_summary['duplicates']}\n")
+        f.write(f"Dedupe ratio: {plan_summary['dedupe_ratio']:.2f}x\n")
+        if plan_summary["offer_passes"]:
+            f.write(f"City offer passes: {plan_summary['offer_passes']}\n")
+        if freshness and format_freshness(freshness):
+            f.write("\n" + "\n".join(format_freshness(freshness)) + "\n")
+        if locations:
+            f.write("\n" + "\n".join(format_locations(locations.summary())) + "\n")
+        if utilisation:
+            f.write("\n" + "\n".join(format_utilisation(utilisation)) + "\n\n")
+        if rates:
+            f.write("\n".join(format_rates(rates.summary())) + "\n\n")
+        if retries:
+            f.write("\n".join(format_retries(retries)) + "\n\n")
+        if cache:
+            f.write("\n".join(format_cache(cache.summary())) + "\n\n")
+        if fetcher:
+            tiers = fetcher.summary()
+            f.write(f"Served over HTTP: {tiers['http']}/{tiers['total']} ({tiers['http_fraction']:.0%})\n")
+            f.write(f"Served from the page cache: {tiers['cache']}\n")
+            for reason, count in tiers["escalation_reasons"].items():
+                f.write(f"Escalated to Selenium ({reason}): {count}\n")
+            f.write("\nFetch tier per URL:\n")
+            for d in fetcher.decisions:
+                f.write(f"{d['tier']}: {d['url']} ({d['reason']})\n")
+        if network_stats:
+            net = network_stats.summary()
+            f.write(f"\nLean browser pages: {net['lean_pages']} (baseline samples: {net['baseline_pages']})\n")
+            if net["avg_bytes_saved"] is not None:
+                f.write(f"Avg bytes saved per page: {net['avg_bytes_saved'] / 1024:.0f} KB\n")
+            if net["avg_load_ms_delta"] is not None:
+                f.write(f"Avg load time delta per page: {net['avg_load_ms_delta']:+.0f} ms\n")
+            f.write("\nNetwork per page:\n")
+            for page in network_stats.pages:
+                saved = f"{page['bytes_saved'] / 1024:.0f} KB saved" if "bytes_saved" in page else "no baseline"
+                delta = f"{page['load_ms_delta']:+d} ms" if "load_ms_delta" in page else "n/a"
+                f.write(f"{page['profile']}: {page['url']} | {(page.get('bytes_transferred') or 0) / 1024:.0f} KB, "
+                        f"{page.get('blocked_requests')} blocked, load {page.get('load_ms')} ms | {saved}, {delta}\n")
+        if wait_log.entries:
+            f.write("\nSection waits (avg / deadline misses):\n")
+            for section, stats in wait_log.summary().items():
+                f.write(f"{section}: {stats['avg_wait']:.2f}s avg, {stats['missed']}/{stats['pages']} missed\n")
+            f.write("\nSection waits per URL:\n")
+            for entry in wait_log.entries:
+                f.write(f"{entry['url']} | {format_timings(entry['timings'])}\n")
+        parse = wait_log.parse_summary()
+        if parse["pages"]:
+            f.write(f"\nDOM parsing: {parse['pages']} pages, {parse['full_parse_bytes'] / 1024:.0f} KB in full parses, "
+                    f"{parse['fragment_bytes'] / 1024:.0f} KB in {parse['fragments']} re-parsed sections, "
+                    f"{parse['avg_parse_ms']:.0f} ms avg per page\n")
+    print(f"Run log saved to {log_path}")
+
+def load_cities(cities=CITIES):
+    """Entries of the input file for the given (lower case) city names, or every city for None"""
+    with open(os.path.join(BASE_DIR, INPUT_FILE), "r", encoding="utf-8") as f:
         data = json.load(f)
+    return [city_data for city_data in data if cities is None or city_data["location"].lower() in cities]
 
-    # Only process the entry for New York, Washington DC, San Francisco, Austin
-    for city_data in data:
-        if city_data["location"].lower() == "new york":
-            scrape_city(city_data)
-            break
+def main():
+    scrape_cities(load_cities())
 
 if __name__ == "__main__":
     main()
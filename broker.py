@@ -0,0 +1,234 @@
+"""Job queues shared by a scrape coordinator and its workers.
+
+A job is one product to scrape: {"id", "country", "key", "url", "postcode",
+"groups"}, the postcode being the delivery location to scrape it for (None for
+the default) and groups the stale freshness field groups to refresh (None for
+a full scrape). Workers
+claim jobs with a lease; a job whose worker dies is handed out again once the
+lease runs out. Finished jobs leave a result (the product, or the failure kind)
+that the coordinator collects in order. Jobs can be enqueued with a delay,
+which is how retries are backed off.
+
+    open_broker("sqlite:///scrape_queue.db")  # one host, any number of processes
+    open_broker("redis://queue-host:6379/0")  # many hosts (needs the redis package)
+"""
+import json
+import sqlite3
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # only needed for redis:// brokers
+    redis = None
+
+LEASE_SECONDS = 600
+
+
+def _job(row_id, country, key, url, postcode=None, groups=None):
+    return {"id": row_id, "country": country, "key": tuple(key), "url": url, "postcode": postcode, "groups": groups}
+
+
+class SqliteBroker:
+    """Broker in a local SQLite file; safe for many processes on one host"""
+
+    def __init__(self, path, lease=LEASE_SECONDS):
+        self.path = path
+        self.lease = lease
+        self._local = threading.local()
+        with self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    country TEXT, key TEXT, url TEXT, postcode TEXT, groups TEXT,
+                    not_before REAL, lease_until REAL, worker TEXT, done INTEGER DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (done, not_before);
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id INTEGER, worker TEXT, product TEXT, kind TEXT, finished_at REAL
+                );
+            """)
+            # Queues created before jobs carried a postcode or stale groups
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+            for column in ("postcode", "groups"):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+
+    @property
+    def _db(self):
+        # One connection per thread; WAL lets workers write while the coordinator reads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA busy_timeout=30000")
+            self._local.db = db
+        return db
+
+    def enqueue(self, jobs, delay=0):
+        """Queue {"country", "key", "url", "postcode", "groups"} jobs; returns them with their ids"""
+        not_before = time.time() + delay
+        queued = []
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for job in jobs:
+                cursor = db.execute(
+                    "INSERT INTO jobs (country, key, url, postcode, groups, not_before) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job["country"], json.dumps(job["key"]), job["url"], job.get("postcode"),
+                     json.dumps(job.get("groups")), not_before),
+                )
+                queued.append(_job(cursor.lastrowid, job["country"], job["key"], job["url"], job.get("postcode"),
+                                   job.get("groups")))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return queued
+
+    def claim(self, worker):
+        """Lease the next due job to `worker`, or return None if nothing is due"""
+        now = time.time()
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")  # take the write lock so two workers cannot claim the same row
+        try:
+            row = db.execute(
+                "SELECT id, country, key, url, postcode, groups FROM jobs WHERE done = 0 AND not_before <= ? "
+                "AND (lease_until IS NULL OR lease_until < ?) ORDER BY not_before, id LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row:
+                db.execute("UPDATE jobs SET lease_until = ?, worker = ? WHERE id = ?", (now + self.lease, worker, row[0]))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return _job(row[0], row[1], json.loads(row[2]), row[3], row[4], json.loads(row[5] or "null"))
+
+    def complete(self, job, worker, product=None, kind=None):
+        """Record a finished job: its product, or the failure kind when there is none"""
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("UPDATE jobs SET done = 1 WHERE id = ?", (job["id"],))
+            db.execute(
+                "INSERT INTO results (job_id, worker, product, kind, finished_at) VALUES (?, ?, ?, ?, ?)",
+                (job["id"], worker, json.dumps(product, ensure_ascii=False), kind, time.time()),
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def results(self, after=0):
+        """(cursor, [(job, product, kind)]) for results newer than `after`; pass the cursor back next time"""
+        rows = self._db.execute(
+            "SELECT results.id, jobs.id, jobs.country, jobs.key, jobs.url, jobs.postcode, jobs.groups, "
+            "results.product, results.kind "
+            "FROM results JOIN jobs ON jobs.id = results.job_id WHERE results.id > ? ORDER BY results.id",
+            (after,),
+        ).fetchall()
+        if not rows:
+            return after, []
+        return rows[-1][0], [
+            (_job(job_id, country, json.loads(key), url, postcode, json.loads(groups or "null")),
+             json.loads(product), kind)
+            for _, job_id, country, key, url, postcode, groups, product, kind in rows
+        ]
+
+    def counts(self):
+        now = time.time()
+        queued, running = self._db.execute(
+            "SELECT SUM(lease_until IS NULL OR lease_until < ?), SUM(lease_until >= ?) FROM jobs WHERE done = 0",
+            (now, now),
+        ).fetchone()
+        return {"queued": queued or 0, "running": running or 0}
+
+    def reset(self):
+        """Drop every job and result"""
+        self._db.execute("DELETE FROM jobs")
+        self._db.execute("DELETE FROM results")
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+class RedisBroker:
+    """Broker on a Redis (or Redis-compatible) server, for workers on several hosts"""
+
+    def __init__(self, url, prefix="scrape", lease=LEASE_SECONDS):
+        if redis is None:
+            raise ImportError("redis:// brokers need the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.lease = lease
+        self.queue = f"{prefix}:queue"  # sorted set: job json -> not_before
+        self.running = f"{prefix}:running"  # sorted set: job json -> lease deadline
+        self.result_list = f"{prefix}:results"
+        self.next_id = f"{prefix}:next_id"
+
+    def enqueue(self, jobs, delay=0):
+        not_before = time.time() + delay
+        queued = []
+        pipe = self.client.pipeline()
+        for job in jobs:
+            job = _job(self.client.incr(self.next_id), job["country"], job["key"], job["url"], job.get("postcode"),
+                       job.get("groups"))
+            pipe.zadd(self.queue, {json.dumps(job): not_before})
+            queued.append(job)
+        pipe.execute()
+        return queued
+
+    def claim(self, worker):
+        now = time.time()
+        # Hand jobs from workers whose lease ran out back to the queue
+        for member in self.client.zrangebyscore(self.running, "-inf", now):
+            if self.client.zrem(self.running, member):
+                self.client.zadd(self.queue, {member: now})
+        for member in self.client.zrangebyscore(self.queue, "-inf", now, start=0, num=10):
+            if self.client.zrem(self.queue, member):  # only one worker wins the removal
+                self.client.zadd(self.running, {member: now + self.lease})
+                job = json.loads(member)
+                return _job(job["id"], job["country"], job["key"], job["url"], job.get("postcode"), job.get("groups"))
+        return None
+
+    def complete(self, job, worker, product=None, kind=None):
+        self.client.zrem(self.running, json.dumps(job))
+        self.client.rpush(self.result_list, json.dumps(
+            {"job": job, "worker": worker, "product": product, "kind": kind}, ensure_ascii=False
+        ))
+
+    def results(self, after=0):
+        entries = self.client.lrange(self.result_list, after, -1)
+        results = []
+        for entry in entries:
+            entry = json.loads(entry)
+            job = entry["job"]
+            job = _job(job["id"], job["country"], job["key"], job["url"], job.get("postcode"), job.get("groups"))
+            results.append((job, entry["product"], entry["kind"]))
+        return after + len(entries), results
+
+    def counts(self):
+        return {"queued": self.client.zcard(self.queue), "running": self.client.zcard(self.running)}
+
+    def reset(self):
+        self.client.delete(self.queue, self.running, self.result_list, self.next_id)
+
+    def close(self):
+        self.client.close()
+
+
+def open_broker(spec):
+    """A broker for "sqlite:///path/to/queue.db" (or a bare path) or "redis://host:port/db" """
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisBroker(spec)
+    if spec.startswith("sqlite:///"):
+        return SqliteBroker(spec[len("sqlite:///"):])  # sqlite:////abs/path keeps its leading slash
+    if "://" in spec:
+        raise ValueError(f"Unknown broker: {spec}")
+    return SqliteBroker(spec)
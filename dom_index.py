@@ -0,0 +1,162 @@
+"""Per-page caches on a parsed document: an element index and the page text.
+
+The element index groups elements by id, class, data-* attribute and tag name.
+It is built in one walk of the parsed page and cached on the soup, so
+every extractor on the page shares it. A selector is resolved by taking the
+smallest candidate list for its rightmost compound (e.g. every element with
+id "productTitle") and checking only those candidates against the full
+selector, combinators included. Selectors with nothing to key on, such as
+[aria-label*='price'], fall back to a normal select().
+
+PageText holds the document's get_text() for the regex fallbacks, computed
+once per page, and remembers each pattern's search result so fallback chains
+that share patterns do not rescan the page.
+"""
+import soupsieve
+from bs4 import BeautifulSoup
+from soupsieve.css_match import CSSMatch
+
+# Where the caches live on a soup. Tag.__getattr__ treats unknown attributes as
+# child lookups, so they are kept in the instance __dict__.
+INDEX_KEY = "_dom_index"
+TEXT_KEY = "_page_text"
+
+
+class DomIndex:
+    """Elements of one document grouped by id, class, data-* attribute and tag"""
+
+    def __init__(self, soup):
+        self.soup = soup
+        self.ids = {}
+        self.classes = {}
+        self.data_attributes = {}
+        self.tags = {}
+        self.positions = {}  # id(element) -> document order
+        self._matchers = {}
+
+        for position, el in enumerate(soup.find_all(True)):
+            self.positions[id(el)] = position
+            self.tags.setdefault(el.name, []).append(el)
+            for name, value in el.attrs.items():
+                if name == "id":
+                    self.ids.setdefault(value, []).append(el)
+                elif name == "class":
+                    for cls in (value.split() if isinstance(value, str) else value):
+                        self.classes.setdefault(cls, []).append(el)
+                elif name.startswith("data-"):
+                    self.data_attributes.setdefault(name, []).append(el)
+
+    def select(self, selector):
+        """Same result as soup.select(selector), resolved through the index"""
+        compiled = _compile(selector)
+        candidates = self._candidates(compiled)
+        if candidates is None:
+            return compiled.select(self.soup)
+        matcher = self._matcher(compiled)
+        return [el for el in candidates if matcher.match(el)]
+
+    def select_one(self, selector):
+        compiled = _compile(selector)
+        candidates = self._candidates(compiled)
+        if candidates is None:
+            return compiled.select_one(self.soup)
+        matcher = self._matcher(compiled)
+        for el in candidates:
+            if matcher.match(el):
+                return el
+        return None
+
+    def _matcher(self, compiled):
+        matcher = self._matchers.get(compiled.pattern)
+        if matcher is None:
+            matcher = CSSMatch(compiled.selectors, self.soup, compiled.namespaces, compiled.flags)
+            self._matchers[compiled.pattern] = matcher
+        return matcher
+
+    def _candidates(self, compiled):
+        """Elements that could match, in document order, or None to scan the whole tree"""
+        lists = []
+        for selector in compiled.selectors:
+            candidates = self._smallest(selector)
+            if candidates is None:
+                return None
+            lists.append(candidates)
+        if len(lists) == 1:
+            return lists[0]
+        merged = {id(el): el for candidates in lists for el in candidates}
+        return sorted(merged.values(), key=lambda el: self.positions[id(el)])
+
+    def _smallest(self, selector):
+        options = []
+        for element_id in selector.ids:
+            options.append(self.ids.get(element_id, []))
+        for cls in selector.classes:
+            options.append(self.classes.get(cls, []))
+        for attribute in selector.attributes:
+            name = attribute.attribute.lower()
+            if name.startswith("data-"):
+                options.append(self.data_attributes.get(name, []))
+        if selector.tag is not None and selector.tag.name not in (None, "*"):
+            options.append(self.tags.get(selector.tag.name.lower(), []))
+        if not options:
+            return None
+        return min(options, key=len)
+
+
+class PageText:
+    """A document's full text, with memoised regex searches"""
+
+    def __init__(self, text):
+        self.text = text
+        self._searches = {}
+
+    def search(self, pattern):
+        """pattern.search() over the page text, run at most once per compiled pattern"""
+        if pattern not in self._searches:
+            self._searches[pattern] = pattern.search(self.text)
+        return self._searches[pattern]
+
+
+def _compile(selector):
+    # soupsieve keeps its own cache of compiled patterns
+    return selector if isinstance(selector, soupsieve.SoupSieve) else soupsieve.compile(selector)
+
+
+def get_index(soup):
+    """The cached index for a parsed document, built on first use"""
+    index = soup.__dict__.get(INDEX_KEY)
+    if index is None:
+        index = DomIndex(soup)
+        soup.__dict__[INDEX_KEY] = index
+    return index
+
+
+def page_text(soup):
+    """The cached PageText for a parsed document"""
+    if not isinstance(soup, BeautifulSoup):
+        # Other parser backends have no room for the cache; their get_text() is cheap
+        return PageText(soup.get_text())
+    text = soup.__dict__.get(TEXT_KEY)
+    if text is None:
+        text = PageText(soup.get_text())
+        soup.__dict__[TEXT_KEY] = text
+    return text
+
+
+def invalidate(soup):
+    """Drop the cached index and text after the tree has been edited"""
+    soup.__dict__.pop(INDEX_KEY, None)
+    soup.__dict__.pop(TEXT_KEY, None)
+
+
+def select(root, selector):
+    """root.select(selector), through the page index when root is a whole BeautifulSoup document"""
+    if isinstance(root, BeautifulSoup):
+        return get_index(root).select(selector)
+    return root.select(selector)
+
+
+def select_one(root, selector):
+    if isinstance(root, BeautifulSoup):
+        return get_index(root).select_one(selector)
+    return root.select_one(selector)
@@ -0,0 +1,104 @@
+import time
+
+from dom_index import invalidate
+from html_parsers import make_soup
+
+# Lazily rendered page sections, by element id. Outer containers come first;
+# an id nested inside one already fetched is skipped.
+SNAPSHOT_SECTIONS = {
+    "buybox": [
+        "rightCol",
+        "desktop_buyBox",
+        "buybox",
+        "apex_desktop",
+        "newAccordionCaption_feature_div",
+        "desktop_qualifiedBuybox",
+    ],
+    "qa": [
+        "ask-dp-search_feature_div",
+        "customerQA",
+    ],
+    "aplus": [
+        "aplus_feature_div",
+        "aplusBrandStory_feature_div",
+        "aplus3p_feature_div",
+    ],
+    "details": [
+        "prodDetails",
+        "productDetails_feature_div",
+        "detailBullets_feature_div",
+        "productDetails_techSpec_section_1",
+        "productDetails_detailBullets_sections1",
+        "technicalSpecifications_section_1",
+        "detail-bullets",
+    ],
+}
+
+# Return the outerHTML of each id, skipping ids nested inside another match
+_OUTER_HTML_SCRIPT = """
+const picked = [];
+for (const id of arguments[0]) {
+    const el = document.getElementById(id);
+    if (!el || picked.some(p => p.el.contains(el))) continue;
+    for (let i = picked.length - 1; i >= 0; i--) {
+        if (el.contains(picked[i].el)) picked.splice(i, 1);
+    }
+    picked.push({id: id, el: el});
+}
+const out = {};
+for (const p of picked) out[p.id] = p.el.outerHTML;
+return out;
+"""
+
+
+def parse_html(html):
+    # Spliced in place, so needs a mutable (BeautifulSoup) backend
+    return make_soup(html, mutable=True)
+
+
+class DomSnapshot:
+    """Parse a live page once, then re-parse only the sections that change.
+
+    After scrolling loads lazy content, `refresh()` pulls the outerHTML of the
+    requested sections in a single script call and splices the re-parsed
+    subtrees into the existing tree in place of the stale ones. `stats` counts
+    the bytes parsed and the time spent parsing, for the run log.
+    """
+
+    def __init__(self, driver, parse=parse_html):
+        self.driver = driver
+        self.parse = parse
+        self.version = 0  # bumped on every splice, for caches keyed on the tree
+        self.stats = {"full_parse_bytes": 0, "fragment_bytes": 0, "fragments": 0, "parse_seconds": 0.0}
+        self.soup = self._timed_parse(driver.page_source, full=True)
+
+    def refresh(self, sections):
+        """Re-fetch and splice the given sections; returns the updated soup"""
+        ids = []
+        for section in sections:
+            ids.extend(SNAPSHOT_SECTIONS.get(section, [section]))
+        fragments = self.driver.execute_script(_OUTER_HTML_SCRIPT, ids) or {}
+
+        for element_id, html in fragments.items():
+            fragment = self._timed_parse(html)
+            new_node = fragment.find(id=element_id)
+            if new_node is None:
+                continue
+            old_node = self.soup.find(id=element_id)
+            if old_node is not None:
+                old_node.replace_with(new_node.extract())
+            else:
+                (self.soup.body or self.soup).append(new_node.extract())
+            self.stats["fragments"] += 1
+
+        if fragments:
+            self.version += 1
+            invalidate(self.soup)
+        return self.soup
+
+    def _timed_parse(self, html, full=False):
+        start = time.perf_counter()
+        soup = self.parse(html)
+        self.stats["parse_seconds"] += time.perf_counter() - start
+        self.stats["full_parse_bytes" if full else "fragment_bytes"] += len(html)
+        return soup
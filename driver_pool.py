@@ -0,0 +1,221 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # RSS ceiling is only enforced when psutil is installed
+    psutil = None
+
+
+class BrowserBudget:
+    """Cap on the browsers alive across several DriverPools, e.g. one per marketplace.
+
+    A pool that has neither an idle driver nor budget left quits an idle
+    driver of another pool to make room, so the browsers go to whichever
+    marketplaces still have work.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.pools = []
+        self._live = 0
+        self._lock = threading.Lock()
+
+    def register(self, pool):
+        self.pools.append(pool)
+
+    def take(self):
+        """Reserve room for one more browser; returns whether there was any"""
+        with self._lock:
+            if self._live >= self.limit:
+                return False
+            self._live += 1
+            return True
+
+    def give_back(self):
+        with self._lock:
+            self._live -= 1
+
+    def reclaim(self, pool):
+        """Quit an idle driver of a pool other than `pool`; returns whether one was quit"""
+        return any(other.quit_idle() for other in self.pools if other is not pool)
+
+
+class DriverPool:
+    """Pool of reusable Chrome drivers shared by the scraping threads.
+
+    Drivers are created lazily up to `size`, handed out with `acquire()` and
+    returned with `release()`. A driver is quit and replaced once it has served
+    `max_pages` pages or its browser processes exceed `max_rss_mb` of RSS.
+    With a `budget` (a BrowserBudget), new drivers also need room in it.
+    """
+
+    def __init__(self, factory, size=3, max_pages=50, max_rss_mb=1500, budget=None):
+        self.factory = factory
+        self.size = size
+        self.budget = budget
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._pages = {}  # id(driver) -> pages served
+        self._created = 0
+        self._recycled = 0
+        self._closed = False
+        if budget:
+            budget.register(self)
+
+    def acquire(self, timeout=None):
+        """Check out a healthy driver, creating one if the pool has room"""
+        while True:
+            driver = self._take(timeout)
+            if self._is_healthy(driver):
+                return driver
+            print("♻️ Discarding unresponsive driver")
+            self._discard(driver)
+
+    def release(self, driver, healthy=True):
+        """Return a driver to the pool, recycling it if it is worn out"""
+        with self._lock:
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + 1
+            pages = self._pages[id(driver)]
+            closed = self._closed
+
+        if closed or not healthy or not self._is_healthy(driver):
+            self._discard(driver)
+            return
+
+        if pages >= self.max_pages:
+            print(f"♻️ Recycling driver after {pages} pages")
+            self._discard(driver, recycled=True)
+            return
+
+        rss_mb = self.driver_rss_mb(driver)
+        if rss_mb is not None and rss_mb > self.max_rss_mb:
+            print(f"♻️ Recycling driver at {rss_mb:.0f} MB RSS")
+            self._discard(driver, recycled=True)
+            return
+
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Borrow a driver for the duration of a `with` block"""
+        driver = self.acquire(timeout)
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = self._is_healthy(driver)
+            raise
+        finally:
+            self.release(driver, healthy=healthy)
+
+    def close(self):
+        """Quit every idle driver and stop handing out new ones"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+    def quit_idle(self):
+        """Quit one idle driver to free its room in the budget; returns whether there was one"""
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            return False
+        self._discard(driver)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "live": self._created,
+                "idle": self._idle.qsize(),
+                "recycled": self._recycled,
+            }
+
+    @staticmethod
+    def driver_rss_mb(driver):
+        """Resident memory of chromedriver and its browser processes, in MB"""
+        if psutil is None:
+            return None
+        try:
+            root = psutil.Process(driver.service.process.pid)
+            procs = [root] + root.children(recursive=True)
+            total = 0
+            for proc in procs:
+                try:
+                    total += proc.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total / (1024 * 1024)
+        except Exception:
+            return None
+
+    def _take(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                has_room = self._created < self.size
+                can_create = has_room and (self.budget is None or self.budget.take())
+                if can_create:
+                    self._created += 1
+
+            if can_create:
+                try:
+                    driver = self.factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    if self.budget:
+                        self.budget.give_back()
+                    raise
+                with self._lock:
+                    self._pages[id(driver)] = 0
+                return driver
+
+            if has_room and self.budget.reclaim(self):
+                continue  # another marketplace's idle browser made room for one here
+
+            # Poll so a slot freed by a recycled driver is noticed
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _discard(self, driver, recycled=False):
+        with self._lock:
+            self._pages.pop(id(driver), None)
+            self._created -= 1
+            if recycled:
+                self._recycled += 1
+        if self.budget:
+            self.budget.give_back()
+        try:
+            driver.quit()
+        except Exception:
+            pass
@@ -0,0 +1,192 @@
+"""Why a product scrape failed, and when (if ever) to try it again.
+
+A failed scrape returns a Failure in place of the product. Failures are
+falsy, so code that only checks for a usable product treats them like None.
+Each kind of failure has its own retry policy. Failed products are parked on a
+RetryQueue with exponential backoff and retried once the main pass is over.
+"""
+import heapq
+import itertools
+import time
+
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from http_fetch import BOT_WALL_MARKERS, is_bot_wall
+
+TIMEOUT = "timeout"
+DRIVER_CRASH = "driver crash"
+BOT_WALL = "bot wall"
+NOT_FOUND = "not found"
+EMPTY = "empty extraction"
+ERROR = "error"
+
+# retries: how many more attempts; delay: seconds before the first retry, doubled for each one after
+RETRY_POLICIES = {
+    TIMEOUT: {"retries": 2, "delay": 30},
+    DRIVER_CRASH: {"retries": 2, "delay": 10},
+    BOT_WALL: {"retries": 3, "delay": 120},
+    NOT_FOUND: {"retries": 0, "delay": 0},
+    EMPTY: {"retries": 1, "delay": 60},
+    ERROR: {"retries": 1, "delay": 30},
+}
+
+# Amazon's not-found templates. The "dogs of Amazon" pictures are not a marker
+# on their own: the transient "Sorry! Something went wrong" page shows them too.
+NOT_FOUND_MARKERS = [
+    "sorry! we couldn't find that page",
+    "we're sorry. the web address you entered is not a functioning page",
+    "looking for something?",
+]
+
+# Present on every real product page; a page with none of them is checked for error templates
+PRODUCT_PAGE_SELECTOR = "#dp, #dp-container, #ppd, #productTitle"
+
+_CHECK_PAGE_SCRIPT = """
+if (document.querySelector(arguments[0])) return null;
+const html = document.documentElement.outerHTML.toLowerCase();
+for (const [kind, markers] of arguments[1]) {
+    if (markers.some(m => html.includes(m))) return kind;
+}
+return null;
+"""
+
+
+class BlockedPage(Exception):
+    """Raised as soon as a loaded page turns out to be a robot check or error template"""
+
+    def __init__(self, kind):
+        super().__init__(f"{kind} page")
+        self.kind = kind
+
+
+class Failure:
+    """Returned instead of a product when a scrape fails"""
+
+    def __init__(self, kind, detail=""):
+        self.kind = kind
+        self.detail = detail
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"Failure({self.kind!r}, {self.detail!r})"
+
+
+def classify_exception(e):
+    if isinstance(e, BlockedPage):
+        return e.kind
+    if isinstance(e, (TimeoutException, requests.Timeout)):
+        return TIMEOUT
+    if isinstance(e, WebDriverException):
+        return DRIVER_CRASH
+    return ERROR
+
+
+def classify_page(html):
+    """NOT_FOUND or BOT_WALL for an error template, None for a real product page"""
+    lowered = (html or "").lower()
+    if any(marker in lowered for marker in NOT_FOUND_MARKERS):
+        return NOT_FOUND
+    if is_bot_wall(None, lowered):
+        return BOT_WALL
+    return None
+
+
+def check_page(driver):
+    """classify_page() for the page just loaded in the browser, in one script call.
+
+    Real product pages are recognised by PRODUCT_PAGE_SELECTOR without
+    reading the markup, so this costs a few milliseconds on the happy path.
+    """
+    return driver.execute_script(
+        _CHECK_PAGE_SCRIPT, PRODUCT_PAGE_SELECTOR, [[NOT_FOUND, NOT_FOUND_MARKERS], [BOT_WALL, BOT_WALL_MARKERS]]
+    )
+
+
+def merge_policies(overrides=None):
+    """RETRY_POLICIES with per-kind overrides applied"""
+    policies = {kind: dict(policy) for kind, policy in RETRY_POLICIES.items()}
+    for kind, override in (overrides or {}).items():
+        policies[kind] = dict(policies.get(kind, RETRY_POLICIES[ERROR]), **override)
+    return policies
+
+
+def failure_kind(result):
+    """Failure class of an unsuccessful result: a Failure's kind, ERROR for None, else EMPTY"""
+    if isinstance(result, Failure):
+        return result.kind
+    return ERROR if result is None else EMPTY
+
+
+class RetryQueue:
+    """Deferred retries for failed items, each due after its policy's backoff"""
+
+    def __init__(self, policies=None):
+        self.policies = merge_policies(policies)
+        self.attempts = {}  # item -> retries scheduled so far
+        self.last_kind = {}  # item -> kind of its latest failure
+        self.counts = {}  # kind -> {"failed", "retried", "recovered", "gave_up"}
+        self._heap = []  # (due, order, item)
+        self._order = itertools.count()
+
+    def _count(self, kind, field):
+        counts = self.counts.setdefault(kind, {"failed": 0, "retried": 0, "recovered": 0, "gave_up": 0})
+        counts[field] += 1
+
+    def defer(self, item, kind, policies=None):
+        """Schedule a retry; returns the delay in seconds, or None once the item is out of retries.
+
+        `policies` (from merge_policies) replaces the queue's own for this item.
+        """
+        policies = policies or self.policies
+        policy = policies.get(kind, policies[ERROR])
+        attempt = self.attempts.get(item, 0)
+        self.last_kind[item] = kind
+        self._count(kind, "failed")
+        if attempt >= policy["retries"]:
+            self._count(kind, "gave_up")
+            return None
+        delay = policy["delay"] * 2 ** attempt
+        self.attempts[item] = attempt + 1
+        self._count(kind, "retried")
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._order), item))
+        return delay
+
+    def succeeded(self, item):
+        if item in self.attempts:
+            self._count(self.last_kind[item], "recovered")
+
+    def __len__(self):
+        return len(self._heap)
+
+    def rounds(self, window=15):
+        """Yield batches of items as they fall due, sleeping in between, until nothing is left.
+
+        Items due within `window` seconds of the first one go in the same
+        batch, so failures spread over a batch come back together. Items
+        deferred again while a batch is being processed go in a later round.
+        """
+        while self._heap:
+            wait = self._heap[0][0] - time.monotonic()
+            if wait > 0:
+                print(f"  ⏳ Next retry in {wait:.0f}s ({len(self._heap)} queued)")
+                time.sleep(wait)
+            cutoff = time.monotonic() + window
+            batch = []
+            while self._heap and self._heap[0][0] <= cutoff:
+                batch.append(heapq.heappop(self._heap)[2])
+            yield batch
+
+    def summary(self):
+        return {kind: dict(counts) for kind, counts in self.counts.items()}
+
+
+def format_retries(summary):
+    """Lines for a scrape log: failures, retries and recoveries per failure class"""
+    return [
+        f"Failures ({kind}): {c['failed']} failed attempts, {c['retried']} retries, "
+        f"{c['recovered']} recovered, {c['gave_up']} given up"
+        for kind, c in summary.items()
+    ]
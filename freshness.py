@@ -0,0 +1,180 @@
+"""How long each group of product fields stays current, and what refreshing the stale ones takes.
+
+Offer fields (price, deal, buy box) change by the hour while descriptive
+content rarely does. The scrape journal keeps, for every product, when each
+field group was last scraped. On a rerun a product whose groups are all within
+policy is reused as it is; otherwise only its stale groups are refreshed, over
+plain HTTP when they are all on the static page, and in the browser waiting
+only for the page sections they need. Offer groups depend on the delivery
+city, so their scrape times are kept per city ("offer:<city>"): an offer
+scraped for one city never makes another city's current.
+"""
+import time
+
+# fields: product fields in the group; sections: page_readiness sections they need in the browser;
+# static: whether a plain HTTP fetch of the page has them
+FIELD_GROUPS = {
+    "offer": {"fields": ["price", "deal", "buybox"], "sections": ["price", "buybox"], "static": True},
+    "reviews": {"fields": ["rating", "total_reviews"], "sections": [], "static": True},
+    "variants": {"fields": ["child_skus"], "sections": [], "static": True},
+    "content": {
+        "fields": ["title", "brand", "main_image", "additional_images", "about_this_item", "from_manufacturer",
+                   "product_description", "specifications", "specs", "product_details"],
+        "sections": [],
+        "static": True,
+    },
+    "qa": {"fields": ["qa"], "sections": ["qa"], "static": False},
+}
+
+# The groups that depend on the delivery location, and so are scraped per city
+OFFER_GROUPS = ["offer"]
+
+# Hours each group stays current after it was scraped
+FRESHNESS_HOURS = {
+    "offer": 1,
+    "reviews": 24,
+    "variants": 24,
+    "content": 24 * 7,
+    "qa": 24 * 7,
+}
+
+
+def merge_freshness(overrides=None):
+    """FRESHNESS_HOURS with per-group overrides applied"""
+    return dict(FRESHNESS_HOURS, **(overrides or {}))
+
+
+class Refresh:
+    """The stale field groups of a previously scraped product, and how to bring them current"""
+
+    def __init__(self, previous, groups, max_age):
+        self.previous = previous  # None for a city offer pass that has not been scraped before
+        self.groups = groups
+        self.max_age = max_age  # seconds; older cached pages cannot refresh these groups
+
+    @property
+    def static(self):
+        return all(FIELD_GROUPS[group]["static"] for group in self.groups)
+
+    @property
+    def offer_only(self):
+        """Whether only offer groups are stale, so the first screen of the page is enough"""
+        return all(group in OFFER_GROUPS for group in self.groups)
+
+    @property
+    def sections(self):
+        """Page sections to wait for in the browser; the title always, to know the page has loaded"""
+        sections = ["title"]
+        for group in self.groups:
+            sections += [s for s in FIELD_GROUPS[group]["sections"] if s not in sections]
+        return sections
+
+    def merge(self, product):
+        """The previous product with the stale groups' fields taken from `product`"""
+        merged = dict(self.previous or {})
+        for group in self.groups:
+            for field in FIELD_GROUPS[group]["fields"]:
+                if field in product:
+                    merged[field] = product[field]
+        return merged
+
+
+class RefreshPlanner:
+    """Sort products with a successful journal record into current ones and ones to refresh"""
+
+    def __init__(self, hours=None):
+        self.hours = merge_freshness(hours)
+        self.counts = {"current": 0, "refreshed": 0, "kept_stale": 0}
+        self.stale = {group: 0 for group in FIELD_GROUPS}  # products planned for a refresh of each group
+
+    def stale_groups(self, journal, key, now=None, product=None, city=None):
+        """Groups of `key` past their policy; with its `product`, only groups the country's extractor emits.
+
+        Not every scraper.py extracts every group (UK and India have no Q&A),
+        and a group that is never scraped would otherwise never be current.
+        With a `city`, offer groups count as current only if scraped for it.
+        """
+        now = time.time() if now is None else now
+        fields_at = journal.fields_at.get(key, {})
+        scraped_at = journal.scraped_at.get(key, 0)  # records from before field groups were tracked
+        return [group for group in FIELD_GROUPS
+                if (product is None or any(field in product for field in FIELD_GROUPS[group]["fields"]))
+                and now - _scraped_at(fields_at, group, scraped_at, city) > self.hours[group] * 3600]
+
+    def refresh(self, previous, groups):
+        return Refresh(previous, groups, min(self.hours[group] for group in groups) * 3600)
+
+    def plan(self, journal, keys, offers=(), city_for=None):
+        """({key: current product}, {key: Refresh}) for the keys with a successful journal record.
+
+        Keys in `offers` are city offer passes (see ScrapePlan): they only hold
+        OFFER_GROUPS, and get a Refresh even before their first scrape.
+        `city_for(key)` names the city whose offer each key holds.
+        """
+        current, refreshes = {}, {}
+        now = time.time()
+        completed = journal.completed(keys) if journal else {}
+        for key in keys:
+            product = completed.get(key)
+            if product is None:
+                if key in offers:
+                    refreshes[key] = self.refresh(None, OFFER_GROUPS)
+                continue
+            groups = self.stale_groups(journal, key, now, product, city_for(key) if city_for else None)
+            if key in offers:
+                groups = [group for group in groups if group in OFFER_GROUPS]
+            if not groups:
+                current[key] = product
+                continue
+            refreshes[key] = self.refresh(product, groups)
+            for group in groups:
+                self.stale[group] += 1
+        self.counts["current"] += len(current)
+        return current, refreshes
+
+    def fields_at(self, journal, key, refresh=None, city=None, product=None):
+        """Field group scrape times to journal for a product just scraped (or refreshed) for `city`.
+
+        With the scraped `product` (before any merge), only groups it has fields of count as scraped now.
+        """
+        now = time.time()
+        groups = list(FIELD_GROUPS) if refresh is None else refresh.groups
+        if product is not None:
+            groups = [group for group in groups if any(field in product for field in FIELD_GROUPS[group]["fields"])]
+        scraped_at = journal.scraped_at.get(key, 0)
+        previous = journal.fields_at.get(key, {})
+        fields_at = {_entry(group, city): _scraped_at(previous, group, scraped_at, city) for group in FIELD_GROUPS}
+        fields_at.update((_entry(group, city), now) for group in groups)
+        return fields_at
+
+    def finished(self, refresh, refreshed):
+        if refresh.previous is not None:
+            self.counts["refreshed" if refreshed else "kept_stale"] += 1
+
+    def summary(self):
+        return {"hours": dict(self.hours), "stale": dict(self.stale), **self.counts}
+
+
+def _entry(group, city):
+    """Journal entry for a group's scrape time: per city for offer groups"""
+    return f"{group}:{city}" if city is not None and group in OFFER_GROUPS else group
+
+
+def _scraped_at(fields_at, group, scraped_at, city):
+    if _entry(group, city) != group:
+        return fields_at.get(_entry(group, city), 0)  # an offer for another (or no) city is not this one's
+    return fields_at.get(group, scraped_at)
+
+
+def format_freshness(summary):
+    """Lines for a scrape log: products reused, refreshed or left stale, and stale groups"""
+    if not (summary["current"] or summary["refreshed"] or summary["kept_stale"]):
+        return []  # nothing in the journal yet
+    lines = [
+        f"Freshness: {summary['current']} products current, {summary['refreshed']} refreshed, "
+        f"{summary['kept_stale']} kept stale after a failed refresh"
+    ]
+    for group, count in summary["stale"].items():
+        if count:
+            lines.append(f"Stale {group} fields (older than {summary['hours'][group]}h): {count} products")
+    return lines
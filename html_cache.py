@@ -0,0 +1,242 @@
+"""On-disk cache of raw product pages, so reruns and extractor fixes do not refetch them.
+
+Pages are keyed by (domain, ASIN, postcode, fetch-time bucket) in a small
+SQLite index. Page bodies are stored once per content hash, compressed with
+zstd when the zstandard package is installed and gzip otherwise. Pages are
+served for reuse while younger than the TTL, but archived for longer (see
+`retain`) so reextract.py can replay them. Pages past retention are dropped,
+and the least recently used pages go once the cache outgrows its size limit.
+"""
+import gzip
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:  # gzip is used instead
+    zstandard = None
+
+from scrape_plan import canonical_key
+
+TTL_SECONDS = 24 * 3600
+RETAIN_SECONDS = 30 * 24 * 3600
+BUCKET_SECONDS = 3600
+MAX_CACHE_MB = 2048
+EVICT_EVERY = 100  # puts between eviction passes
+
+
+def _compress(data):
+    if zstandard:
+        return zstandard.ZstdCompressor(level=10).compress(data), ".zst"
+    return gzip.compress(data, compresslevel=6), ".gz"
+
+
+def _decompress(data, suffix):
+    if suffix == ".zst":
+        if zstandard is None:
+            raise ValueError("page was stored with zstd but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def read_page(path):
+    """The HTML stored in a page file of the cache"""
+    with open(path, "rb") as f:
+        return _decompress(f.read(), os.path.splitext(path)[1]).decode("utf-8")
+
+
+class HtmlCache:
+    """Compressed, content-addressed page store with TTL, retention and size-based eviction.
+
+    `ttl` is how long a page is served for reuse, `retain` how long it stays
+    archived (None: until the size limit pushes it out). A cache opened with
+    read_only=True, e.g. for re-extraction, never evicts.
+    """
+
+    def __init__(self, directory, ttl=TTL_SECONDS, max_mb=MAX_CACHE_MB, bucket_seconds=BUCKET_SECONDS,
+                 retain=RETAIN_SECONDS, read_only=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.retain = None if retain is None else max(retain, ttl)
+        self.read_only = read_only
+        self.max_bytes = max_mb * 1024 * 1024
+        self.bucket_seconds = bucket_seconds
+        self.stats = {"hits": 0, "stored": 0, "deduplicated": 0, "evicted": 0}
+        self._missed = set()  # products looked up without a fresh copy; the HTTP and browser tiers may both ask
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        os.makedirs(directory, exist_ok=True)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                domain TEXT, asin TEXT, postcode TEXT, bucket INTEGER,
+                digest TEXT, fetched_at REAL, source TEXT,
+                PRIMARY KEY (domain, asin, postcode, bucket)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY, suffix TEXT, size INTEGER, last_used REAL
+            );
+        """)
+        if not read_only:
+            self.evict()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(os.path.join(self.directory, "index.db"), timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def _blob_path(self, digest, suffix):
+        return os.path.join(self.directory, digest[:2], digest + suffix)
+
+    def locate(self, url, postcode=None, max_age=None):
+        """File of the newest cached page for the product younger than `max_age` (default: the TTL), or None"""
+        key = canonical_key(url)
+        if key is None:
+            return None
+        row = self._db.execute(
+            "SELECT pages.digest, blobs.suffix FROM pages JOIN blobs ON blobs.digest = pages.digest "
+            "WHERE domain = ? AND asin = ? AND postcode = ? AND fetched_at >= ? ORDER BY fetched_at DESC LIMIT 1",
+            (*key, postcode or "", time.time() - (self.ttl if max_age is None else max_age)),
+        ).fetchone()
+        return self._blob_path(*row) if row else None
+
+    def get(self, url, postcode=None, max_age=None):
+        """The newest cached page for the product younger than `max_age` (default: the TTL), or None"""
+        key = canonical_key(url)
+        if key is None:
+            return None
+        path = self.locate(url, postcode, max_age)
+        html = None
+        if path:
+            try:
+                html = read_page(path)
+            except (OSError, ValueError):
+                html = None  # removed or damaged underneath us; treat as a miss
+            else:
+                digest = os.path.splitext(os.path.basename(path))[0]
+                self._db.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+        with self._lock:
+            if html is None:
+                self._missed.add((*key, postcode or ""))
+            else:
+                self.stats["hits"] += 1
+        return html
+
+    def put(self, url, html, postcode=None, source="http"):
+        """Store a fetched page; a page identical to one already stored shares its file"""
+        key = canonical_key(url)
+        if key is None or not html:
+            return
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        if self._db.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone():
+            self._db.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (now, digest))
+            deduplicated = True
+        else:
+            compressed, suffix = _compress(data)
+            path = self._blob_path(digest, suffix)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # A temp file of our own: other threads and worker processes may be storing the same page
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+            self._db.execute(
+                "INSERT OR REPLACE INTO blobs (digest, suffix, size, last_used) VALUES (?, ?, ?, ?)",
+                (digest, suffix, len(compressed), now),
+            )
+            deduplicated = False
+        self._db.execute(
+            "INSERT OR REPLACE INTO pages (domain, asin, postcode, bucket, digest, fetched_at, source) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*key, postcode or "", int(now // self.bucket_seconds), digest, now, source),
+        )
+        with self._lock:
+            self.stats["stored"] += 1
+            self.stats["deduplicated"] += deduplicated
+            self._puts += 1
+            evict = self._puts % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop pages past retention, then least recently used pages while over the size limit"""
+        if self.read_only:
+            return
+        db = self._db
+        if self.retain is not None:
+            db.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.retain,))
+        doomed = db.execute(
+            "SELECT digest, suffix FROM blobs WHERE digest NOT IN (SELECT digest FROM pages)"
+        ).fetchall()
+        total = 0
+        for digest, suffix, size in db.execute(
+            "SELECT digest, suffix, size FROM blobs WHERE digest IN (SELECT digest FROM pages) ORDER BY last_used DESC"
+        ).fetchall():
+            total += size  # most recently used first, so whatever crosses the limit goes
+            if total > self.max_bytes:
+                doomed.append((digest, suffix))
+        for digest, suffix in doomed:
+            db.execute("DELETE FROM pages WHERE digest = ?", (digest,))
+            db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            try:
+                os.remove(self._blob_path(digest, suffix))
+            except OSError:
+                pass
+        with self._lock:
+            self.stats["evicted"] += len(doomed)
+
+    def within(self, max_age):
+        """This cache, serving only pages younger than `max_age` seconds"""
+        return _CacheView(self, max_age=max_age)
+
+    def at(self, postcode):
+        """This cache as seen from one delivery postcode"""
+        return _CacheView(self, postcode=postcode)
+
+    def size_bytes(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def summary(self):
+        with self._lock:
+            stats = dict(self.stats, misses=len(self._missed))
+        stats["size_mb"] = self.size_bytes() / (1024 * 1024)
+        return stats
+
+
+class _CacheView:
+    """An HtmlCache with a fixed postcode, or a limit on the age of the pages it serves"""
+
+    def __init__(self, cache, max_age=None, postcode=None):
+        self.cache = cache
+        self.max_age = max_age
+        self.postcode = postcode
+
+    def within(self, max_age):
+        return _CacheView(self.cache, max_age if self.max_age is None else min(max_age, self.max_age), self.postcode)
+
+    def at(self, postcode):
+        return _CacheView(self.cache, self.max_age, postcode)
+
+    def get(self, url, postcode=None, max_age=None):
+        ages = [age for age in (max_age, self.max_age) if age is not None]
+        return self.cache.get(url, postcode or self.postcode, min(ages) if ages else None)
+
+    def put(self, url, html, postcode=None, source="http"):
+        self.cache.put(url, html, postcode or self.postcode, source)
+
+
+def format_cache(summary):
+    return [
+        f"HTML cache: {summary['hits']} hits, {summary['misses']} misses, {summary['stored']} pages stored "
+        f"({summary['deduplicated']} deduplicated), {summary['evicted']} evicted, {summary['size_mb']:.1f} MB on disk"
+    ]
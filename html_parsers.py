@@ -0,0 +1,378 @@
+"""Pluggable HTML parser backends for the product extractors.
+
+make_soup() builds a BeautifulSoup-compatible tree with html.parser, lxml, or
+selectolax (lexbor) behind a thin adapter. Run as a script to benchmark the
+backends over saved pages and check they extract identical products:
+
+    python html_parsers.py --country USA saved_pages/*.html
+"""
+import argparse
+import importlib.util
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+MUTABLE_BACKENDS = ("html.parser", "lxml")
+DEFAULT_BACKEND = os.environ.get("SCRAPER_HTML_PARSER") or ("lxml" if lxml is not None else "html.parser")
+
+# Attributes BeautifulSoup splits into lists
+MULTI_VALUED_ATTRIBUTES = {"class", "rel", "rev", "accept-charset", "headers", "accesskey", "dropzone"}
+
+# Strings BeautifulSoup keeps out of get_text() on ancestors of these tags
+NON_TEXT_CONTAINERS = {"script", "style", "template", "rt", "rp"}
+
+
+def available_backends():
+    backends = ["html.parser"]
+    if lxml is not None:
+        backends.append("lxml")
+    if LexborHTMLParser is not None:
+        backends.append("selectolax")
+    return backends
+
+
+def make_soup(html, backend=None, mutable=False):
+    """Parse html with the given (or default) backend.
+
+    Pass mutable=True when the tree will be edited in place (e.g. DomSnapshot
+    splicing); the selectolax adapter is read-only, so lxml is used instead.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if mutable and backend not in MUTABLE_BACKENDS:
+        backend = "lxml" if lxml is not None else "html.parser"
+    if backend == "selectolax":
+        if LexborHTMLParser is None:
+            raise ImportError("selectolax is not installed")
+        return LexborSoup(html)
+    if backend == "lxml" and lxml is None:
+        backend = "html.parser"
+    return BeautifulSoup(html, backend)
+
+
+class LexborText(str):
+    """Text node returned by find_all(text=...), with a .parent like NavigableString"""
+
+    def __new__(cls, value, parent):
+        obj = super().__new__(cls, value)
+        obj.parent = parent
+        return obj
+
+
+class LexborElement:
+    """Read-only BeautifulSoup Tag look-alike over a selectolax lexbor node.
+
+    Covers the subset of the Tag API the extractors use: select/select_one,
+    find/find_all/find_next_sibling, get/[] with multi-valued class lists,
+    get_text, name and parent.
+    """
+
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, LexborElement) and other.node.mem_id == self.node.mem_id
+
+    def __hash__(self):
+        return self.node.mem_id
+
+    def __repr__(self):
+        return self.node.html or ""
+
+    __str__ = __repr__
+
+    @property
+    def name(self):
+        return self.node.tag
+
+    @property
+    def attrs(self):
+        attrs = {}
+        for key, value in self.node.attributes.items():
+            if key in MULTI_VALUED_ATTRIBUTES:
+                attrs[key] = (value or "").split()
+            else:
+                attrs[key] = value if value is not None else ""
+        return attrs
+
+    @property
+    def parent(self):
+        parent = self.node.parent
+        if parent is None or not parent.is_element_node:
+            return None
+        return LexborElement(parent)
+
+    def get(self, key, default=None):
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key):
+        return self.attrs[key]
+
+    def select(self, selector):
+        return _unique_elements(self.node.css(selector), exclude=self.node.mem_id)
+
+    def select_one(self, selector):
+        own_id = self.node.mem_id
+        for n in self.node.css(selector):
+            if n.mem_id != own_id:
+                return LexborElement(n)
+        return None
+
+    def _strings(self):
+        include_own = self.node.tag in NON_TEXT_CONTAINERS
+        for n in self.node.traverse(include_text=True):
+            if not n.is_text_node:
+                continue
+            parent = n.parent
+            if parent is not None and parent.tag in NON_TEXT_CONTAINERS:
+                if not (include_own and parent.mem_id == self.node.mem_id):
+                    continue
+            yield n.text_content or ""
+
+    def get_text(self, separator="", strip=False):
+        strings = self._strings()
+        if strip:
+            strings = (s.strip() for s in strings)
+            return separator.join(s for s in strings if s)
+        return separator.join(strings)
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    def _descendants(self, recursive=True):
+        if recursive:
+            nodes = self.node.traverse(include_text=False)
+            next(nodes, None)  # traverse() starts with the node itself
+            for n in nodes:
+                if n.is_element_node:
+                    yield n
+        else:
+            child = self.node.child
+            while child is not None:
+                if child.is_element_node:
+                    yield child
+                child = child.next
+
+    def find_all(self, name=None, attrs=None, recursive=True, text=None, string=None, limit=None, **kwargs):
+        text = text if text is not None else string
+        if text is not None and name is None and not attrs and not kwargs:
+            return self._find_all_text(text)
+
+        conditions = dict(attrs or {})
+        conditions.update(kwargs)
+        if "class_" in conditions:
+            conditions["class"] = conditions.pop("class_")
+        names = _as_name_set(name)
+
+        found = []
+        for n in self._descendants(recursive):
+            if names is not None and n.tag not in names:
+                continue
+            element = LexborElement(n)
+            if conditions and not _match_attrs(element, conditions):
+                continue
+            found.append(element)
+            if limit and len(found) >= limit:
+                break
+        return found
+
+    def find(self, name=None, attrs=None, recursive=True, **kwargs):
+        found = self.find_all(name, attrs, recursive, limit=1, **kwargs)
+        return found[0] if found else None
+
+    def find_next_sibling(self, name=None, attrs=None, **kwargs):
+        names = _as_name_set(name)
+        conditions = dict(attrs or {})
+        conditions.update(kwargs)
+        sibling = self.node.next
+        while sibling is not None:
+            if sibling.is_element_node and (names is None or sibling.tag in names):
+                element = LexborElement(sibling)
+                if not conditions or _match_attrs(element, conditions):
+                    return element
+            sibling = sibling.next
+        return None
+
+    def _find_all_text(self, pattern):
+        found = []
+        for n in self.node.traverse(include_text=True):
+            if not n.is_text_node:
+                continue
+            parent = n.parent
+            if parent is not None and parent.tag in NON_TEXT_CONTAINERS:
+                continue
+            value = n.text_content or ""
+            if _match_value(pattern, value):
+                found.append(LexborText(value, LexborElement(parent) if parent is not None else None))
+        return found
+
+
+class LexborSoup(LexborElement):
+    """Document-level adapter; get_text() and searches cover the whole page"""
+
+    __slots__ = ("tree",)
+
+    def __init__(self, html):
+        self.tree = LexborHTMLParser(html)
+        super().__init__(self.tree.root)
+
+    @property
+    def name(self):
+        return "[document]"
+
+    def select(self, selector):
+        return _unique_elements(self.tree.css(selector))
+
+    def select_one(self, selector):
+        node = self.tree.css_first(selector)
+        return LexborElement(node) if node is not None else None
+
+    def _descendants(self, recursive=True):
+        # The <html> element itself is a descendant of the document
+        nodes = self.node.traverse(include_text=False)
+        for n in nodes:
+            if n.is_element_node:
+                yield n
+
+
+def _unique_elements(nodes, exclude=None):
+    # lexbor can return a node once per matching selector in a selector list
+    seen = set() if exclude is None else {exclude}
+    elements = []
+    for n in nodes:
+        if n.mem_id not in seen:
+            seen.add(n.mem_id)
+            elements.append(LexborElement(n))
+    return elements
+
+
+def _as_name_set(name):
+    if name is None:
+        return None
+    if isinstance(name, str):
+        return {name}
+    return set(name)
+
+
+def _match_value(condition, value):
+    if condition is True:
+        return value is not None
+    if value is None:
+        return False
+    if isinstance(condition, re.Pattern):
+        return condition.search(value) is not None
+    if isinstance(condition, (list, tuple, set)):
+        return value in condition
+    return value == condition
+
+
+def _match_attrs(element, conditions):
+    attrs = element.attrs
+    for key, condition in conditions.items():
+        value = attrs.get(key)
+        if isinstance(value, list):
+            # Like BeautifulSoup: match any single class, or the whole class string
+            if not any(_match_value(condition, v) for v in value) and not _match_value(condition, " ".join(value)):
+                return False
+        elif not _match_value(condition, value):
+            return False
+    return True
+
+
+# ---------- Benchmark ----------
+
+COUNTRY_DOMAINS = {"USA": "amazon.com", "Canada": "amazon.ca", "UK": "amazon.co.uk", "India": "amazon.in"}
+
+
+def load_country_scraper(country):
+    """Import <country>/scraper.py under a unique module name"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    path = os.path.join(base_dir, country, "scraper.py")
+    spec = importlib.util.spec_from_file_location(f"{country.lower()}_scraper", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def page_url(path, country):
+    """Product URL for a saved page; files are expected to be named by ASIN"""
+    asin = os.path.splitext(os.path.basename(path))[0]
+    return f"https://www.{COUNTRY_DOMAINS[country]}/dp/{asin}"
+
+
+def benchmark(country, paths, backends=None, repeat=3):
+    scraper = load_country_scraper(country)
+    backends = backends or available_backends()
+    pages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append((path, page_url(path, country), f.read()))
+
+    reference = {}
+    results = {}
+    for backend in ["html.parser"] + [b for b in backends if b != "html.parser"]:
+        parse_time = 0.0
+        extract_time = 0.0
+        mismatches = []
+        for path, url, html in pages:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                soup = make_soup(html, backend)
+                parse_time += time.perf_counter() - start
+                start = time.perf_counter()
+                product = scraper.extract_product(soup, url)
+                extract_time += time.perf_counter() - start
+            if backend == "html.parser":
+                reference[path] = product
+            else:
+                fields = [k for k in reference[path] if reference[path][k] != product.get(k)]
+                if fields:
+                    mismatches.append((path, fields))
+        runs = max(1, len(pages) * repeat)
+        results[backend] = {
+            "parse_ms": parse_time / runs * 1000,
+            "extract_ms": extract_time / runs * 1000,
+            "mismatches": mismatches,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends over saved product pages")
+    parser.add_argument("pages", nargs="+", help="Saved product pages, named <ASIN>.html")
+    parser.add_argument("--country", default="USA", choices=sorted(COUNTRY_DOMAINS))
+    parser.add_argument("--backend", action="append", help="Backend to include (default: all available)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = benchmark(args.country, args.pages, args.backend, args.repeat)
+    print(f"{'backend':<12} {'parse ms':>10} {'extract ms':>11} {'total ms':>10}  output")
+    for backend, r in results.items():
+        status = "reference" if backend == "html.parser" else ("identical" if not r["mismatches"] else f"{len(r['mismatches'])} page(s) differ")
+        print(f"{backend:<12} {r['parse_ms']:>10.1f} {r['extract_ms']:>11.1f} {r['parse_ms'] + r['extract_ms']:>10.1f}  {status}")
+        for path, fields in r["mismatches"]:
+            print(f"    {path}: {', '.join(fields)}")
+    if any(r["mismatches"] for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
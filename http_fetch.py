@@ -0,0 +1,142 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+
+# Markers of Amazon's robot check / error templates. Any of these means the
+# plain HTTP response is not a usable product page.
+BOT_WALL_MARKERS = [
+    "/errors/validatecaptcha",
+    "captchacharacters",
+    "enter the characters you see below",
+    "type the characters you see in this image",
+    "sorry, we just need to make sure you're not a robot",
+    "to discuss automated access to amazon data please contact",
+    "sorry! something went wrong",
+]
+
+# Fields that must be present for the HTTP result to be accepted
+REQUIRED_FIELDS = ("title", "price")
+
+
+def is_bot_wall(status_code, html):
+    """Check whether a response is a captcha, robot check or throttling page"""
+    if status_code in (429, 503):
+        return True
+    lowered = (html or "").lower()
+    return any(marker in lowered for marker in BOT_WALL_MARKERS)
+
+
+def missing_fields(product, required=REQUIRED_FIELDS):
+    return [field for field in required if product.get(field) in [None, '', [], {}]]
+
+
+class HttpFetcher:
+    """Keep-alive HTTP client for product pages, shared by all scraping threads.
+
+    Every thread gets its own Session, but all sessions mount the same pooled
+    adapter so TCP/TLS connections are reused across threads. Each URL's
+    http-vs-selenium decision is recorded so the cheap path's hit rate can be
+    reported at the end of a run. With a `rates` RateController every request
+    waits for its marketplace's rate limit and feeds the response back to it.
+    """
+
+    def __init__(self, lang="en-US", user_agent=DEFAULT_USER_AGENT, pool_size=10, timeout=15, rates=None):
+        self.timeout = timeout
+        self.rates = rates
+        self.headers = {
+            "User-Agent": user_agent,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": f"{lang},{lang.split('-')[0]};q=0.9",
+        }
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.decisions = []
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def fetch(self, url, cookies=None):
+        """GET a page, returning (status_code, html). `cookies` are sent on top of the session's own."""
+        if self.rates:
+            self.rates.wait(url)
+        response = self.session.get(url, timeout=self.timeout, cookies=cookies)
+        return response.status_code, response.text
+
+    def record(self, url, tier, reason):
+        with self._lock:
+            self.decisions.append({"url": url, "tier": tier, "reason": reason})
+
+    def summary(self):
+        """Counts of pages served by each tier and the fraction handled over HTTP"""
+        with self._lock:
+            decisions = list(self.decisions)
+        total = len(decisions)
+        http_count = sum(1 for d in decisions if d["tier"] == "http")
+        cache_count = sum(1 for d in decisions if d["tier"] == "cache")
+        reasons = {}
+        for d in decisions:
+            if d["tier"] == "selenium":
+                reasons[d["reason"]] = reasons.get(d["reason"], 0) + 1
+        return {
+            "total": total,
+            "http": http_count,
+            "cache": cache_count,
+            "selenium": total - http_count - cache_count,
+            "http_fraction": http_count / total if total else 0.0,
+            "escalation_reasons": reasons,
+        }
+
+
+def fetch_product(url, fetcher, parse_html, browser_scrape, required=REQUIRED_FIELDS, cache=None, cookies=None):
+    """Scrape a product over plain HTTP, escalating to the browser when needed.
+
+    `parse_html(html, url)` runs the BeautifulSoup extractors over the raw page
+    and `browser_scrape(url)` is the Selenium path. The browser is only used
+    when the HTTP response is a bot wall, fails, or lacks a required field.
+    With an html_cache.HtmlCache, a fresh cached page is served without a
+    request and accepted pages are stored. `cookies` (e.g. a delivery
+    location's) go with the request.
+    """
+    html = cache.get(url) if cache else None
+    if html:
+        product = parse_html(html, url)
+        if not missing_fields(product, required):
+            fetcher.record(url, "cache", "fresh copy")
+            return product
+
+    try:
+        status, html = fetcher.fetch(url, cookies)
+    except requests.RequestException as e:
+        reason = f"http error: {type(e).__name__}"
+    else:
+        blocked = is_bot_wall(status, html)
+        if fetcher.rates:
+            fetcher.rates.report(url, "blocked" if blocked else "ok" if status == 200 else "error")
+        if blocked:
+            reason = "bot wall"
+        elif status != 200:
+            reason = f"http status {status}"
+        else:
+            product = parse_html(html, url)
+            missing = missing_fields(product, required)
+            if not missing:
+                if cache:
+                    cache.put(url, html, source="http")
+                fetcher.record(url, "http", "ok")
+                return product
+            reason = "missing " + ", ".join(missing)
+
+    fetcher.record(url, "selenium", reason)
+    return browser_scrape(url)
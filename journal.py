@@ -0,0 +1,65 @@
+import json
+import os
+import threading
+import time
+
+
+class ScrapeJournal:
+    """Append-only JSON-lines record of every product scraped, so a run can resume.
+
+    Each outcome is written and flushed to disk as soon as it completes. On a
+    rerun, products whose latest record succeeded are reused instead of being
+    scraped again; failed ones are retried. A line cut short by a crash is
+    skipped when the journal is read back. Records also note when each field
+    group was last scraped (see freshness.py).
+    """
+
+    def __init__(self, path, resume=True):
+        self.path = path
+        self.results = {}  # plan key -> product or None, latest record wins
+        self.scraped_at = {}  # plan key -> time of the latest record
+        self.fields_at = {}  # plan key -> {field group: time last scraped}
+        self._torn = False
+        if resume and os.path.exists(path):
+            self._load()
+        self._lock = threading.Lock()
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._torn:
+            self._file.write("\n")  # keep the next record off the half-written line
+
+    def _load(self):
+        skipped = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                self._torn = not line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    skipped += 1
+                    continue
+                key = tuple(record["key"])
+                self.results[key] = record["product"]
+                self.scraped_at[key] = record.get("at", 0)
+                self.fields_at[key] = record.get("fields_at") or {}
+        if skipped:
+            print(f"⚠️ Skipped {skipped} unreadable line(s) in {self.path}")
+
+    def completed(self, keys):
+        """{key: product} for the given keys that already have a successful record"""
+        return {key: self.results[key] for key in keys if self.results.get(key)}
+
+    def record(self, key, url, product, fields_at=None):
+        now = time.time()
+        line = json.dumps({"key": key, "url": url, "product": product, "at": now, "fields_at": fields_at},
+                          ensure_ascii=False)
+        with self._lock:
+            self.results[key] = product
+            self.scraped_at[key] = now
+            self.fields_at[key] = fields_at or {}
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
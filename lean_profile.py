@@ -0,0 +1,167 @@
+import json
+import threading
+
+# URL patterns blocked by the lean profile (Network.setBlockedURLs wildcard syntax).
+# Images, fonts and media are never read by the extractors - image URLs come from
+# the HTML attributes, not the downloaded files.
+BLOCKED_URL_PATTERNS = [
+    # Images
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    # Fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    # Video / audio
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.m4a",
+    # Ads, metrics and third-party trackers
+    "*amazon-adsystem.com*",
+    "*aax-us-east.amazon-adsystem.com*",
+    "*fls-na.amazon.*",
+    "*fls-eu.amazon.*",
+    "*fls-fe.amazon.*",
+    "*unagi.amazon.*",
+    "*unagi-na.amazon.*",
+    "*/uedata*",
+    "*/1/batch/1/OE/*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*googletagmanager.com*",
+    "*google-analytics.com*",
+    "*facebook.net*",
+    "*scorecardresearch.com*",
+    "*adsrvr.org*",
+]
+
+# Read back the page's own resource timing after load
+PAGE_STATS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? (nav.transferSize || 0) : 0;
+for (const r of resources) { bytes += r.transferSize || 0; }
+return {
+    bytes_transferred: bytes,
+    requests: resources.length + 1,
+    load_ms: nav ? Math.round(nav.loadEventEnd || nav.duration || 0) : null,
+    dom_ready_ms: nav ? Math.round(nav.domContentLoadedEventEnd || 0) : null
+};
+"""
+
+
+def apply_lean_profile(options):
+    """Add lean-profile settings to Chrome Options before the driver is created.
+
+    Images are blocked over CDP rather than through content settings, so the
+    blocking can be switched off for baseline sample pages.
+    """
+    options.add_argument("--autoplay-policy=user-gesture-required")
+    # Performance log lets us count the requests that were blocked
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def enable_request_blocking(driver, patterns=None):
+    """Block resource types and third-party hosts through the DevTools protocol"""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS if patterns is None else patterns})
+    driver.lean_profile = True
+    driver.lean_blocking = True
+
+
+def disable_request_blocking(driver):
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": []})
+    driver.lean_blocking = False
+
+
+def count_blocked_requests(driver):
+    """Drain the performance log and count requests the browser refused to send"""
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+    blocked = 0
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        if message.get("method") == "Network.loadingFailed" and message.get("params", {}).get("blockedReason"):
+            blocked += 1
+    return blocked
+
+
+def collect_page_stats(driver):
+    """Bytes transferred, request counts and load timings for the current page"""
+    try:
+        stats = driver.execute_script(PAGE_STATS_SCRIPT) or {}
+    except Exception:
+        stats = {}
+    stats["blocked_requests"] = count_blocked_requests(driver)
+    return stats
+
+
+class NetworkStats:
+    """Per-page network report for lean and full browser profiles.
+
+    Savings are measured against the average of full-profile pages. When every
+    driver is lean, set `baseline_every` to load every Nth page with blocking
+    switched off so a baseline exists for the same marketplace and run.
+    """
+
+    def __init__(self, baseline_every=0):
+        self.baseline_every = baseline_every
+        self.pages = []
+        self._lock = threading.Lock()
+        self._seen = 0
+
+    def before_page(self, driver):
+        """Prepare a pooled driver for the next page; returns the profile in use"""
+        if not getattr(driver, "lean_profile", False):
+            return "full"
+
+        with self._lock:
+            self._seen += 1
+            sample = self.baseline_every and self._seen % self.baseline_every == 0
+
+        if sample:
+            disable_request_blocking(driver)
+        elif not driver.lean_blocking:
+            enable_request_blocking(driver)
+        count_blocked_requests(driver)  # discard entries from earlier pages
+        return "full" if sample else "lean"
+
+    def after_page(self, driver, url, profile):
+        stats = collect_page_stats(driver)
+        stats["url"] = url
+        stats["profile"] = profile
+        with self._lock:
+            baseline = self._baseline()
+            if profile == "lean" and baseline:
+                stats["bytes_saved"] = max(0, round(baseline["bytes_transferred"] - (stats.get("bytes_transferred") or 0)))
+                if stats.get("load_ms") is not None and baseline["load_ms"] is not None:
+                    stats["load_ms_delta"] = round(stats["load_ms"] - baseline["load_ms"])
+            self.pages.append(stats)
+        return stats
+
+    def summary(self):
+        with self._lock:
+            lean = [p for p in self.pages if p["profile"] == "lean"]
+            baseline = self._baseline()
+            saved = [p["bytes_saved"] for p in lean if "bytes_saved" in p]
+            deltas = [p["load_ms_delta"] for p in lean if "load_ms_delta" in p]
+            blocked = [p["blocked_requests"] for p in lean if p.get("blocked_requests") is not None]
+            return {
+                "lean_pages": len(lean),
+                "baseline_pages": len(self.pages) - len(lean),
+                "baseline_bytes": baseline["bytes_transferred"] if baseline else None,
+                "avg_bytes_saved": sum(saved) / len(saved) if saved else None,
+                "avg_load_ms_delta": sum(deltas) / len(deltas) if deltas else None,
+                "avg_blocked_requests": sum(blocked) / len(blocked) if blocked else None,
+            }
+
+    def _baseline(self):
+        full = [p for p in self.pages if p["profile"] == "full" and p.get("bytes_transferred")]
+        if not full:
+            return None
+        loads = [p["load_ms"] for p in full if p.get("load_ms") is not None]
+        return {
+            "bytes_transferred": sum(p["bytes_transferred"] for p in full) / len(full),
+            "load_ms": sum(loads) / len(loads) if loads else None,
+        }
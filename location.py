@@ -0,0 +1,226 @@
+"""Delivery-location sessions: set each postcode once, then scrape with its cookies.
+
+Amazon keeps the delivery address against the session cookies, so the slow
+"Deliver to" flow (open the popover, type the postcode, apply) only has to run
+once per (marketplace, postcode). The cookies it leaves behind are saved to
+disk and injected into pooled browsers over CDP, without a page load, and sent
+with plain HTTP requests, so every page is scraped for the right city at no
+extra cost. The flow itself runs in the first browser that needs a postcode;
+until then, HTTP fetches for that postcode are left to the browser.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+COOKIE_TTL_HOURS = 24
+
+LOCATION_LINK = "#nav-global-location-popover-link, #glow-ingress-block"
+COOKIE_CONSENT = "#sp-cc-accept"
+# One input for most marketplaces; Canada splits the postal code in two
+POSTCODE_INPUTS = [
+    "#GLUXZipUpdateInput_0, #GLUXZipUpdateInput_1",
+    "#GLUXZipUpdateInput, input[name='GLUXZipUpdateInput']",
+]
+APPLY_BUTTON = "span#GLUXZipUpdate .a-button-input, #GLUXZipUpdate input[type='submit']"
+CONFIRM_BUTTON = "#GLUXConfirmClose, .a-popover-footer #GLUXConfirmClose"
+DELIVERY_LINE = "#glow-ingress-line2"
+
+
+def marketplace(url):
+    """amazon.<tld> for a URL"""
+    domain = urlsplit(url).netloc.lower()
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def set_delivery_postcode(driver, domain, postcode, timeout=15):
+    """Run the "Deliver to" flow in `driver` and return the cookies it leaves behind"""
+    wait = WebDriverWait(driver, timeout)
+    driver.get(f"https://www.{domain}/")
+    for button in driver.find_elements(By.CSS_SELECTOR, COOKIE_CONSENT):
+        button.click()
+    wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, LOCATION_LINK))).click()
+
+    def postcode_inputs(d):
+        for selector in POSTCODE_INPUTS:
+            inputs = [i for i in d.find_elements(By.CSS_SELECTOR, selector) if i.is_displayed()]
+            if inputs:
+                return inputs
+        return None
+
+    inputs = wait.until(postcode_inputs)
+    parts = postcode.split() if len(inputs) > 1 else [postcode]
+    for field, part in zip(inputs, parts):
+        field.clear()
+        field.send_keys(part)
+    wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, APPLY_BUTTON))).click()
+
+    # Some marketplaces ask for a confirmation; either way the header then shows the new address
+    first_part = postcode.split()[0].lower()
+
+    def applied(d):
+        for button in d.find_elements(By.CSS_SELECTOR, CONFIRM_BUTTON):
+            if button.is_displayed():
+                button.click()
+        lines = d.find_elements(By.CSS_SELECTOR, DELIVERY_LINE)
+        return bool(lines) and first_part in lines[0].text.lower()
+
+    try:
+        wait.until(applied)
+    except TimeoutException:
+        driver.refresh()  # the header is sometimes only updated on the next page load
+        wait.until(applied)
+    return driver.get_cookies()
+
+
+def _cdp_cookie(cookie, domain):
+    """A Selenium cookie in the shape of CDP's Network.setCookies"""
+    converted = {
+        "name": cookie["name"],
+        "value": cookie["value"],
+        "domain": cookie.get("domain") or f".{domain}",
+        "path": cookie.get("path", "/"),
+        "secure": cookie.get("secure", False),
+        "httpOnly": cookie.get("httpOnly", False),
+    }
+    if "expiry" in cookie:
+        converted["expires"] = cookie["expiry"]
+    if cookie.get("sameSite"):
+        converted["sameSite"] = cookie["sameSite"]
+    return converted
+
+
+class LocationSessions:
+    """Cookies for every (marketplace, postcode), set up on first use and shared by all workers.
+
+    Cookies are saved to `path` and reused by later runs for `ttl_hours`.
+    """
+
+    def __init__(self, path, ttl_hours=COOKIE_TTL_HOURS):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.sessions = {}  # "domain|postcode" -> {"cookies": [...], "at": time set}
+        self.failed = set()  # keys whose flow failed this run; scraped with the default location
+        self.flows = 0
+        self.unpinned = {}  # failed key -> pages scraped with the default location instead
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._load()
+
+    def _load(self):
+        """Pick up cookies saved by other processes (e.g. distributed workers), keeping the newest per key"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️ Ignoring unreadable location cookies in {self.path}")
+            return
+        with self._lock:
+            for key, session in saved.items():
+                if key not in self.sessions or session["at"] > self.sessions[key]["at"]:
+                    self.sessions[key] = session
+
+    def stored(self, url, postcode):
+        """Saved cookies that pin `url`'s marketplace to `postcode`, or None"""
+        with self._lock:
+            session = self.sessions.get(f"{marketplace(url)}|{postcode}")
+        if session and time.time() - session["at"] < self.ttl:
+            return session["cookies"]
+        return None
+
+    def cookies(self, url, postcode, driver):
+        """Cookies that pin `url`'s marketplace to `postcode`, running the flow in `driver` if needed.
+
+        Returns None if the flow fails; it is not tried again this run.
+        """
+        domain = marketplace(url)
+        key = f"{domain}|{postcode}"
+        with self._lock:
+            lock = self._key_locks.setdefault(key, threading.Lock())
+        with lock:  # one flow per key; other workers wait for its cookies
+            if key not in self.failed and self.stored(url, postcode) is None:
+                self._load()
+            cookies = self.stored(url, postcode)
+            if cookies is not None or key in self.failed:
+                return cookies
+            try:
+                cookies = set_delivery_postcode(driver, domain, postcode)
+            except (TimeoutException, WebDriverException) as e:
+                print(f"⚠️ Could not set the delivery location to {postcode} on {domain}: {type(e).__name__}; "
+                      f"scraping with the default location")
+                with self._lock:
+                    self.failed.add(key)
+                return None
+            print(f"📍 Delivery location on {domain} set to {postcode}")
+            with self._lock:
+                self.flows += 1
+                self.sessions[key] = {"cookies": cookies, "at": time.time()}
+            self._load()  # merge what other processes saved meanwhile, so the write keeps their cookies
+            with self._lock:
+                self._save()
+            return cookies
+
+    def pin(self, driver, url, postcode):
+        """Give `driver` the cookies for `postcode` unless it already has them.
+
+        Returns False if the postcode could not be set and `driver` is left with the default location.
+        """
+        key = f"{marketplace(url)}|{postcode}"
+        if getattr(driver, "pinned_location", None) == key:
+            return key not in self.failed
+        cookies = self.cookies(url, postcode, driver)
+        # Without cookies for this postcode, the default location beats another city's
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        if cookies:
+            driver.execute_cdp_cmd("Network.setCookies", {
+                "cookies": [_cdp_cookie(cookie, marketplace(url)) for cookie in cookies]
+            })
+        driver.pinned_location = key
+        return bool(cookies)
+
+    def has_failed(self, url, postcode):
+        """Whether the flow for `postcode` failed this run, so its pages get the default location"""
+        with self._lock:
+            return f"{marketplace(url)}|{postcode}" in self.failed
+
+    def mark_unpinned(self, url, postcode):
+        """Count a page meant for `postcode` that was scraped with the default location"""
+        key = f"{marketplace(url)}|{postcode}"
+        with self._lock:
+            self.unpinned[key] = self.unpinned.get(key, 0) + 1
+
+    def request_cookies(self, url, postcode):
+        """The saved cookies for `postcode` as a name -> value dict for requests, or None"""
+        cookies = self.stored(url, postcode)
+        return {cookie["name"]: cookie["value"] for cookie in cookies} if cookies else None
+
+    def _save(self):
+        # A temp file of our own: worker processes sharing the cookie file may be saving at the same time
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.sessions, f)
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        with self._lock:
+            return {
+                "locations": len(self.sessions),
+                "flows": self.flows,
+                "failed": {key: self.unpinned.get(key, 0) for key in sorted(self.failed)},
+            }
+
+
+def format_locations(summary):
+    lines = [f"Delivery locations: {summary['locations']} with cookies, {summary['flows']} set up this run"]
+    lines += [f"Could not set delivery location: {key.replace('|', ' ')} ({pages} pages scraped with the default location)"
+              for key, pages in summary["failed"].items()]
+    return lines
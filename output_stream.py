@@ -0,0 +1,126 @@
+"""Stream scraped products to per-city JSON-lines files as they arrive.
+
+Each line is one compact product tagged with the city, category and position
+(its 1-based place in that category's URL list) it was listed under. The
+legacy nested <city>.json ({category: [products]}) can be rebuilt from a
+.jsonl file at any time without loading every product at once:
+
+    python output_stream.py UK/scraped_output/glasgow.jsonl
+"""
+import argparse
+import json
+import os
+import threading
+
+TAGS = ("city", "category", "position")
+
+
+def stream_path(output_dir, city):
+    return os.path.join(output_dir, f"{city.lower()}.jsonl")
+
+
+class ProductStream:
+    """Append one line per city/category reference of every scraped product"""
+
+    def __init__(self, output_dir, plan):
+        self.output_dir = output_dir
+        self.plan = plan
+        self._files = {}
+        self._lock = threading.Lock()
+        for city, _, _, _ in plan.entries:
+            self._file(city)  # start every city afresh, even one that ends up with no products
+
+    def add(self, key, product, city=None):
+        """Write `product` once for every reference the plan has to `key` (only those in `city`, if given)"""
+        with self._lock:
+            for ref_city, category, position, url in self.plan.references.get(key, []):
+                if city is not None and ref_city != city:
+                    continue
+                line = {"city": ref_city, "category": category, "position": position, **product, "url": url}
+                f = self._file(ref_city)
+                f.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+                f.flush()
+
+    def add_completed(self, key, results):
+        """Write every city listing that the result for `key` completes (see ScrapePlan.completed_by)"""
+        for product_key, city, product in self.plan.completed_by(key, results):
+            self.add(product_key, product, city)
+
+    def _file(self, city):
+        f = self._files.get(city)
+        if f is None:
+            f = self._files[city] = open(stream_path(self.output_dir, city), "w", encoding="utf-8")
+        return f
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+
+
+def _index(jsonl_path, order):
+    """{category: [(position, byte offset)]} for every readable line of a stream"""
+    index = {category: [] for category in order}
+    if not os.path.exists(jsonl_path):
+        return index
+    with open(jsonl_path, "rb") as f:
+        offset = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None  # cut short by a crash
+            if record:
+                if record["category"] not in index:
+                    index[record["category"]] = []
+                    order.append(record["category"])
+                index[record["category"]].append((record["position"], offset))
+            offset += len(line)
+    return index
+
+
+def convert(jsonl_path, json_path=None, categories=None):
+    """Write the legacy nested JSON for a .jsonl stream, byte-for-byte as json.dump(indent=2) would.
+
+    Categories come out in the order of `categories` (include empty ones this
+    way) and then in first-seen order; products in their listed position.
+    Only one product is held in memory at a time.
+    """
+    json_path = json_path or os.path.splitext(jsonl_path)[0] + ".json"
+    order = list(categories or [])
+    index = _index(jsonl_path, order)
+    with open(json_path, "w", encoding="utf-8") as out:
+        if not order:
+            out.write("{}")
+            return json_path
+        src = open(jsonl_path, "rb") if os.path.exists(jsonl_path) else None
+        try:
+            out.write("{")
+            for c, category in enumerate(order):
+                out.write(("," if c else "") + "\n  " + json.dumps(category, ensure_ascii=False) + ": [")
+                entries = sorted(index[category])
+                for p, (_, offset) in enumerate(entries):
+                    src.seek(offset)
+                    product = json.loads(src.readline())
+                    for tag in TAGS:
+                        del product[tag]
+                    body = json.dumps(product, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+                    out.write(("," if p else "") + "\n    " + body)
+                out.write("\n  ]" if entries else "]")
+            out.write("\n}")
+        finally:
+            if src:
+                src.close()
+    return json_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild legacy <city>.json files from streamed .jsonl output")
+    parser.add_argument("files", nargs="+", help="<city>.jsonl files")
+    args = parser.parse_args()
+    for path in args.files:
+        print(f"✅ {path} -> {convert(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Elements each group of extractors reads. A section is ready as soon as any
+# one of its selectors is present in the DOM.
+SECTION_SELECTORS = {
+    "title": [
+        "#productTitle",
+        "#ebooksProductTitle",
+        "#titleSection .a-size-large",
+        "#title",
+    ],
+    "price": [
+        "#corePriceDisplay_desktop_feature_div .a-offscreen",
+        "#corePrice_feature_div .a-offscreen",
+        "#corePrice_desktop .a-offscreen",
+        "#apex_desktop .a-price",
+        ".apexPriceToPay",
+        "#priceblock_ourprice",
+        "#priceblock_dealprice",
+        "#price_inside_buybox",
+        "#kindle-price",
+        ".a-price .a-offscreen",
+    ],
+    "buybox": [
+        "#desktop_buyBox",
+        "#buybox",
+        "#desktop_qualifiedBuybox",
+        "#apex_desktop",
+        "#newAccordionCaption_feature_div",
+    ],
+    "qa": [
+        "#ask-dp-search_feature_div [data-hook='pa-answer-display-question']",
+        "#customerQA [data-hook='pa-answer-display-question']",
+    ],
+}
+
+# Seconds to wait for each section before giving up and extracting anyway
+SECTION_DEADLINES = {
+    "title": 10,
+    "price": 4,
+    "buybox": 3,
+    "qa": 2,
+}
+
+POLL_FREQUENCY = 0.1
+
+_ANY_PRESENT_SCRIPT = "return arguments[0].some(s => document.querySelector(s) !== null);"
+
+
+def wait_for_section(driver, section, deadline=None):
+    """Wait until any of the section's selectors is present.
+
+    Returns (seconds waited, whether the section became ready).
+    """
+    selectors = SECTION_SELECTORS[section]
+    deadline = SECTION_DEADLINES[section] if deadline is None else deadline
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, deadline, poll_frequency=POLL_FREQUENCY).until(
+            lambda d: d.execute_script(_ANY_PRESENT_SCRIPT, selectors)
+        )
+        ready = True
+    except TimeoutException:
+        ready = False
+    return time.monotonic() - start, ready
+
+
+def wait_for_sections(driver, sections, timings=None, deadlines=None, only=None):
+    """Wait for several sections in order, recording time spent on each into `timings`.
+
+    With `only`, sections not in it are not waited for.
+    """
+    timings = {} if timings is None else timings
+    deadlines = deadlines or {}
+    for section in sections:
+        if only is not None and section not in only:
+            continue
+        waited, ready = wait_for_section(driver, section, deadlines.get(section))
+        timings[section] = {"waited": round(waited, 3), "ready": ready}
+    return timings
+
+
+def format_timings(timings):
+    parts = []
+    for section, timing in timings.items():
+        flag = "" if timing["ready"] else " (deadline)"
+        parts.append(f"{section} {timing['waited']:.1f}s{flag}")
+    return ", ".join(parts)
+
+
+class WaitLog:
+    """Per-URL record of time spent waiting on each page section"""
+
+    def __init__(self):
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def record(self, url, timings, parse=None):
+        """Record a page's section timings and, optionally, its dom_snapshot.DomSnapshot stats"""
+        with self._lock:
+            self.entries.append({"url": url, "timings": timings, "parse": parse})
+
+    def summary(self):
+        """Average wait and deadline misses per section"""
+        with self._lock:
+            entries = list(self.entries)
+        summary = {}
+        for entry in entries:
+            for section, timing in entry["timings"].items():
+                stats = summary.setdefault(section, {"pages": 0, "total_wait": 0.0, "missed": 0})
+                stats["pages"] += 1
+                stats["total_wait"] += timing["waited"]
+                if not timing["ready"]:
+                    stats["missed"] += 1
+        for stats in summary.values():
+            stats["avg_wait"] = stats["total_wait"] / stats["pages"]
+        return summary
+
+    def parse_summary(self):
+        """Bytes parsed and time spent parsing, over the pages recorded with DomSnapshot stats"""
+        with self._lock:
+            parses = [entry["parse"] for entry in self.entries if entry.get("parse")]
+        summary = {"pages": len(parses), "full_parse_bytes": 0, "fragment_bytes": 0, "fragments": 0,
+                   "parse_seconds": 0.0}
+        for parse in parses:
+            for field in ("full_parse_bytes", "fragment_bytes", "fragments", "parse_seconds"):
+                summary[field] += parse[field]
+        summary["avg_parse_ms"] = summary["parse_seconds"] * 1000 / len(parses) if parses else None
+        return summary
@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+_STOP = object()
+_worker = threading.local()  # the Utilisation of the pipeline the current thread works for, if any
+
+
+@contextmanager
+def waiting():
+    """Count the calling pipeline worker as idle for the duration, e.g. while it sleeps off a rate limit backoff"""
+    utilisation = getattr(_worker, "utilisation", None)
+    if utilisation is None:
+        yield
+        return
+    utilisation.change(-1)
+    try:
+        yield
+    finally:
+        utilisation.change(+1)
+
+
+class Utilisation:
+    """Time-weighted share of workers busy, overall and per sampling interval"""
+
+    def __init__(self, workers, sample_every=10.0):
+        self.workers = workers
+        self.sample_every = sample_every
+        self.samples = []  # {"at": seconds since start, "utilisation": 0..1, "queued": tasks waiting}
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._start = self._last = time.monotonic()
+        self._sampled_seconds = 0.0
+        self._sampled_at = self._start
+
+    def change(self, delta):
+        with self._lock:
+            self._advance()
+            self._busy += delta
+
+    def sample(self, queued=0):
+        with self._lock:
+            self._advance()
+            interval = self._last - self._sampled_at
+            busy = self._busy_seconds - self._sampled_seconds
+            self._sampled_at, self._sampled_seconds = self._last, self._busy_seconds
+            if interval > 0:
+                self.samples.append({
+                    "at": round(self._last - self._start, 1),
+                    "utilisation": busy / (interval * self.workers),
+                    "queued": queued,
+                })
+
+    def _advance(self):
+        now = time.monotonic()
+        self._busy_seconds += self._busy * (now - self._last)
+        self._last = now
+
+    def summary(self):
+        with self._lock:
+            self._advance()
+            elapsed = self._last - self._start
+            return {
+                "workers": self.workers,
+                "elapsed": elapsed,
+                "busy_seconds": self._busy_seconds,
+                "avg_utilisation": self._busy_seconds / (elapsed * self.workers) if elapsed else 0.0,
+                "samples": list(self.samples),
+            }
+
+
+class WorkPipeline:
+    """A fixed set of worker threads fed from one bounded queue for a whole run.
+
+    Unlike a ThreadPoolExecutor per batch, workers never wait for a batch's
+    slowest task: as soon as one finishes it takes the next queued item,
+    whichever city or category it belongs to. The submission queue is bounded
+    so the feeder stays only a few items ahead of the workers.
+    """
+
+    def __init__(self, func, workers=3, queue_size=None, sample_every=10.0):
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size or workers * 2
+        self.utilisation = Utilisation(workers, sample_every)
+
+    def run(self, items):
+        """Yield (item, result) for every item as workers complete them.
+
+        Closing the generator early stops the workers once their current item is done.
+        """
+        items = list(items)
+        tasks = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue()
+        done = threading.Event()
+
+        def feed():
+            for item in items + [_STOP] * self.workers:
+                while not done.is_set():
+                    try:
+                        tasks.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if done.is_set():
+                    return  # consumer stopped early; leave the remaining items unqueued
+
+        def work():
+            _worker.utilisation = self.utilisation
+            while True:
+                try:
+                    item = tasks.get(timeout=0.5)
+                except queue.Empty:
+                    if done.is_set():
+                        return
+                    continue
+                if item is _STOP or done.is_set():
+                    return  # the run is over, or the consumer stopped early and the rest is not wanted
+                self.utilisation.change(+1)
+                try:
+                    result = self.func(item)
+                except Exception as e:
+                    print(f"❌ Worker error on {item!r}: {e}")
+                    result = None
+                finally:
+                    self.utilisation.change(-1)
+                results.put((item, result))
+
+        def sample():
+            while not done.wait(self.utilisation.sample_every):
+                self.utilisation.sample(tasks.qsize())
+
+        feeder, sampler = threading.Thread(target=feed, daemon=True), threading.Thread(target=sample, daemon=True)
+        workers = [threading.Thread(target=work, daemon=True) for _ in range(self.workers)]
+        for thread in [feeder, sampler] + workers:
+            thread.start()
+        try:
+            for _ in range(len(items)):
+                yield results.get()
+        finally:
+            done.set()
+            self.utilisation.sample(tasks.qsize())
+            # Workers finish the item in hand and then stop, even if the consumer stopped early
+            for thread in [feeder, sampler] + workers:
+                thread.join()
+
+
+def format_utilisation(summary):
+    """Lines for a scrape log: overall utilisation and the per-interval timeline"""
+    lines = [
+        f"Worker utilisation: {summary['avg_utilisation']:.0%} of {summary['workers']} workers "
+        f"over {summary['elapsed']:.0f}s"
+    ]
+    for s in summary["samples"]:
+        bar = "#" * round(s["utilisation"] * 20)
+        lines.append(f"  {s['at']:>7.1f}s {s['utilisation']:>5.0%} {bar:<20} queued {s['queued']}")
+    return lines
@@ -0,0 +1,149 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+from pipeline import waiting
+
+# Requests per second for each marketplace: where it starts, and the range it
+# may adapt within. `burst` is how many requests can go out back to back.
+RATE_LIMITS = {
+    "amazon.com": {"rate": 0.5, "min_rate": 0.05, "max_rate": 2.0, "burst": 3},
+    "amazon.ca": {"rate": 0.4, "min_rate": 0.05, "max_rate": 1.5, "burst": 2},
+    "amazon.co.uk": {"rate": 0.4, "min_rate": 0.05, "max_rate": 1.5, "burst": 2},
+    "amazon.in": {"rate": 0.3, "min_rate": 0.05, "max_rate": 1.0, "burst": 2},
+}
+DEFAULT_LIMIT = {"rate": 0.3, "min_rate": 0.05, "max_rate": 1.0, "burst": 2}
+
+INCREASE = 0.02  # req/s added after each healthy response
+DECREASE = 0.5  # rate multiplier after a bot wall or throttling response
+
+
+def domain_of(url):
+    domain = urlsplit(url).netloc.lower()
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+class AimdLimiter:
+    """Token bucket whose refill rate follows AIMD.
+
+    Every healthy response adds INCREASE req/s up to `max_rate`; a bot wall
+    or 429/503 multiplies the rate by DECREASE down to `min_rate` and empties
+    the bucket, so the next request waits a full interval at the new rate.
+    Concurrent requests caught by the same block only cut the rate once.
+    """
+
+    def __init__(self, rate, min_rate, max_rate, burst=1, increase=INCREASE, decrease=DECREASE):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.requests = 0
+        self.blocked = 0
+        self.backoffs = 0
+        self.waited = 0.0
+        self.history = []  # (seconds since start, rate) after every backoff
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._start = self._updated = time.monotonic()
+        self._last_backoff = float("-inf")
+
+    def acquire(self):
+        """Block until this domain may be sent another request"""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1  # reserve a token now, even if it has to be waited for
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.requests += 1
+            self.waited += delay
+        if delay:
+            with waiting():  # not busy time for a pipeline worker
+                time.sleep(delay)
+
+    def success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def backoff(self):
+        """Cut the rate; returns the new rate, or None if this block was already answered"""
+        with self._lock:
+            self.blocked += 1
+            now = time.monotonic()
+            if now - self._last_backoff < 1 / self.rate:
+                return None
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+            self._last_backoff = now
+            self.backoffs += 1
+            self.history.append((round(now - self._start, 1), self.rate))
+            return self.rate
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateController:
+    """One AimdLimiter per marketplace, configured from RATE_LIMITS plus any `limits` overrides"""
+
+    def __init__(self, limits=None):
+        self.limits = {domain: dict(limit) for domain, limit in RATE_LIMITS.items()}
+        for domain, override in (limits or {}).items():
+            self.limits[domain] = dict(self.limits.get(domain, DEFAULT_LIMIT), **override)
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url):
+        domain = domain_of(url)
+        with self._lock:
+            limiter = self._limiters.get(domain)
+            if limiter is None:
+                limiter = self._limiters[domain] = AimdLimiter(**self.limits.get(domain, DEFAULT_LIMIT))
+            return limiter
+
+    def wait(self, url):
+        self.limiter(url).acquire()
+
+    def report(self, url, outcome):
+        """Feed back a response: "ok" speeds the domain up, "blocked" backs it off, anything else is neutral"""
+        limiter = self.limiter(url)
+        if outcome == "ok":
+            limiter.success()
+        elif outcome == "blocked":
+            rate = limiter.backoff()
+            if rate is not None:
+                print(f"🐢 {domain_of(url)} blocked, backing off to {rate:.2f} req/s")
+
+    def rates(self):
+        """Current requests per second for every domain seen so far"""
+        with self._lock:
+            return {domain: limiter.rate for domain, limiter in self._limiters.items()}
+
+    def summary(self):
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            domain: {
+                "rate": limiter.rate,
+                "requests": limiter.requests,
+                "blocked": limiter.blocked,
+                "backoffs": limiter.backoffs,
+                "avg_wait": limiter.waited / limiter.requests if limiter.requests else 0.0,
+                "history": list(limiter.history),
+            }
+            for domain, limiter in limiters.items()
+        }
+
+
+def format_rates(summary):
+    """Lines for a scrape log: each domain's request rate and backoffs"""
+    lines = []
+    for domain, stats in summary.items():
+        lines.append(f"Request rate {domain}: {stats['rate']:.2f} req/s now, {stats['requests']} requests, "
+                     f"{stats['blocked']} blocked, {stats['backoffs']} backoffs, {stats['avg_wait']:.2f}s avg wait")
+        for at, rate in stats["history"]:
+            lines.append(f"  {at:>7.1f}s backed off to {rate:.2f} req/s")
+    return lines
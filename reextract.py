@@ -0,0 +1,182 @@
+"""Re-run the current extractors over archived product pages instead of scraping again.
+
+After a selector fix in a scraper.py, this applies it to the products already
+saved in a country's scraped_output: every product whose raw page is still in
+the country's page cache (see html_cache.py) is parsed again on a pool of
+worker processes, one per core by default. The refreshed <city>.json files go
+to scraped_output/reextracted/ (or replace the originals with --in-place), and
+a per-field summary of what changed is printed and saved as reextract_log.txt.
+
+    python reextract.py                                   # every country, every city with output
+    python reextract.py --country UK --city glasgow
+    python reextract.py --country USA --processes 4 --in-place
+
+Products without an archived page are kept as they were.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+from html_cache import HtmlCache, read_page
+from run_scrape import COUNTRIES, load_country_driver
+from scrape_plan import canonical_key
+
+_driver = None  # the country driver loaded in each worker process
+
+
+def _load_worker(country):
+    global _driver
+    _driver = load_country_driver(country)
+
+
+def _extract(task):
+    key, url, path = task
+    try:
+        return key, _driver.extract_product_from_html(read_page(path), url), None
+    except Exception as e:
+        return key, None, str(e)
+
+
+def _empty(value):
+    return value in (None, "", [], {})
+
+
+class FieldDiff:
+    """Per-field counts of how re-extracted products differ from the previous ones"""
+
+    def __init__(self):
+        self.fields = {}  # field -> {"unchanged", "changed", "added", "removed"}
+
+    def compare(self, old, new):
+        for field in list(old) + [f for f in new if f not in old]:
+            before, after = old.get(field), new.get(field)
+            if _empty(before) and _empty(after) or before == after:
+                change = "unchanged"
+            elif _empty(before):
+                change = "added"
+            elif _empty(after):
+                change = "removed"
+            else:
+                change = "changed"
+            counts = self.fields.setdefault(field, {"unchanged": 0, "changed": 0, "added": 0, "removed": 0})
+            counts[change] += 1
+
+    def summary(self):
+        return {field: dict(counts) for field, counts in self.fields.items()}
+
+
+def format_diff(summary):
+    """Lines for a re-extraction log, fields with the most differences first"""
+    ranked = sorted(summary.items(), key=lambda item: -(item[1]["changed"] + item[1]["added"] + item[1]["removed"]))
+    return [
+        f"{field}: {c['changed']} changed, {c['added']} added, {c['removed']} removed, {c['unchanged']} unchanged"
+        for field, c in ranked
+    ]
+
+
+def previous_outputs(driver, cities=None):
+    """{city location: (json path, {category: [products]})} for every selected city with saved output"""
+    outputs = {}
+    for city_data in driver.load_cities(cities):
+        path = os.path.join(driver.OUTPUT_DIR, f"{city_data['location'].lower()}.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                outputs[city_data["location"]] = path, json.load(f)
+    return outputs
+
+
+def reextract_country(country, cities=None, processes=None, in_place=False):
+    driver = load_country_driver(country)
+    print(f"\n🌍 {country}")
+    if not driver.HTML_CACHE_HOURS:
+        print(f"⚠️ {country}: the page cache is disabled (HTML_CACHE_HOURS = 0), nothing to re-extract")
+        return
+    outputs = previous_outputs(driver, cities)
+    if not outputs:
+        print(f"⚠️ {country}: no saved output for the requested cities in {driver.OUTPUT_DIR}")
+        return
+
+    # Each unique product is parsed once per delivery postcode, however many categories list it;
+    # offer fields differ between cities, so one city's page never stands in for another's
+    cache = HtmlCache(driver.HTML_CACHE_DIR, read_only=True)  # the archive being replayed is left as it is
+    # Pages are archived per delivery postcode (none for cities scraped with the default location)
+    postcodes = {}
+    if driver.PIN_LOCATION:
+        postcodes = {c["location"]: c.get("postcode") or c.get("pincode") for c in driver.load_cities(cities)}
+    tasks, seen, missing = [], set(), set()
+    for city, (_, result) in outputs.items():
+        for products in result.values():
+            for product in products:
+                key = canonical_key(product.get("url") or "")
+                task_key = key, postcodes.get(city)
+                if key is None or task_key in seen:
+                    continue
+                seen.add(task_key)
+                path = cache.locate(product["url"], postcodes.get(city), max_age=float("inf"))
+                if path:
+                    tasks.append((task_key, product["url"], path))
+                else:
+                    missing.add(task_key)
+    print(f"  🗃️ {len(tasks)} archived pages to re-extract, {len(missing)} products without one")
+
+    refreshed, errors = {}, {}
+    with ProcessPoolExecutor(processes, initializer=_load_worker, initargs=(country,)) as pool:
+        for key, product, error in pool.map(_extract, tasks, chunksize=8):
+            if error:
+                errors[key] = error
+            else:
+                refreshed[key] = product
+
+    diff = FieldDiff()
+    out_dir = driver.OUTPUT_DIR if in_place else os.path.join(driver.OUTPUT_DIR, "reextracted")
+    os.makedirs(out_dir, exist_ok=True)
+    for city, (path, result) in outputs.items():
+        for category, products in result.items():
+            for i, old in enumerate(products):
+                new = refreshed.get((canonical_key(old.get("url") or ""), postcodes.get(city)))
+                if new:
+                    products[i] = {**new, "url": old["url"]}
+                    diff.compare(old, products[i])
+        output_path = os.path.join(out_dir, os.path.basename(path))
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"  ✅ {city}: saved to {output_path}")
+
+    lines = [
+        f"Re-extracted products: {len(refreshed)}",
+        f"Without an archived page (kept as before): {len(missing)}",
+        f"Extraction errors (kept as before): {len(errors)}",
+        "",
+        "Field changes per product listing:",
+        *format_diff(diff.summary()),
+    ]
+    for line in lines:
+        print(f"  {line}" if line else "")
+    if errors:
+        lines += ["", "Extraction errors:", *(f"{key[1]}{f' ({postcode})' if postcode else ''}: {error}"
+                                             for (key, postcode), error in errors.items())]
+    log_path = os.path.join(out_dir, "reextract_log.txt")
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"  Re-extraction log saved to {log_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract saved products from their archived product pages")
+    parser.add_argument("--country", action="append", choices=COUNTRIES, help="Country to include (default: all)")
+    parser.add_argument("--city", action="append", help="City to include, any case (default: every city with output)")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--in-place", action="store_true", help="Overwrite <city>.json instead of writing to reextracted/")
+    args = parser.parse_args()
+
+    cities = [city.lower() for city in args.city] if args.city else None
+    for country in args.country or COUNTRIES:
+        reextract_country(country, cities, args.processes, args.in_place)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Scrape with one coordinator and any number of worker processes sharing a broker.
+
+The coordinator plans the run exactly like run_scrape.py (same countries,
+cities, journals and output files) but only enqueues each unique product as a
+job. Workers, on this host or others, claim jobs, scrape them with their own
+browsers and push the results back. The coordinator records every result,
+re-enqueues failures with their retry backoff and writes the city files once
+every job is settled.
+
+    python run_distributed.py coordinator --broker sqlite:///scrape_queue.db --country UK
+    python run_distributed.py worker --broker sqlite:///scrape_queue.db --threads 3
+    python run_distributed.py local --workers 4 --country UK   # both, with 4 worker processes on this host
+
+A SQLite broker works for any number of processes on one host; use a
+redis:// broker when workers run on several hosts.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+from broker import open_broker
+from driver_pool import BrowserBudget
+from failures import RetryQueue, failure_kind
+from freshness import RefreshPlanner
+from run_scrape import COUNTRIES, interleave, load_country_driver, plan_countries
+
+DEFAULT_BROKER = "sqlite:///" + os.path.join(BASE_DIR, "scrape_queue.db")
+POLL_SECONDS = 2
+
+
+class Worker:
+    """Claims jobs from a broker and scrapes them, loading each country's driver on first use"""
+
+    def __init__(self, broker, name=None):
+        self.broker = broker
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.countries = {}  # country -> (driver module, resources from open_resources())
+        self.threads = 1
+        self.budget = None  # browsers of all countries together, one per thread
+        self._lock = threading.Lock()
+
+    def country(self, country):
+        with self._lock:
+            if country not in self.countries:
+                driver = load_country_driver(country)
+                self.countries[country] = driver, driver.open_resources(self.threads, self.budget)
+            return self.countries[country]
+
+    def scrape(self, job):
+        driver, resources = self.country(job["country"])
+        refresh = None
+        if job["groups"]:  # only the groups the coordinator found stale; it merges them into the old record
+            refresh = RefreshPlanner(driver.FRESHNESS_HOURS).refresh(None, job["groups"])
+        result = driver.scrape_url_safe(job["url"], *resources, refresh, job["postcode"])
+        if driver.is_successful(result):
+            self.broker.complete(job, self.name, result)
+            print(f"    SUCCESS ({job['country']}): {job['url']}")
+        else:
+            kind = failure_kind(result)
+            self.broker.complete(job, self.name, None, kind)
+            print(f"    FAILED ({job['country']}): {job['url']} | {kind}")
+
+    def work(self, idle_exit=None):
+        """Claim and scrape jobs until nothing has been due for `idle_exit` seconds (forever for None)"""
+        idle_since = time.monotonic()
+        while True:
+            job = self.broker.claim(self.name)
+            if job is None:
+                if idle_exit is not None and time.monotonic() - idle_since > idle_exit:
+                    return
+                time.sleep(POLL_SECONDS)
+                continue
+            self.scrape(job)
+            idle_since = time.monotonic()
+
+    def run(self, threads=1, idle_exit=None):
+        print(f"👷 Worker {self.name} with {threads} threads")
+        self.threads = threads  # every thread may need a browser of the same country
+        self.budget = BrowserBudget(threads)
+        workers = [threading.Thread(target=self.work, args=(idle_exit,)) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        try:
+            for thread in workers:
+                thread.join()
+        finally:
+            for _, (pool, *_) in self.countries.values():
+                pool.close()
+
+
+def coordinate(broker, countries, cities=None, all_cities=False, fresh=False, on_enqueued=None):
+    """Enqueue every pending product, collect results until all are settled, then write the outputs.
+
+    `on_enqueued` is called once the jobs are in the broker, e.g. to start local workers.
+    """
+    runs = plan_countries(countries, cities, all_cities, fresh, scrape=False)
+    broker.reset()  # the coordinator owns the queue; jobs left by an earlier run are stale
+    tasks = interleave(runs)
+    jobs = broker.enqueue({"country": run.country, "key": key, "url": url, "postcode": run.postcode(key),
+                           "groups": run.stale_groups(key)} for run, key, url in tasks)
+    outstanding = {job["id"]: task for job, task in zip(jobs, tasks)}
+    print(f"\n📬 Enqueued {len(jobs)} unique products across {len(runs)} countries")
+    if on_enqueued:
+        on_enqueued()
+
+    retries = RetryQueue()
+    cursor, settled = 0, 0
+    try:
+        while outstanding:
+            cursor, results = broker.results(cursor)
+            if not results:
+                time.sleep(POLL_SECONDS)
+                continue
+            for job, product, kind in results:
+                task = outstanding.pop(job["id"], None)
+                if task is None:
+                    continue  # a second result for a job whose lease ran out
+                country_run, key, url = task
+                if country_run.record(key, url, product):
+                    retries.succeeded(task)
+                    settled += 1
+                    print(f"    [{settled}/{len(jobs)}] SUCCESS ({country_run.country}): {url}")
+                    continue
+                delay = retries.defer(task, kind, country_run.retry_policies)
+                if delay is not None:
+                    [retry] = broker.enqueue([{"country": country_run.country, "key": key, "url": url,
+                                               "postcode": country_run.postcode(key),
+                                               "groups": country_run.stale_groups(key)}], delay)
+                    outstanding[retry["id"]] = task
+                    print(f"    FAILED ({country_run.country}): {url} | {kind}, retry queued ({delay}s backoff)")
+                    continue
+                settled += 1
+                print(f"    [{settled}/{len(jobs)}] FAILED ({country_run.country}): {url} | {kind}, giving up")
+    finally:
+        for country_run in runs:
+            country_run.finish(retries=retries.summary())
+
+
+def _work(spec, threads):
+    Worker(open_broker(spec)).run(threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape with a coordinator and workers sharing a job broker")
+    parser.add_argument("role", choices=["coordinator", "worker", "local"])
+    parser.add_argument("--broker", default=DEFAULT_BROKER, help="sqlite:///path.db or redis://host:port/db")
+    parser.add_argument("--country", action="append", choices=COUNTRIES, help="Country to include (default: all)")
+    parser.add_argument("--city", action="append", help="City to include, any case (default: each script's CITIES)")
+    parser.add_argument("--all-cities", action="store_true", help="Scrape every city in each input file")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the scrape journals and start new ones")
+    parser.add_argument("--threads", type=int, default=3, help="Scraping threads per worker process")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes to start with the local role")
+    parser.add_argument("--idle-exit", type=float, help="Stop a worker after this many seconds without jobs")
+    args = parser.parse_args()
+
+    if args.role == "worker":
+        Worker(open_broker(args.broker)).run(args.threads, args.idle_exit)
+        return
+
+    cities = [city.lower() for city in args.city] if args.city else None
+    broker = open_broker(args.broker)
+    processes = []
+    if args.role == "local":
+        processes = [multiprocessing.Process(target=_work, args=(args.broker, args.threads), daemon=True)
+                     for _ in range(args.workers)]
+    try:
+        coordinate(broker, args.country or COUNTRIES, cities, args.all_cities, args.fresh,
+                   on_enqueued=lambda: [process.start() for process in processes])
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        broker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Scrape several countries and cities in one run from a single global work queue.
+
+Each country keeps its own driver pool, HTTP fetcher and output folder (its
+scraping_all_products_data.py settings apply), but the unique products of
+every selected country are interleaved into one queue, so workers move on to
+another marketplace instead of idling between categories, cities or countries.
+
+    python run_scrape.py                              # every country, each script's CITIES
+    python run_scrape.py --country USA --country UK   # just these countries
+    python run_scrape.py --city "new york" --city london
+    python run_scrape.py --all-cities --workers 8
+    python run_scrape.py --fresh                      # ignore earlier progress
+
+Progress is journaled per country (see journal.py), so rerunning after a
+crash only scrapes the products that have not succeeded yet.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+from itertools import zip_longest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+from driver_pool import BrowserBudget
+from failures import RetryQueue, failure_kind, merge_policies
+from freshness import RefreshPlanner
+from pipeline import WorkPipeline, format_utilisation
+
+COUNTRIES = ["USA", "Canada", "UK", "India"]
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_country_driver(country):
+    """Import <country>/scraping_all_products_data.py with its own scraper module.
+
+    The driver does `from scraper import ...`; every country has a scraper.py,
+    so the right one is put in sys.modules for the duration of the import.
+    """
+    folder = os.path.join(BASE_DIR, country)
+    scraper = load_module(f"{country.lower()}_scraper", os.path.join(folder, "scraper.py"))
+    previous = sys.modules.get("scraper")
+    sys.modules["scraper"] = scraper
+    try:
+        return load_module(f"{country.lower()}_scraping", os.path.join(folder, "scraping_all_products_data.py"))
+    finally:
+        if previous is None:
+            sys.modules.pop("scraper", None)
+        else:
+            sys.modules["scraper"] = previous
+
+
+class CountryRun:
+    """One country's share of the run: its cities, plan, resources and results.
+
+    With scrape=False no browsers or fetchers are set up; results are recorded
+    from elsewhere (see run_distributed.py). Otherwise the driver pool and HTTP
+    sessions are sized for `workers` threads (default: the country's MAX_WORKERS),
+    with the browsers counted against `budget` (a driver_pool.BrowserBudget).
+    """
+
+    def __init__(self, country, driver, cities_data, scrape=True, workers=None, budget=None):
+        self.country = country
+        self.driver = driver
+        self.cities_data = cities_data
+        print(f"\n🌍 {country}")
+        self.plan = driver.plan_cities(cities_data)
+        self.pool = self.fetcher = self.network_stats = self.wait_log = self.rates = self.cache = self.locations = None
+        if scrape:
+            (self.pool, self.fetcher, self.network_stats, self.wait_log, self.rates, self.cache,
+             self.locations) = driver.open_resources(workers, budget)
+        self.journal = driver.open_journal()
+        self.stream = driver.open_stream(self.plan)
+        self.retry_policies = merge_policies(driver.RETRY_POLICIES)
+        self.planner = RefreshPlanner(driver.FRESHNESS_HOURS)
+        self.results, self.refreshes = self.planner.plan(self.journal, self.plan.targets, self.plan.offers,
+                                                         self.plan.city_for)
+        if self.results or self.refreshes:
+            print(f"  ↩️ Resuming: {len(self.results)} products current in the journal, "
+                  f"{len(self.refreshes)} to refresh")
+        if self.stream:
+            for key in self.results:
+                if key not in self.plan.offers:  # a product's listings include those joined with its city offers
+                    self.stream.add_completed(key, self.results)
+
+    def tasks(self):
+        return [(self, key, url) for key, url in self.plan.targets.items() if key not in self.results]
+
+    def postcode(self, key):
+        """Delivery postcode to scrape `key` with, or None while locations are not pinned"""
+        return self.plan.postcode_for(key) if self.driver.PIN_LOCATION else None
+
+    def stale_groups(self, key):
+        """Field groups a refresh of `key` brings current, or None for a full scrape"""
+        refresh = self.refreshes.get(key)
+        return list(refresh.groups) if refresh else None
+
+    def scrape(self, key, url):
+        return self.driver.scrape_url_safe(url, self.pool, self.fetcher, self.network_stats, self.wait_log, self.rates,
+                                           self.cache, self.locations, self.refreshes.get(key), self.postcode(key))
+
+    def record(self, key, url, result):
+        refresh = self.refreshes.get(key)
+        if not self.driver.is_successful(result):
+            self.results[key] = None
+        else:
+            self.results[key] = refresh.merge(result) if refresh else result
+        if self.results[key] or not refresh:  # a failed refresh leaves the old record in place
+            fields_at = None
+            if self.results[key]:
+                fields_at = self.planner.fields_at(self.journal, key, refresh, self.plan.city_for(key), result)
+            self.journal.record(key, url, self.results[key], fields_at)
+        if self.stream and self.results[key]:
+            self.stream.add_completed(key, self.results)
+        return self.results[key] is not None
+
+    def finish(self, utilisation=None, retries=None):
+        for key, refresh in self.refreshes.items():
+            self.planner.finished(refresh, self.results.get(key) is not None)
+            if self.results.get(key) is None and refresh.previous:  # keep the old fields rather than drop them
+                self.results[key] = refresh.previous
+                if self.stream:
+                    self.stream.add_completed(key, self.results)
+        if self.pool:
+            self.pool.close()
+        self.journal.close()
+        if self.stream:
+            self.stream.close()
+        self.driver.write_results(self.cities_data, self.plan, self.results, self.fetcher, self.network_stats,
+                                  self.wait_log, utilisation, self.rates, retries, self.cache, self.planner.summary(),
+                                  self.locations)
+
+
+def interleave(runs):
+    """Round-robin the countries' tasks so every marketplace stays busy"""
+    queue = []
+    for batch in zip_longest(*(run.tasks() for run in runs)):
+        queue.extend(task for task in batch if task is not None)
+    return queue
+
+
+def default_workers(drivers):
+    """Worker threads for a run over these country drivers: the sum of their MAX_WORKERS"""
+    return sum(driver.MAX_WORKERS for driver in drivers) or 1
+
+
+def plan_countries(countries, cities=None, all_cities=False, fresh=False, scrape=True, workers=None):
+    """A CountryRun for every country with at least one of the requested cities.
+
+    Any worker may pick up any country's products, so each country's resources
+    are sized for all `workers` (default: default_workers()), while one
+    BrowserBudget keeps the browsers of all countries together to that many.
+    """
+    countries_data = []
+    for country in countries:
+        driver = load_country_driver(country)
+        if fresh:
+            driver.RESUME = False
+        selected = None if all_cities else (cities or driver.CITIES)
+        cities_data = driver.load_cities(selected)
+        if not cities_data:
+            print(f"⚠️ {country}: none of the requested cities are in {driver.INPUT_FILE}")
+            continue
+        countries_data.append((country, driver, cities_data))
+    workers = workers or default_workers(driver for _, driver, _ in countries_data)
+    budget = BrowserBudget(workers) if scrape else None
+    return [CountryRun(country, driver, cities_data, scrape, workers, budget)
+            for country, driver, cities_data in countries_data]
+
+
+def run(countries, cities=None, all_cities=False, workers=None, sample_every=30, fresh=False):
+    runs = plan_countries(countries, cities, all_cities, fresh, workers=workers)
+    queue = interleave(runs)
+    workers = workers or default_workers(run.driver for run in runs)
+    print(f"\n🚀 {len(queue)} unique products across {len(runs)} countries, {workers} workers")
+
+    pipeline = WorkPipeline(lambda task: task[0].scrape(task[1], task[2]), workers=workers, sample_every=sample_every)
+    retries = RetryQueue()
+
+    def collect(tasks):
+        for i, (task, result) in enumerate(pipeline.run(tasks), 1):
+            country_run, key, url = task
+            if country_run.record(key, url, result):
+                retries.succeeded(task)
+                print(f"    [{i}/{len(tasks)}] SUCCESS ({country_run.country}): {url}")
+            else:
+                kind = failure_kind(result)
+                delay = retries.defer(task, kind, country_run.retry_policies)
+                retry = f"retry queued ({delay}s backoff)" if delay is not None else "giving up"
+                print(f"    [{i}/{len(tasks)}] FAILED ({country_run.country}): {url} | {kind}, {retry}")
+
+    try:
+        collect(queue)
+        for batch in retries.rounds():
+            print(f"\n🔁 Retrying {len(batch)} failed products")
+            collect(batch)
+    finally:
+        utilisation = pipeline.utilisation.summary()
+        for country_run in runs:
+            country_run.finish(utilisation, retries.summary())
+    print()
+    for line in format_utilisation(utilisation):
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape several countries and cities from one work queue")
+    parser.add_argument("--country", action="append", choices=COUNTRIES, help="Country to include (default: all)")
+    parser.add_argument("--city", action="append", help="City to include, any case (default: each script's CITIES)")
+    parser.add_argument("--all-cities", action="store_true", help="Scrape every city in each input file")
+    parser.add_argument("--workers", type=int,
+                        help="Worker threads, and the most browsers alive across all countries "
+                             "(default: sum of each country's MAX_WORKERS)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the scrape journals and start new ones")
+    parser.add_argument("--sample-every", type=float, default=30, help="Seconds between utilisation samples")
+    args = parser.parse_args()
+
+    cities = [city.lower() for city in args.city] if args.city else None
+    run(args.country or COUNTRIES, cities, args.all_cities, args.workers, args.sample_every, args.fresh)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import re
+from urllib.parse import urlsplit
+
+# ASIN in the common product URL shapes: /dp/X, /dp/product/X, /gp/product/X, /gp/aw/d/X
+ASIN_RE = re.compile(r"/(?:dp|gp/product|gp/aw/d)/(?:product/)?([A-Z0-9]{10})(?=[/?#]|$)")
+
+
+def canonical_key(url):
+    """(domain, ASIN) for a product URL, or None when no ASIN can be found"""
+    parts = urlsplit(url)
+    match = ASIN_RE.search(parts.path)
+    if not match:
+        return None
+    domain = parts.netloc.lower()
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return domain, match.group(1)
+
+
+def canonical_url(key):
+    domain, asin = key
+    return f"https://www.{domain}/dp/{asin}"
+
+
+class ScrapePlan:
+    """Unique products for a run, and every city/category URL that referenced each.
+
+    Search results repeat the same product across cities, categories and pages
+    under different tracking URLs. The plan keys every input URL on
+    (domain, ASIN) so each product is scraped once from its canonical /dp/ URL,
+    then `fan_out()` hands the result back to every reference. URLs without an
+    ASIN are kept as their own entries and scraped as given.
+
+    With `city_offers`, only the first city listing a product gets the full
+    scrape. Every other city listing it gets an offer pass of its own (keyed
+    ("offer", city, domain, ASIN)), since only the offer depends on the
+    delivery location, and its offer fields replace the full scrape's there.
+    Without it, every city listing a product gets a full scrape of its own
+    (keyed ("city", city, domain, ASIN)), for its own delivery location.
+    """
+
+    def __init__(self, city_offers=False):
+        self.city_offers = city_offers
+        self.targets = {}  # key -> URL to scrape, in first-seen order
+        self.entries = []  # (city, category, url, key) for every input URL, in input order
+        self.references = {}  # key -> [(city, category, position in that category, url)]
+        self.offers = {}  # offer key -> (product key, city) for every city after a product's first
+        self.postcodes = {}  # city -> delivery postcode from the input file
+        self._positions = {}
+
+    @classmethod
+    def from_cities(cls, cities_data, city_offers=False):
+        plan = cls(city_offers)
+        for city_data in cities_data:
+            postcode = city_data.get("postcode") or city_data.get("pincode")
+            if postcode:
+                plan.postcodes[city_data["location"]] = postcode
+            for category, category_data in city_data["categories"].items():
+                for url in category_data["urls"]:
+                    plan.add(city_data["location"], category, url)
+        return plan
+
+    def add(self, city, category, url):
+        key = canonical_key(url)
+        if key is None:
+            key, target = ("url", url), url
+        else:
+            target = canonical_url(key)
+        if not self.city_offers:
+            key = city_key_for(key, city)
+        self.targets.setdefault(key, target)
+        first_city = self.references[key][0][0] if key in self.references else city
+        if self.city_offers and key[0] != "url" and city != first_city:
+            offer_key = offer_key_for(key, city)
+            self.targets.setdefault(offer_key, target)
+            self.offers[offer_key] = key, city
+        self.entries.append((city, category, url, key))
+        position = self._positions[city, category] = self._positions.get((city, category), 0) + 1
+        self.references.setdefault(key, []).append((city, category, position, url))
+
+    def city_for(self, key):
+        """City whose offer `key` holds: its offer pass city, or else the first city listing it"""
+        return self.offers[key][1] if key in self.offers else self.references[key][0][0]
+
+    def postcode_for(self, key):
+        """Delivery postcode to scrape `key` with"""
+        return self.postcodes.get(self.city_for(key))
+
+    def product_for(self, key, city, results):
+        """The product as listed in `city`: joined with that city's offers if it has an offer pass"""
+        product = results.get(key)
+        offer_key = offer_key_for(key, city)
+        if not product or offer_key not in self.offers:
+            return product
+        offer = results.get(offer_key)
+        return dict(product, **offer) if offer else None  # without its own offer the listing has no price
+
+    def completed_by(self, key, results):
+        """(product key, city, product) for every city listing that `key`'s result completes"""
+        if key in self.offers:
+            product_key, city = self.offers[key]
+            product = self.product_for(product_key, city, results)
+            return [(product_key, city, product)] if product else []
+        cities = dict.fromkeys(city for city, _, _, _ in self.references.get(key, []))
+        return [(key, city, product) for city in cities
+                for product in [self.product_for(key, city, results)] if product]
+
+    def fan_out(self, results):
+        """Yield (city, category, url, product) for every input URL, in input order.
+
+        `results` maps plan keys to scraped products (or None). Each reference
+        gets its own copy of the product carrying the URL it was listed under.
+        """
+        for city, category, url, key in self.entries:
+            product = self.product_for(key, city, results)
+            yield city, category, url, dict(product, url=url) if product else None
+
+    def summary(self):
+        total = len(self.entries)
+        unique = len(self.targets) - len(self.offers)
+        return {
+            "total_urls": total,
+            "unique_products": unique,
+            "duplicates": total - unique,
+            "dedupe_ratio": total / unique if unique else 0.0,
+            "offer_passes": len(self.offers),
+        }
+
+
+def city_key_for(key, city):
+    return ("city", city) + tuple(key)
+
+
+def offer_key_for(key, city):
+    return ("offer", city) + tuple(key)
@@ -0,0 +1,169 @@
+"""Collect search result pages by URL instead of clicking through them in the browser.
+
+Amazon's result pages are plain GETs of /s?k=<term>&page=<n>, so page N can be
+built directly. SearchPages fetches a few pages at a time over the pooled
+keep-alive sessions of an http_fetch.HttpFetcher, paced by the marketplace's
+rate limit and sent with the delivery location's cookies, and keeps the
+product links with the same filters as the browser collectors. It stops once
+it has enough products or, after at least one productive page, reaches a page
+without new ones. A page behind a robot check, one that cannot be fetched, or
+a first page without any products hands the rest of the category back to the
+browser's click-based pagination.
+
+In the browser, product_urls_from_driver() reads every candidate link and
+result ASIN of a loaded page in one script call, instead of a WebDriver round
+trip per selector and per link.
+"""
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
+
+import requests
+from selenium.common.exceptions import WebDriverException
+
+from html_parsers import make_soup
+from http_fetch import HttpFetcher, is_bot_wall
+from rate_limit import RateController
+
+PAGE_CONCURRENCY = 4  # result pages fetched at once
+MAX_PAGES = 20  # Amazon does not page search results much further
+
+PRODUCT_SELECTORS = [
+    'a.a-link-normal.s-no-outline',
+    'h2.a-size-mini a',
+    '[data-component-type="s-search-result"] h2 a',
+    '.s-result-item h2 a',
+    'a[href*="/dp/"]',
+]
+# Organic search results; sponsored ones are marked as ads or only link through /sspa/ redirects
+RESULT_SELECTOR = '[data-component-type="s-search-result"][data-asin]:not(.AdHolder):not(.s-sponsored)'
+SPONSORED_LINK = 'a[href*="/sspa/"]'
+
+ASIN_IN_URL = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})")
+
+# Hrefs of every link matching the selectors, and the data-asin of every organic search result
+COLLECT_LINKS_SCRIPT = """
+const [selectors, resultSelector, sponsoredLink] = arguments;
+const hrefs = [];
+let matched = 0;
+for (const selector of selectors) {
+    for (const link of document.querySelectorAll(selector)) {
+        matched++;
+        if (link.href) hrefs.push(link.href);
+    }
+}
+const asins = Array.from(document.querySelectorAll(resultSelector))
+    .filter(result => !result.querySelector(sponsoredLink))
+    .map(result => result.getAttribute("data-asin"));
+return {hrefs: hrefs, asins: asins, matched: matched};
+"""
+
+
+def search_url(domain, term, page=1):
+    return f"https://www.{domain}/s?k={quote_plus(term)}&page={page}"
+
+
+def is_product_url(url, domain):
+    """Product pages of the marketplace, without sponsored redirects"""
+    return (domain in url and ("/dp/" in url or "/gp/product/" in url)
+            and "/sspa/" not in url and not url.startswith("https://aax-"))
+
+
+def product_urls_from_links(hrefs, asins, domain):
+    """Product URLs among a result page's links, plus /dp/ URLs for organic result ASINs none of them point at"""
+    urls = set()
+    for href in hrefs:
+        url = f"https://www.{domain}{href}" if href.startswith("/") else href
+        if is_product_url(url, domain):
+            urls.add(url)
+    linked = {match.group(1) for match in map(ASIN_IN_URL.search, urls) if match}
+    urls.update(f"https://www.{domain}/dp/{asin}" for asin in asins if asin and asin not in linked)
+    return urls
+
+
+def _links_from_html(html, selectors):
+    """(hrefs, result ASINs, links matched) of a search result page's source"""
+    soup = make_soup(html)
+    hrefs, matched = [], 0
+    for selector in selectors:
+        for link in soup.select(selector):
+            matched += 1
+            if link.get("href"):
+                hrefs.append(link.get("href"))
+    asins = [result.get("data-asin") for result in soup.select(RESULT_SELECTOR) if not result.select_one(SPONSORED_LINK)]
+    return hrefs, asins, matched
+
+
+def product_urls_from_html(html, domain, selectors=PRODUCT_SELECTORS):
+    """Product URLs linked from a search result page"""
+    hrefs, asins, _ = _links_from_html(html, selectors)
+    return product_urls_from_links(hrefs, asins, domain)
+
+
+def product_urls_from_driver(driver, domain, selectors=PRODUCT_SELECTORS):
+    """(product URLs, WebDriver round trips saved) for the result page loaded in `driver`.
+
+    Everything is read in one script call, or from one page_source parse if
+    the script fails. Looking the links up element by element would take a
+    find_elements call per selector and a get_attribute call per link.
+    """
+    try:
+        found = driver.execute_script(COLLECT_LINKS_SCRIPT, selectors, RESULT_SELECTOR, SPONSORED_LINK)
+        hrefs, asins, matched = found["hrefs"], found["asins"], found["matched"]
+    except WebDriverException:
+        hrefs, asins, matched = _links_from_html(driver.page_source, selectors)
+    return product_urls_from_links(hrefs, asins, domain), len(selectors) + matched - 1
+
+
+class SearchPages:
+    """Fetch a search term's result pages directly, several at a time"""
+
+    def __init__(self, domain, lang="en-US", concurrency=PAGE_CONCURRENCY, max_pages=MAX_PAGES):
+        self.domain = domain
+        self.concurrency = concurrency
+        self.max_pages = max_pages
+        self.rates = RateController()
+        self.fetcher = HttpFetcher(lang=lang, pool_size=concurrency, rates=self.rates)
+
+    def url(self, term, page=1):
+        return search_url(self.domain, term, page)
+
+    def fetch(self, term, page, cookies=None):
+        """Product URLs on one result page, or None if the page was blocked or failed"""
+        url = self.url(term, page)
+        try:
+            status, html = self.fetcher.fetch(url, cookies)
+        except requests.RequestException:
+            return None
+        if is_bot_wall(status, html):
+            self.rates.report(url, "blocked")
+            return None
+        self.rates.report(url, "ok")
+        return product_urls_from_html(html, self.domain) if status == 200 else None
+
+    def collect(self, term, max_products, cookies=None):
+        """(product URLs, page for the browser to continue from, or None when the category is done)"""
+        product_links = set()
+        start = time.monotonic()
+        page = 1
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            while page <= self.max_pages:
+                pages = range(page, min(page + self.concurrency, self.max_pages + 1))
+                for page_num, page_urls in zip(pages, executor.map(lambda p: self.fetch(term, p, cookies), pages)):
+                    if page_urls is None:
+                        print(f"   ⚠️ Could not fetch page {page_num} directly")
+                        return product_links, page_num
+                    if not product_links and not page_urls:
+                        # A layout change or a soft block rather than the end of the results: let the browser try
+                        print(f"   ⚠️ No products found on page {page_num} directly")
+                        return product_links, page_num
+                    new_urls = page_urls - product_links
+                    product_links.update(new_urls)
+                    print(f"   Found {len(new_urls)} new products on page {page_num}")
+                    if not new_urls or len(product_links) >= max_products:
+                        print(f"   ⚡ {len(product_links)} products from {page_num} pages in {time.monotonic() - start:.1f}s")
+                        return product_links, None
+                page = pages[-1] + 1
+        print(f"   ⚡ {len(product_links)} products from {self.max_pages} pages in {time.monotonic() - start:.1f}s")
+        return product_links, None
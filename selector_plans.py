@@ -0,0 +1,106 @@
+"""Precompiled CSS selector chains for the try_* extractors.
+
+A SelectorPlan compiles its selectors once, at import. On a whole document it
+resolves each selector through the page's DomIndex; below that (e.g. inside a
+buybox container) it evaluates the whole chain in a single walk of the
+subtree. Either way each selector is keyed on the id, class or tag name of its
+rightmost compound, so an element is only tested against the selectors that
+could possibly match it.
+"""
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+from soupsieve.css_match import CSSMatch
+
+from dom_index import get_index
+
+
+class SelectorPlan:
+    """An ordered chain of selectors, tried in order like a select() loop"""
+
+    def __init__(self, selectors):
+        self.selectors = tuple(selectors)
+        self.compiled = [soupsieve.compile(s) for s in self.selectors]
+        self._by_id = {}
+        self._by_class = {}
+        self._by_tag = {}
+        self._unkeyed = set()
+        for index, compiled in enumerate(self.compiled):
+            for selector in compiled.selectors:
+                self._file(index, selector)
+
+    def __iter__(self):
+        return iter(self.selectors)
+
+    def __len__(self):
+        return len(self.selectors)
+
+    def _file(self, index, selector):
+        # Key on the rightmost compound: the element itself must carry it
+        if selector.ids:
+            self._by_id.setdefault(selector.ids[0], set()).add(index)
+        elif selector.classes:
+            self._by_class.setdefault(selector.classes[0], set()).add(index)
+        elif selector.tag is not None and selector.tag.name not in (None, "*"):
+            self._by_tag.setdefault(selector.tag.name.lower(), set()).add(index)
+        else:
+            self._unkeyed.add(index)
+
+    def _candidates(self, el):
+        candidates = set(self._unkeyed)
+        attrs = el.attrs
+        element_id = attrs.get("id")
+        if element_id in self._by_id:
+            candidates |= self._by_id[element_id]
+        classes = attrs.get("class")
+        if classes:
+            if isinstance(classes, str):
+                classes = classes.split()
+            for cls in classes:
+                if cls in self._by_class:
+                    candidates |= self._by_class[cls]
+        if el.name in self._by_tag:
+            candidates |= self._by_tag[el.name]
+        return candidates
+
+    def _evaluate(self, root):
+        results = [[] for _ in self.selectors]
+        matchers = {}
+        for el in root.descendants:
+            if not isinstance(el, Tag):
+                continue
+            for index in self._candidates(el):
+                matcher = matchers.get(index)
+                if matcher is None:
+                    compiled = self.compiled[index]
+                    matcher = matchers[index] = CSSMatch(compiled.selectors, root, compiled.namespaces, compiled.flags)
+                if matcher.match(el):
+                    results[index].append(el)
+        return results
+
+    def matches(self, root):
+        """Yield each selector's matches in chain order, as root.select() would return them"""
+        if isinstance(root, BeautifulSoup):
+            index = get_index(root)
+            for compiled in self.compiled:
+                yield index.select(compiled)
+        elif isinstance(root, Tag):
+            yield from self._evaluate(root)
+        else:
+            # Other parser backends bring their own compiled selectors
+            for selector in self.selectors:
+                yield root.select(selector)
+
+    def iter_matches(self, root):
+        """Yield (selector, elements) in chain order, skipping selectors with no match"""
+        for selector, elements in zip(self.selectors, self.matches(root)):
+            if elements:
+                yield selector, elements
+
+    def first_matches(self, root):
+        """Yield the first element of each matching selector, like repeated select_one()"""
+        for _, elements in self.iter_matches(root):
+            yield elements[0]
+
+    def select_one(self, root):
+        """First element matched by the earliest matching selector"""
+        return next(self.first_matches(root), None)
@@ -0,0 +1,86 @@
+"""Several worker processes sharing one SqliteBroker"""
+import multiprocessing
+import time
+
+from broker import SqliteBroker
+
+WORKERS = 4
+
+
+def _work(path, name):
+    """Claim and complete jobs until none is due, like run_distributed.Worker with a stub scrape"""
+    broker = SqliteBroker(path)
+    while True:
+        job = broker.claim(name)
+        if job is None:
+            break
+        broker.complete(job, name, {"url": job["url"], "worker": name})
+    broker.close()
+
+
+def _run_workers(path):
+    processes = [multiprocessing.Process(target=_work, args=(path, f"worker-{i}")) for i in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+
+def _jobs(count):
+    return [{"country": "UK", "key": ["full", f"B{i:09d}"], "url": f"https://www.amazon.co.uk/dp/B{i:09d}",
+             "postcode": None} for i in range(count)]
+
+
+def test_workers_claim_every_job_once(tmp_path):
+    path = str(tmp_path / "queue.db")
+    broker = SqliteBroker(path)
+    jobs = broker.enqueue(_jobs(200))
+
+    _run_workers(path)
+
+    _, results = broker.results()
+    assert sorted(job["id"] for job, _, _ in results) == sorted(job["id"] for job in jobs)
+    for job, product, kind in results:
+        assert product["url"] == job["url"]
+        assert kind is None
+    assert broker.counts() == {"queued": 0, "running": 0}
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    path = str(tmp_path / "queue.db")
+    broker = SqliteBroker(path, lease=0.2)
+    jobs = broker.enqueue(_jobs(20))
+    crashed = broker.claim("crashed")  # leased, then never completed
+    assert crashed["id"] == jobs[0]["id"]
+    assert broker.counts() == {"queued": 19, "running": 1}
+    time.sleep(0.3)
+
+    _run_workers(path)
+
+    _, results = broker.results()
+    assert sorted(job["id"] for job, _, _ in results) == sorted(job["id"] for job in jobs)
+    [(_, product, _)] = [result for result in results if result[0]["id"] == crashed["id"]]
+    assert product["worker"] != "crashed"
+    assert broker.counts() == {"queued": 0, "running": 0}
+
+
+def test_delayed_jobs_wait_for_their_backoff(tmp_path):
+    broker = SqliteBroker(str(tmp_path / "queue.db"))
+    [job] = broker.enqueue(_jobs(1), delay=0.3)
+    assert broker.claim("worker") is None
+    time.sleep(0.4)
+    assert broker.claim("worker")["id"] == job["id"]
+
+
+def test_jobs_carry_their_stale_groups(tmp_path):
+    broker = SqliteBroker(str(tmp_path / "queue.db"))
+    jobs = _jobs(2)
+    jobs[0]["groups"] = ["offer", "reviews"]
+    broker.enqueue(jobs)
+    first, second = broker.claim("worker"), broker.claim("worker")
+    assert first["groups"] == ["offer", "reviews"]
+    assert second["groups"] is None
+    broker.complete(first, "worker", {"price": "£1"})
+    _, [(job, _, _)] = broker.results()
+    assert job["groups"] == ["offer", "reviews"]
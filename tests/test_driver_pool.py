@@ -0,0 +1,33 @@
+"""DriverPools of several marketplaces sharing one BrowserBudget"""
+from driver_pool import BrowserBudget, DriverPool
+
+
+class FakeDriver:
+    alive = 0
+
+    def __init__(self):
+        FakeDriver.alive += 1
+
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        FakeDriver.alive -= 1
+
+
+def test_budget_caps_browsers_across_pools():
+    budget = BrowserBudget(2)
+    us, uk = DriverPool(FakeDriver, size=2, budget=budget), DriverPool(FakeDriver, size=2, budget=budget)
+    first, second = us.acquire(), us.acquire()
+    assert FakeDriver.alive == 2
+
+    us.release(first)
+    uk_driver = uk.acquire(timeout=1)  # quits the idle US browser to make room
+    assert FakeDriver.alive == 2
+    assert us.stats()["live"] == 1 and uk.stats()["live"] == 1
+
+    us.release(second)
+    uk.release(uk_driver)
+    us.close()
+    uk.close()
+    assert FakeDriver.alive == 0